@@ -1,78 +1,126 @@
+import asyncio
+import os
 import pandas as pd
-import time
 import re
-import requests
+import time
 from bs4 import BeautifulSoup
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from fake_useragent import UserAgent
 
-# Setup Chrome driver
-service = Service()
-options = webdriver.ChromeOptions()
-driver = webdriver.Chrome(service=service, options=options)
+from async_fetch import AsyncFetcher
+from driver_pool import DriverPool
+from fetch import Fetcher
+from fighter_parser import BASE_URL
+from metrics import Metrics
+from page_cache import PageCache
+from rate_limiter import HostRateLimiter
 
 # Target URL
-url = 'https://www.tapology.com/fightcenter/promotions/1-ultimate-fighting-championship-ufc'
-
-# Initialize output list
-all_links = []
-
-# Generate headers with fake user agent
-ua = UserAgent()
-headers = {
-    'User-Agent': ua.random
-}
-
-# Get the initial page
-response = requests.get(url, headers=headers)
-time.sleep(5)
-
-if response.status_code == 200:
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-    # Get total number of pages
+url = BASE_URL + '/fightcenter/promotions/1-ultimate-fighting-championship-ufc'
+EVENT_LINK_SELECTOR = 'span.hidden.md\\:inline.text-tap_3 a'
+# New events land on the listing every week, so cached listing pages go stale fast
+LISTING_MAX_AGE = 12 * 3600
+
+# INCREMENTAL=1: the listing is newest first, so stop paging at the first page holding an event
+# we already know, prepend the new events to KNOWN_EVENTS and list them in NEW_EVENTS
+INCREMENTAL = os.environ.get("INCREMENTAL") == "1"
+KNOWN_EVENTS = "2a_ufc_events.parquet"
+NEW_EVENTS = "2b_new_events.parquet"
+known_urls = set(pd.read_parquet(KNOWN_EVENTS)["URL"]) if INCREMENTAL and os.path.exists(KNOWN_EVENTS) else set()
+
+# Starting pace for the listing pages; the async fetcher keeps up to ASYNC_PER_HOST of them in flight
+REQUESTS_PER_SECOND = float(os.environ.get("SCRAPE_RATE", 0.5))
+
+# Page cache, then async HTTP; Chrome is only started if a listing page needs JS to render
+metrics = Metrics()
+rate_limiter = HostRateLimiter(REQUESTS_PER_SECOND)
+driver_pool = DriverPool(size=1, options_factory=webdriver.ChromeOptions, metrics=metrics)
+browser = Fetcher(driver_pool=driver_pool, rate_limiter=rate_limiter, metrics=metrics)
+fetcher = AsyncFetcher(rate_limiter=rate_limiter, cache=PageCache(), fallback=browser, metrics=metrics)
+
+
+# Number of listing pages, from the pagination's "last" link
+def last_page(soup):
     span_last = soup.find('span', class_='last')
-    if span_last:
-        a_tag = span_last.find('a')
-        if a_tag and 'href' in a_tag.attrs:
-            last_page_href = a_tag['href']
-            match = re.search(r'page=(\d+)', last_page_href)
-            max_page = int(match.group(1)) if match else 1
-        else:
-            max_page = 1
-    else:
-        max_page = 1
+    a_tag = span_last.find('a') if span_last else None
+    if a_tag and 'href' in a_tag.attrs:
+        match = re.search(r'page=(\d+)', a_tag['href'])
+        return int(match.group(1)) if match else 1
+    return 1
 
-    # Generate all subpage URLs
-    all_subpages = [f"{url}?page={i}" for i in range(1, max_page + 1)]
 
-    for subpage in all_subpages:
-        try:
-            driver.get(subpage)
-            time.sleep(15)  # Allow JS to render fully
-            html = driver.page_source
-            soup = BeautifulSoup(html, 'html.parser')
-
-            event_links = soup.select('span.hidden.md\\:inline.text-tap_3 a')
-            print(f"Processing page {subpage} - found {len(event_links)} links")
+def event_links(page):
+    with metrics.span('parse'):
+        tags = page.soup.select(EVENT_LINK_SELECTOR)
+    return [BASE_URL + a_tag['href'] for a_tag in tags if a_tag and 'href' in a_tag.attrs]
 
-            for a_tag in event_links:
-                if a_tag and 'href' in a_tag.attrs:
-                    full_url = 'https://www.tapology.com' + a_tag['href']
-                    all_links.append(full_url)
 
+# Every event linked from the listing, newest first. A full crawl requests all listing pages
+# at once and is paced only by the rate limiter; an incremental one goes a window of pages
+# at a time so it can stop at the first page holding a known event.
+async def crawl_listing():
+    all_links = []
+    async with fetcher:
+        try:
+            html = await fetcher.get(url)
         except Exception as e:
-            print(f"Error processing {subpage}: {e}")
-
-else:
-    print(f"Failed to fetch base URL: status {response.status_code}")
+            print(f"Failed to fetch base URL: {e}")
+            return all_links
+
+        all_subpages = [f"{url}?page={i}" for i in range(1, last_page(BeautifulSoup(html, 'html.parser')) + 1)]
+        # Incremental runs must see this week's listing, never a cached one
+        max_age = 0 if INCREMENTAL else LISTING_MAX_AGE
+        window = fetcher.per_host if INCREMENTAL else len(all_subpages)
+
+        for start in range(0, len(all_subpages), window):
+            batch = all_subpages[start:start + window]
+            pages = await fetcher.fetch_many(batch, EVENT_LINK_SELECTOR, max_age=max_age)
+            for subpage, page in zip(batch, pages):
+                if isinstance(page, Exception):
+                    print(f"Error processing {subpage}: {page}")
+                    metrics.page(0, type(page).__name__)
+                    continue
+
+                links = event_links(page)
+                metrics.page(len(links))
+                print(f"Processing page {subpage} ({page.source}, {page.seconds:.2f}s) - found {len(links)} links")
+
+                reached_known = False
+                for full_url in links:
+                    if full_url in known_urls:
+                        reached_known = True
+                    else:
+                        all_links.append(full_url)
+
+                if INCREMENTAL and reached_known:
+                    print(f"🛑 Reached already-known events on {subpage}, stopping")
+                    return all_links
+    return all_links
+
+
+started = time.perf_counter()
+all_links = asyncio.run(crawl_listing())
 
 # Quit the driver
-driver.quit()
-
-# Save results to a Parquet file
-df = pd.DataFrame({'URL': all_links})
-df.to_parquet("scraped_urls.parquet", index=False)
+driver_pool.close()
+print(fetcher.report())
+print(fetcher.cache.report())
+print(metrics.report())
+print(f"⏱️ Listing crawled in {time.perf_counter() - started:.1f}s")
+metrics.close()
+
+if INCREMENTAL:
+    # Keep the listing's newest-first order: new events go in front of the known ones
+    new_links = list(dict.fromkeys(all_links))
+    pd.DataFrame({'URL': new_links}).to_parquet(NEW_EVENTS, index=False)
+    if os.path.exists(KNOWN_EVENTS):
+        merged = pd.concat([pd.DataFrame({'URL': new_links}), pd.read_parquet(KNOWN_EVENTS)])
+    else:
+        merged = pd.DataFrame({'URL': new_links})
+    merged.drop_duplicates().to_parquet(KNOWN_EVENTS, index=False)
+    print(f"Saved {len(new_links)} new URLs to {NEW_EVENTS} and merged them into {KNOWN_EVENTS}")
+else:
+    # Save results to a Parquet file
+    df = pd.DataFrame({'URL': all_links})
+    df.to_parquet("scraped_urls.parquet", index=False)
 
-print(f"Saved {len(all_links)} URLs to scraped_urls.parquet")
+    print(f"Saved {len(all_links)} URLs to scraped_urls.parquet")
@@ -1,74 +1,151 @@
+import asyncio
 import pandas as pd
-import time
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from fake_useragent import UserAgent
 import tempfile
 import shutil
 import os
+import time
+
+from async_fetch import AsyncFetcher
+from coordinator import (CRAWL_COORDINATOR, CRAWL_LEAD, LEASE_SECONDS, NODE_ID, PEER_POLL_SECONDS, Heartbeat,
+                         open_frontier, peers_busy)
+from driver_pool import DriverPool
+from fetch import Fetcher
+from fighter_parser import BASE_URL
+from fighter_registry import FighterRegistry
+from frontier import DONE
+from metrics import Metrics
+from page_cache import PageCache
+from rate_limiter import HostRateLimiter
+
+WINNER_SELECTOR = 'div.div.hidden.md\\:flex.order-1.text-sm.text-tap_3'
+FRONTIER_PATH = "2_event_frontier.sqlite"
+WINNERS = "3a_winners_combined.parquet"
+
+# INCREMENTAL=1: only scrape the events 1_ufc_events.py just discovered (NEW_EVENTS) plus any
+# event that had no winners (or failed) last time; everything else is already in WINNERS
+INCREMENTAL = os.environ.get("INCREMENTAL") == "1"
+NEW_EVENTS = "2b_new_events.parquet"
 
 # Load the input parquet with UFC event URLs
 df = pd.read_parquet("2a_ufc_events.parquet")
 
-# run all rows from 12 to the end
-urls_to_scrape = df["URL"].tolist()[350:761]
-
-# Setup Chrome options with unique user data directory
-options = Options()
-options.add_argument("--headless")
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.binary_location = "/usr/bin/google-chrome"  # Path to Chrome binary
+# Every event is tracked in the frontier; a restart resumes with whatever is still pending.
+# Several crawl nodes can share one frontier through CRAWL_COORDINATOR (see coordinator.py)
+frontier = open_frontier(FRONTIER_PATH)
+if INCREMENTAL:
+    new_events = pd.read_parquet(NEW_EVENTS)["URL"].tolist()
+    new_set = set(new_events)
+    frontier.add([u for u in df["URL"] if u not in new_set], state=DONE)
+    frontier.add(new_events)
+    # Only the lead re-queues, or a node starting late would re-queue events its peers just finished
+    requeued = frontier.requeue_unproductive() if CRAWL_LEAD else 0
+    print(f"🆕 {len(new_events)} new event(s), {requeued} earlier event(s) without winners re-queued")
+else:
+    frontier.add(df["URL"].tolist())
+# A shared frontier gets a dead node's events back when their leases expire instead
+if not CRAWL_COORDINATOR:
+    recovered = frontier.recover()
+    if recovered:
+        print(f"♻️ Re-queued {recovered} event(s) left in flight by the last run")
 
 # Create a temporary directory for user data
 temp_dir = tempfile.mkdtemp()
 print(f"Using temporary user data directory: {temp_dir}")
-options.add_argument(f"--user-data-dir={temp_dir}")  # ← FIXED: added missing double dash
 
-# Setup Chrome driver
-service = Service()  # Will auto-locate chromedriver in PATH
-driver = webdriver.Chrome(service=service, options=options)
+# Setup Chrome options with unique user data directory
+def chrome_options():
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.binary_location = "/usr/bin/google-chrome"  # Path to Chrome binary
+    options.add_argument(f"--user-data-dir={temp_dir}")  # ← FIXED: added missing double dash
+    return options
+
+# Events in flight at once (claimed from the frontier together); the rate limiter sets the pace
+BATCH_SIZE = 50
+REQUESTS_PER_SECOND = float(os.environ.get("SCRAPE_RATE", 0.5))
 
-# Generate headers with fake user agent
-ua = UserAgent()
-headers = {
-    'User-Agent': ua.random
-}
+# Page cache, then async HTTP; Chrome is only started if an event page needs JS to render
+metrics = Metrics()
+rate_limiter = HostRateLimiter(REQUESTS_PER_SECOND)  # polite delay
+driver_pool = DriverPool(size=1, options_factory=chrome_options, metrics=metrics)
+browser = Fetcher(driver_pool=driver_pool, rate_limiter=rate_limiter, metrics=metrics)
+fetcher = AsyncFetcher(rate_limiter=rate_limiter, cache=PageCache(), fallback=browser, metrics=metrics)
 
-rows = []
 
-for url in urls_to_scrape:
-    print(f"\nScraping event: {url}")
-    try:
-        driver.get(url)
-        time.sleep(5)  # wait for JS to load
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+# (winner, link) for every winner on an event page
+def event_winners(page):
+    rows = []
+    with metrics.span('parse'):
+        winner_divs = page.soup.select(WINNER_SELECTOR)
+    for div in winner_divs:
+        link = div.find('a', class_='link-primary-red', href=True)
+        if link:
+            rows.append({
+                'winner': link.get_text(strip=True),
+                'winner_link': BASE_URL + link['href'],
+            })
+    return rows
 
-        winner_divs = soup.select('div.div.hidden.md\:flex.order-1.text-sm.text-tap_3')
 
-        for div in winner_divs:
-            link = div.find('a', class_='link-primary-red', href=True)
-            if link:
-                winner_name = link.get_text(strip=True)
-                winner_href = 'https://www.tapology.com' + link['href']
-                rows.append({
-                    'winner': winner_name,
-                    'winner_link': winner_href
-                })
-                print(f"✓ {winner_name} — {winner_href}")
+# Every pending event, BATCH_SIZE leased at a time and fetched concurrently; each result is
+# committed to the frontier as soon as its page arrives. The lead keeps polling while other
+# nodes still hold leases, so it merges only once their events are in.
+async def crawl_events():
+    async with fetcher:
+        while True:
+            claimed = frontier.claim(BATCH_SIZE, owner=NODE_ID, lease_seconds=LEASE_SECONDS)
+            if not claimed:
+                if CRAWL_LEAD and peers_busy(frontier):
+                    await asyncio.sleep(PEER_POLL_SECONDS)
+                    continue
+                break
+            async for url, page in fetcher.fetch_all([row['url'] for row in claimed], WINNER_SELECTOR):
+                print(f"\nScraping event: {url}")
+                try:
+                    if isinstance(page, Exception):
+                        raise page
+                    rows = event_winners(page)
+                    for row in rows:
+                        print(f"✓ {row['winner']} — {row['winner_link']}")
+                    if not frontier.complete(url, rows, owner=NODE_ID):
+                        print(f"⌛ Lease on {url} was taken over by another node — dropping this copy")
+                    metrics.page(len(rows))
+                except Exception as e:
+                    print(f"Error scraping {url}: {e}")
+                    frontier.fail(url, e, owner=NODE_ID)
+                    metrics.page(0, type(e).__name__)
 
-    except Exception as e:
-        print(f"Error scraping {url}: {e}")
 
-    time.sleep(2)  # polite delay
+started = time.perf_counter()
+with Heartbeat(frontier):
+    asyncio.run(crawl_events())
 
 # Quit the driver and clean up temp data
-driver.quit()
+driver_pool.close()
 shutil.rmtree(temp_dir)
+print(fetcher.report())
+print(fetcher.cache.report())
+print(frontier.report())
+print(metrics.report())
+print(f"⏱️ Events crawled in {time.perf_counter() - started:.1f}s")
+metrics.close()
 
-# Save to parquet with duplicates removed
-results_df = pd.DataFrame(rows).drop_duplicates()
-results_df.to_parquet("3a_winners_760.parquet", index=False)
-print("✅ Saved winner data to 3a_winners_760.parquet")
+# Merge every event finished so far (this run, earlier ones and other nodes) into the winners
+# dataset; only on the lead, so nodes sharing a frontier don't all rewrite it and the registry
+if CRAWL_LEAD:
+    results_df = pd.DataFrame(list(frontier.iter_rows()), columns=['winner', 'winner_link'])
+    if os.path.exists(WINNERS):
+        results_df = pd.concat([pd.read_parquet(WINNERS), results_df])
+    # Winners are deduplicated on their registry id, so the same fighter under two link spellings is one row
+    registry = FighterRegistry()
+    results_df['winner_id'] = registry.ids_for(results_df['winner_link'].tolist(), results_df['winner'].tolist())
+    results_df = results_df.drop_duplicates('winner_id')
+    results_df.to_parquet(WINNERS, index=False)
+    registry.save()
+    print(f"✅ Saved winner data to {WINNERS}")
+    print(registry.report())
+else:
+    print(f"🤝 {NODE_ID} done; the lead node merges every node's winners into {WINNERS}")
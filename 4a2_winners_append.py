@@ -1,15 +1,17 @@
 import os
-import random
-import time
 import pandas as pd
-import subprocess
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+
+from backoff import AdaptivePacer, CircuitBreaker, default_rotator
+from driver_pool import DriverPool
+from fetch import Fetcher
+from fighter_registry import FighterRegistry
+from fighter_parser import MissingResults, parse_fighter_page
+from frontier import Frontier
+from metrics import Metrics
+from page_cache import PageCache
+from parquet_sink import ParquetSink, compact, subset_schema
+from rate_limiter import HostRateLimiter
 
 # VPN city pool
 VPN_CITIES = [
@@ -25,112 +27,71 @@ df = pd.read_parquet("rescrape_urls.parquet")
 # Rename column to match expected format
 df = df.rename(columns={"original_fighter_url": "fighter_url"})
 
-# Add dummy fighter_name (optional, if required elsewhere in your code)
-df["fighter_name"] = "Unknown"
+# Names come from the fighter registry; fighters it has never seen named stay "Unknown"
+registry = FighterRegistry()
+df["fighter_name"] = [registry.name_of(i) for i in registry.ids_for(df["fighter_url"].tolist())]
 
 # Drop duplicates and reset index
 fighters = df[["fighter_name", "fighter_url"]].drop_duplicates().reset_index(drop=True)
 
 chunk_size = 50
-
-def run_shell(cmd):
-    print(f"\n▶️ Running: {cmd}")
-    subprocess.run(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-def clean_text(text):
-    if isinstance(text, str):
-        return text.encode('utf-8', 'ignore').decode('utf-8')
-    return text
+FRONTIER_PATH = "4a2_rescrape_frontier.sqlite"
+OUTPUT_DIR = "5a_rescrape_output"
+OUTPUT_DATASET = "5a_rescrape_output_dataset"
+OUTPUT_COLUMNS = [
+    'original_fighter_url',
+    'opponent_url',
+    'event_year',
+    'event_month_day',
+    'result',
+    'finish_shortened',
+]
+FIGHTER_RESULTS_SELECTOR = "section.fighterFightResults"
+# Starting pace; the pacer moves it between SCRAPE_MIN_RATE and SCRAPE_MAX_RATE from there
+REQUESTS_PER_SECOND = float(os.environ.get("SCRAPE_RATE", 0.2))
+
+# Long-lived browser sessions, recycled every DRIVER_MAX_PAGES pages or after a crash
+DRIVER_MAX_PAGES = 50
+# Timing spans for every fetch phase, appended to crawl_spans.jsonl and exported after each chunk
+metrics = Metrics()
+driver_pool = DriverPool(size=1, max_pages=DRIVER_MAX_PAGES, metrics=metrics)
+# Page cache, then plain HTTP; the browser only when the results section needs JS
+rate_limiter = HostRateLimiter(REQUESTS_PER_SECOND)
+fetcher = Fetcher(driver_pool=driver_pool, rate_limiter=rate_limiter, cache=PageCache(), metrics=metrics)
+# AIMD on the rate limiter instead of fixed sleeps; only repeated blocks rotate the VPN city
+pacer = AdaptivePacer(rate_limiter, CircuitBreaker(rotate=default_rotator(VPN_CITIES), metrics=metrics))
+frontier = Frontier(FRONTIER_PATH)
+sink = ParquetSink(OUTPUT_DIR, schema=subset_schema(OUTPUT_COLUMNS))
 
 def scrape_chunk(fighter_chunk, chunk_num):
-    output = []
-
     for row in fighter_chunk:
         fighter_name = row['fighter_name']
-        fighter_url = urljoin("https://www.tapology.com", row['fighter_url'])
+        fighter_url = row['url']
 
         print(f"Scraping {fighter_name}: {fighter_url}")
-        row_count_before = len(output)
-
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        driver = webdriver.Chrome(options=chrome_options)
 
         try:
+            # Timeouts and blocks slow the pace and are retried; anything else fails the fighter
+            page = pacer.call(fighter_url, lambda: fetcher.fetch(fighter_url, FIGHTER_RESULTS_SELECTOR))
+
             try:
-                driver.get(fighter_url)
-            except Exception as e:
-                print(f"Failed initial load: {e}. Switching VPN and retrying...")
-                driver.quit()
-                run_shell("nordvpn disconnect || true")
-                time.sleep(3)
-                new_city = random.choice(VPN_CITIES)
-                run_shell(f"nordvpn connect {new_city}")
-                time.sleep(5)
-
-                driver = webdriver.Chrome(options=chrome_options)
-                try:
-                    driver.get(fighter_url)
-                except Exception as e2:
-                    print(f"Retry after VPN switch also failed: {e2}")
-                    driver.quit()
-                    continue
-
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "section.fighterFightResults"))
-            )
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-
-            results_container = soup.select_one("section.fighterFightResults div#proResults")
-            if not results_container:
+                with metrics.span('parse'):
+                    rows = parse_fighter_page(page.html, fighter_name, fighter_url)
+            except MissingResults as e:
                 print("❌  No <div id='proResults'> found — skipping.")
-                driver.quit()
+                pacer.failure(fighter_url, e)
+                frontier.fail(fighter_url, e)
+                metrics.page(0, type(e).__name__)
                 continue
 
-            bouts = results_container.select("div[data-fighter-bout-target='bout']")
-            print(f"✅ Found {len(bouts)} bouts")
-
-            for bout in bouts:
-                if 'Amateur Bouts' in bout.text:
-                    break
-
-                result_div = bout.select_one("div.result div")
-                result_text = result_div.text.strip() if result_div else ''
-                if result_text not in ['W', 'L']:
-                    continue
-
-                record_span = bout.select_one("span[title='Fighter Record Before Fight']")
-                if not record_span:
-                    continue
-
-                opponent_tag = bout.select_one('a[href*="/fighters/"]')
-                opponent_url = urljoin("https://www.tapology.com", opponent_tag['href']) if opponent_tag else 'null'
-
-                date_container = bout.select_one('div.flex.flex-col.justify-around.items-center')
-                event_year = event_md = 'null'
-                if date_container:
-                    spans = date_container.find_all('span')
-                    if len(spans) >= 2:
-                        event_year = spans[0].text.strip()
-                        event_md = spans[1].text.strip()
-
-                finish_shortened = 'null'
-                short_finish_div = bout.select_one("div.-rotate-90")
-                if short_finish_div:
-                    finish_shortened = short_finish_div.text.strip()
-
-                output.append({
-                    'original_fighter_url': clean_text(fighter_url),
-                    'opponent_url': clean_text(opponent_url),
-                    'event_year': clean_text(event_year),
-                    'event_month_day': clean_text(event_md),
-                    'result': clean_text(result_text),
-                    'finish_shortened': clean_text(finish_shortened)
-                })
-
-            new_rows = len(output) - row_count_before
+            # This pass only keeps a subset of the parsed columns
+            rows = [{col: bout[col] for col in OUTPUT_COLUMNS} for bout in rows]
+            with metrics.span('write'):
+                frontier.complete(fighter_url, rows)
+                sink.write_rows(rows)
+            metrics.page(len(rows))
+
+            new_rows = len(rows)
             if new_rows > 0:
                 print(f"📦 Added {new_rows} row(s) for {fighter_name}")
             else:
@@ -138,31 +99,51 @@ def scrape_chunk(fighter_chunk, chunk_num):
 
         except Exception as e:
             print(f"❌ Error scraping {fighter_url}: {e}")
-        finally:
-            driver.quit()
-
-        time.sleep(random.uniform(2, 8))
-
-    filename = f"5a_rescrape_output_{(chunk_num+1)*chunk_size}.parquet"
-    pd.DataFrame(output).to_parquet(filename, index=False)
-    print(f"✅ Saved chunk {chunk_num+1} → {filename}\n")
+            frontier.fail(fighter_url, e)
+            metrics.page(0, type(e).__name__)
+
+    sink.flush()
+    print(f"✅ Finished chunk {chunk_num+1}")
+    print(sink.report())
+    print(driver_pool.report())
+    print(frontier.report())
+    print(pacer.report())
+    print(metrics.report() + "\n")
+    metrics.export()
+
+# Every fighter is tracked in the frontier; a restart resumes with whatever is still pending
+frontier.add(
+    [urljoin("https://www.tapology.com", url) for url in fighters['fighter_url']],
+    [{'fighter_name': name} for name in fighters['fighter_name']],
+)
+recovered = frontier.recover()
+if recovered:
+    print(f"♻️ Re-queued {recovered} fighter(s) left in flight by the last run")
+
+# The part files only ever hold rows the frontier has committed; rebuild them if a crash left a gap
+if sink.stored_rows() != frontier.row_count():
+    print(f"♻️ Rebuilding {OUTPUT_DIR} from the frontier")
+    sink.rebuild(frontier.iter_rows())
 
 # Loop through chunks
-total_chunks = (len(fighters) + chunk_size - 1) // chunk_size
-
-for chunk_num in range(185, total_chunks):
-    city = random.choice(VPN_CITIES)
-    run_shell("nordvpn disconnect || true")
-    run_shell(f"nordvpn connect {city}")
-
-    start_idx = chunk_num * chunk_size
-    end_idx = start_idx + chunk_size
-    fighter_chunk = fighters.iloc[start_idx:end_idx].to_dict(orient="records")
+chunk_num = 0
+while True:
+    fighter_chunk = frontier.claim(chunk_size)
+    if not fighter_chunk:
+        break
 
     try:
         scrape_chunk(fighter_chunk, chunk_num)
     except Exception as e:
         print(f"🚨 Error during chunk {chunk_num+1}: {e}")
-
-    run_shell("nordvpn disconnect")
-    time.sleep(10)
+    chunk_num += 1
+
+driver_pool.close()
+sink.close()
+compact(OUTPUT_DIR, OUTPUT_DATASET)
+print(driver_pool.report())
+print(fetcher.report())
+print(fetcher.cache.report())
+print(pacer.report())
+print(metrics.report())
+metrics.close()
@@ -1,16 +1,23 @@
 import os
-import random
+import threading
 import time
 import pandas as pd
-import subprocess
-import re
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+
+from backoff import AdaptivePacer, CircuitBreaker, default_rotator
+from coordinator import (CRAWL_COORDINATOR, CRAWL_LEAD, LEASE_SECONDS, NODE_ID, PEER_POLL_SECONDS, Heartbeat,
+                         open_frontier, peers_busy)
+from crawl_pool import CrawlStats, run_pool
+from discovery import DISCOVER, Discovery, load_event_urls
+from driver_pool import DriverPool
+from fetch import Fetcher
+from fighter_registry import FighterRegistry
+from fighter_parser import MissingResults, parse_fighter_page, results_digest
+from metrics import Metrics
+from normalize import TYPED_DATASET, normalize_dataset
+from page_cache import PageCache
+from parquet_sink import ParquetSink, compact
+from rate_limiter import HostRateLimiter
 
 # VPN city pool
 VPN_CITIES = [
@@ -23,207 +30,198 @@ VPN_CITIES = [
 # Load fighter URL data
 df = pd.read_parquet("4c_unique_fighter_urls.parquet")
 fighters = df[['fighter_name', 'fighter_url']].drop_duplicates().reset_index(drop=True)
+# Every rostered fighter gets a registry id (and name) before the typed dataset refers to them;
+# only the lead node writes the registry and the datasets below, the others just scrape
+if CRAWL_LEAD:
+    registry = FighterRegistry()
+    registry.ids_for(fighters['fighter_url'].tolist(), fighters['fighter_name'].tolist())
+    registry.save()
 chunk_size = 50
-
-def run_shell(cmd):
-    print(f"\n▶️ Running: {cmd}")
-    subprocess.run(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-def clean_text(text):
-    if isinstance(text, str):
-        return text.encode('utf-8', 'ignore').decode('utf-8')
-    return text
-
-def scrape_chunk(fighter_chunk, chunk_num):
+FRONTIER_PATH = "4a_fighter_frontier.sqlite"
+# Streamed part files, compacted into one dataset partitioned by event_year at the end of a run
+BOUTS_DIR = "5a_fighter_bouts"
+BOUTS_DATASET = "5a_fighter_bouts_dataset"
+FIGHTER_RESULTS_SELECTOR = "section.fighterFightResults"
+
+# REFRESH=1: re-check every fighter already scraped. Each page is re-fetched conditionally
+# (ETag/Last-Modified, else a digest of its results section); unchanged fighters keep their
+# stored rows without being parsed or written again, changed ones are re-scraped
+REFRESH = os.environ.get("REFRESH") == "1"
+
+# Worker pool settings: WORKERS fighters in flight, at most REQUESTS_PER_SECOND page loads per host
+WORKERS = int(os.environ.get("SCRAPE_WORKERS", 4))
+REQUESTS_PER_SECOND = float(os.environ.get("SCRAPE_RATE", 0.5))
+
+# Long-lived browser sessions (one per worker), recycled every DRIVER_MAX_PAGES pages or after a crash
+DRIVER_MAX_PAGES = 50
+# Timing spans for every fetch phase, appended to crawl_spans.jsonl and exported after each chunk
+metrics = Metrics()
+driver_pool = DriverPool(size=WORKERS, max_pages=DRIVER_MAX_PAGES, metrics=metrics)
+rate_limiter = HostRateLimiter(REQUESTS_PER_SECOND)
+# Page cache, then plain HTTP; a pooled browser only when the results section needs JS
+fetcher = Fetcher(driver_pool=driver_pool, rate_limiter=rate_limiter, pool_size=WORKERS, cache=PageCache(),
+                  metrics=metrics, digest=results_digest)
+# AIMD on the rate limiter; only repeated blocks trip the breaker, which rotates the VPN city
+pacer = AdaptivePacer(rate_limiter, CircuitBreaker(rotate=default_rotator(VPN_CITIES), metrics=metrics))
+crawl_stats = CrawlStats()
+# Local frontier file, or one shared by several crawl nodes (CRAWL_COORDINATOR, see coordinator.py)
+frontier = open_frontier(FRONTIER_PATH)
+sink = ParquetSink(BOUTS_DIR) if CRAWL_LEAD else None
+refresh_counts = {'unchanged': 0, 'changed': 0}
+refresh_lock = threading.Lock()
+
+# Scrape every pro bout for one fighter and commit the result to the frontier;
+# safe to call from several worker threads
+def scrape_fighter(row):
     output = []
+    error = None
 
-    for row in fighter_chunk:
-        fighter_name = row['fighter_name']
-        fighter_url = urljoin("https://www.tapology.com", row['fighter_url'])
+    fighter_name = row['fighter_name']
+    fighter_url = row['url']
 
-        print(f"Scraping {fighter_name}: {fighter_url}")
-        row_count_before = len(output)
+    print(f"Scraping {fighter_name}: {fighter_url}")
 
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        driver = webdriver.Chrome(options=chrome_options)
+    try:
+        # Timeouts and blocks slow the pace and are retried; anything else fails the fighter
+        max_age = 0 if REFRESH else None
+        page = pacer.call(fighter_url, lambda: fetcher.fetch(fighter_url, FIGHTER_RESULTS_SELECTOR, max_age))
+
+        if REFRESH:
+            if page.unchanged and frontier.keep(fighter_url, owner=NODE_ID):
+                print(f"⏭️ {fighter_name} unchanged since the last scrape")
+                with refresh_lock:
+                    refresh_counts['unchanged'] += 1
+                return output
+            with refresh_lock:
+                refresh_counts['changed'] += 1
 
         try:
-            try:
-                driver.get(fighter_url)
-            except Exception as e:
-                print(f"Failed initial load: {e}. Switching VPN and retrying...")
-                driver.quit()
-                run_shell("nordvpn disconnect || true")
-                time.sleep(3)
-                new_city = random.choice(VPN_CITIES)
-                run_shell(f"nordvpn connect {new_city}")
-                time.sleep(5)
-
-                driver = webdriver.Chrome(options=chrome_options)
-                try:
-                    driver.get(fighter_url)
-                except Exception as e2:
-                    print(f"Retry after VPN switch also failed: {e2}")
-                    driver.quit()
-                    continue
-
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "section.fighterFightResults"))
-            )
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-
-            # Initialize defaults
-            fighter_dob = fighter_height = fighter_reach = foundation_style = 'null'
-
-            # Parse fighter bio data
-            details_container = soup.select_one('#standardDetails')
-            if details_container:
-                for div in details_container.select('div'):
-                    text = div.get_text(separator=" ", strip=True)
-
-                    # DOB
-                    dob_match = re.search(r"Date of Birth:\s*([\d]{4} [A-Za-z]{3} \d{1,2})", text)
-                    if dob_match:
-                        fighter_dob = dob_match.group(1)
-
-                    #Foundation Style
-                    style_match = re.search(r"Foundation Style:\s*([^\n]+)", text)
-                    if style_match:
-                        foundation_style = style_match.group(1).strip()
-                
-                    # Height and Reach
-                    if "Height:" in text and "Reach:" in text:
-                        height_match = re.search(r"Height:\s*([^|]+)", text)
-                        reach_match = re.search(r"Reach:\s*([^\s]+)", text)
-                        if height_match:
-                            fighter_height = height_match.group(1).strip()
-                        if reach_match:
-                            fighter_reach = reach_match.group(1).strip()
-
-            results_container = soup.select_one("section.fighterFightResults div#proResults")
-
-            if not results_container:
-                print("❌  No <div id='proResults'> found — skipping.")
-                driver.quit()
-                continue
-
-            bouts = results_container.select("div[data-fighter-bout-target='bout']")
-            print(f"✅ Found {len(bouts)} bouts")
-
-            for bout in bouts:
-                if 'Amateur Bouts' in bout.text:
-                    print("🚫 Reached 'Amateur Bouts', stopping scrape for this fighter.")
-                    break
-
-                result_div = bout.select_one("div.result div")
-                result_text = result_div.text.strip() if result_div else ''
-                if result_text not in ['W', 'L']:
-                    continue
-
-                record_span = bout.select_one("span[title='Fighter Record Before Fight']")
-                if not record_span or not re.match(r"^\d+-\d+", record_span.text.strip()):
-                    continue
-
-                opponent_tag = bout.select_one('a[href*="/fighters/"]')
-                opponent_name = opponent_tag.text.strip() if opponent_tag else 'null'
-                opponent_link = urljoin("https://www.tapology.com", opponent_tag['href']) if opponent_tag else 'null'
-
-                event_tag = bout.select_one('a[href*="/fightcenter/events/"]')
-                event_url = urljoin("https://www.tapology.com", event_tag['href']) if event_tag else 'null'
-
-                event_year = event_md = 'null'
-                date_container = bout.select_one('div.flex.flex-col.justify-around.items-center')
-
-                if date_container:
-                    spans = date_container.find_all('span')
-                    if len(spans) >= 2:
-                        event_year = spans[0].text.strip()
-                        event_md = spans[1].text.strip()
-
-                victory_details = 'null'
-                middle_col = bout.select_one("div.md\\:flex.flex-col.justify-center.gap-1\\.5")
-                if middle_col:
-                    method_tag = middle_col.select_one("a[href*='/fightcenter/bouts/']")
-                    time_div = middle_col.select_one("div.text-xs11.text-neutral-600")
-                    method_text = method_tag.text.strip() if method_tag else ''
-                    time_text = time_div.get_text(strip=True) if time_div else ''
-                    victory_details = f"{method_text} · {time_text}".strip(' ·')
-
-                duration = weight = odds = 'null'
-                bout_id = bout.get('data-bout-id')
-                if bout_id:
-                    detail_div = soup.select_one(f'#boutDetails{bout_id}')
-                    if detail_div:
-                        for t in detail_div.select('div.h-\\[34px\\]'):
-                            label_tag = t.select_one('span.font-bold')
-                            value_tag = t.select_one('span:not(.font-bold)')
-                            if not label_tag or not value_tag:
-                                continue
-                            label = label_tag.text.strip().replace(':', '')
-                            value = value_tag.text.strip()
-                            if label == 'Duration':
-                                duration = value
-                            elif label == 'Weight':
-                                weight = value
-                            elif label == 'Odds':
-                                odds = value
-
-                output.append({
-                    'original_fighter_name': clean_text(fighter_name),
-                    'original_fighter_url': clean_text(fighter_url),
-                    'fighter_dob': clean_text(fighter_dob),
-                    'fighter_height': clean_text(fighter_height),
-                    'fighter_reach': clean_text(fighter_reach),
-                    'foundational_style': clean_text(foundation_style),
-                    'fighter_reach': clean_text(fighter_reach),
-                    'opponent_name': clean_text(opponent_name),
-                    'opponent_url': clean_text(opponent_link),
-                    'event_url': clean_text(event_url),
-                    'event_year': clean_text(event_year),
-                    'event_month_day': clean_text(event_md),
-                    'duration': clean_text(duration),
-                    'weight': clean_text(weight),
-                    'odds': clean_text(odds),
-                    'victory_details': clean_text(victory_details),
-                    'result': clean_text(result_text)
-                })
-
-            new_rows = len(output) - row_count_before
-            if new_rows > 0:
-                print(f"📦 Added {new_rows} row(s) for {fighter_name}")
-            else:
-                print(f"⚠️ No valid rows scraped for {fighter_name}")
-
-        except Exception as e:
-            print(f"❌ Error scraping {fighter_url}: {e}")
-        finally:
-            driver.quit()
+            with metrics.span('parse'):
+                output = parse_fighter_page(page.html, fighter_name, fighter_url)
+        except MissingResults as e:
+            print("❌  No <div id='proResults'> found — skipping.")
+            pacer.failure(fighter_url, e)
+            frontier.fail(fighter_url, e, owner=NODE_ID)
+            error = type(e).__name__
+            return output
+
+        with metrics.span('write'):
+            # A lease that expired under us belongs to another node now; its rows are the ones kept
+            if not frontier.complete(fighter_url, output, owner=NODE_ID):
+                print(f"⌛ Lease on {fighter_url} was taken over by another node — dropping this copy")
+                return []
+            if sink is not None:
+                sink.write_rows(output)
+            if discovery is not None:
+                discovery.feed(output, row.get('depth', 0))
+
+        new_rows = len(output)
+        if new_rows > 0:
+            print(f"📦 Added {new_rows} row(s) for {fighter_name}")
+        else:
+            print(f"⚠️ No valid rows scraped for {fighter_name}")
 
-        time.sleep(random.uniform(2, 8))
-
-    filename = f"5a_final_historical_fighter_bouts_final_{(chunk_num+1)*chunk_size}.parquet"
-    pd.DataFrame(output).to_parquet(filename, index=False)
-    print(f"✅ Saved chunk {chunk_num+1} → {filename}\n")
-
-# Loop through chunks
-total_chunks = (len(fighters) + chunk_size - 1) // chunk_size
+    except Exception as e:
+        print(f"❌ Error scraping {fighter_url}: {e}")
+        frontier.fail(fighter_url, e, owner=NODE_ID)
+        error = type(e).__name__
 
-for chunk_num in range(317, total_chunks):
-    city = random.choice(VPN_CITIES)
-    run_shell("nordvpn disconnect || true")
-    run_shell(f"nordvpn connect {city}")
+    finally:
+        metrics.page(len(output), error)
 
-    start_idx = chunk_num * chunk_size
-    end_idx = start_idx + chunk_size
-    fighter_chunk = fighters.iloc[start_idx:end_idx].to_dict(orient="records")
+    return output
 
-    try:
-        scrape_chunk(fighter_chunk, chunk_num)
-    except Exception as e:
-        print(f"🚨 Error during chunk {chunk_num+1}: {e}")
+def scrape_chunk(fighter_chunk, chunk_num):
+    # Workers commit each fighter's rows to the frontier (and the lead's sink) themselves
+    for row, rows in run_pool(fighter_chunk, scrape_fighter, workers=WORKERS, stats=crawl_stats):
+        pass
+
+    print(f"✅ Finished chunk {chunk_num+1}")
+    if sink is not None:
+        sink.flush()
+        print(sink.report())
+    print(driver_pool.report())
+    print(fetcher.report())
+    print(frontier.report())
+    if discovery is not None:
+        print(discovery.report())
+    print(pacer.report())
+    print(crawl_stats.report())
+    print(metrics.report() + "\n")
+    metrics.export()
+
+# Every fighter is tracked in the frontier; a restart resumes with whatever is still pending
+frontier.add(
+    [urljoin("https://www.tapology.com", url) for url in fighters['fighter_url']],
+    [{'fighter_name': name} for name in fighters['fighter_name']],
+)
+if REFRESH and CRAWL_LEAD:
+    print(f"🔄 Refresh: re-checking {frontier.requeue_done()} fighter(s) scraped before")
+
+# A shared frontier gets a dead node's fighters back when their leases expire instead
+if not CRAWL_COORDINATOR:
+    recovered = frontier.recover()
+    if recovered:
+        print(f"♻️ Re-queued {recovered} fighter(s) left in flight by the last run")
+
+# Discovery mode: opponents of every scraped fighter are queued behind the roster, breadth-first,
+# so the claim loop below runs until the opponent graph is closed (within DISCOVER_DEPTH hops)
+discovery = Discovery(frontier, event_urls=load_event_urls()) if DISCOVER else None
+if discovery is not None:
+    backfilled = discovery.backfill()
+    if backfilled:
+        print(f"🔭 Queued {backfilled} opponent(s) of fighters scraped before discovery was on")
+
+# The part files only ever hold rows the frontier has committed; rebuild them if a crash left a gap
+if sink is not None and sink.stored_rows() != frontier.row_count():
+    print(f"♻️ Rebuilding {BOUTS_DIR} from the frontier")
+    sink.rebuild(frontier.iter_rows())
+
+# Loop through chunks, each leased to this node and kept alive by the heartbeat while it runs.
+# The lead keeps polling while other nodes still hold leases, so it merges only once they're done
+# (or their leases expire and it claims those fighters itself).
+chunk_num = 0
+with Heartbeat(frontier):
+    while True:
+        fighter_chunk = frontier.claim(chunk_size, owner=NODE_ID, lease_seconds=LEASE_SECONDS)
+        if not fighter_chunk:
+            if CRAWL_LEAD and peers_busy(frontier):
+                time.sleep(PEER_POLL_SECONDS)
+                continue
+            break
 
-    run_shell("nordvpn disconnect")
-    time.sleep(10)
+        try:
+            scrape_chunk(fighter_chunk, chunk_num)
+        except Exception as e:
+            print(f"🚨 Error during chunk {chunk_num+1}: {e}")
+        chunk_num += 1
+
+driver_pool.close()
+if sink is not None:
+    sink.close()
+    # With several nodes the frontier holds every node's rows, once per fighter: merge them in.
+    # A refresh that re-scraped anyone (on any node) left their old rows in the part files as well.
+    if CRAWL_COORDINATOR or refresh_counts['changed'] or sink.stored_rows() != frontier.row_count():
+        print(f"🔀 Merging {frontier.row_count()} row(s) from every node into {BOUTS_DIR}")
+        sink.rebuild(frontier.iter_rows())
+    compact(BOUTS_DIR, BOUTS_DATASET)
+    normalize_dataset(BOUTS_DATASET, TYPED_DATASET)
+else:
+    print(f"🤝 {NODE_ID} done; the lead node merges every node's rows into {BOUTS_DATASET}")
+print(driver_pool.report())
+print(fetcher.report())
+print(fetcher.cache.report())
+print(crawl_stats.report())
+print(f"💤 {rate_limiter.waited_seconds:.0f}s spent waiting on the rate limit")
+print(pacer.report())
+if discovery is not None:
+    print(discovery.report())
+if REFRESH:
+    # What a skipped fighter would have cost to parse and write, from this run's spans
+    phases = metrics.summary()['phases']
+    per_page = sum(phases[p]['total'] / phases[p]['count'] for p in ('parse', 'write') if p in phases)
+    print(f"⏭️ Refresh: {refresh_counts['unchanged']} unchanged fighter(s) skipped, "
+          f"{refresh_counts['changed']} re-scraped — ~{refresh_counts['unchanged'] * per_page:.1f}s of "
+          f"parsing and writing saved")
+print(metrics.report())
+metrics.close()
@@ -1,16 +1,15 @@
 import os
-import random
-import time
+import shutil
 import pandas as pd
-import subprocess
-import re
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+
+from backoff import AdaptivePacer, CircuitBreaker, default_rotator
+from driver_pool import DriverPool
+from fetch import Fetcher
+from fighter_parser import MissingResults, parse_fighter_page
+from page_cache import PageCache
+from parquet_sink import ParquetSink, compact, subset_schema
+from rate_limiter import HostRateLimiter
 
 # VPN city pool
 VPN_CITIES = [
@@ -24,140 +23,64 @@ VPN_CITIES = [
 df = pd.read_parquet("3a_winners_combined.parquet")
 fighters = df[['winner', 'winner_link']].drop_duplicates().reset_index(drop=True)
 chunk_size = 50
-
-# Function to run shell commands (cleaned up)
-def run_shell(cmd):
-    print(f"\n▶️ Running: {cmd}")
-    subprocess.run(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-def clean_text(text):
-    if isinstance(text, str):
-        return text.encode('utf-8', 'ignore').decode('utf-8')
-    return text
+OUTPUT_COLUMNS = [
+    'original_fighter_name',
+    'original_fighter_url',
+    'opponent_name',
+    'opponent_url',
+    'event_url',
+    'event_year',
+    'event_month_day',
+    'duration',
+    'weight',
+    'odds',
+    'victory_details',
+    'result',
+]
+FIGHTER_RESULTS_SELECTOR = "section.fighterFightResults"
+# Streamed part files, compacted into one dataset partitioned by event_year at the end of a run
+OUTPUT_DIR = "4b_fighter_bouts"
+OUTPUT_DATASET = "4b_fighter_bouts_dataset"
+# Starting pace; the pacer moves it between SCRAPE_MIN_RATE and SCRAPE_MAX_RATE from there
+REQUESTS_PER_SECOND = float(os.environ.get("SCRAPE_RATE", 0.2))
+
+# Long-lived browser sessions, recycled every DRIVER_MAX_PAGES pages or after a crash
+DRIVER_MAX_PAGES = 50
+driver_pool = DriverPool(size=1, max_pages=DRIVER_MAX_PAGES)
+# Page cache, then plain HTTP; the browser only when the results section needs JS
+rate_limiter = HostRateLimiter(REQUESTS_PER_SECOND)
+fetcher = Fetcher(driver_pool=driver_pool, rate_limiter=rate_limiter, cache=PageCache())
+# AIMD on the rate limiter instead of fixed sleeps; only repeated blocks rotate the VPN city
+pacer = AdaptivePacer(rate_limiter, CircuitBreaker(rotate=default_rotator(VPN_CITIES)))
+# Every run scrapes the whole list again (there is no frontier to resume from), so it starts
+# from empty parts the way the old per-chunk files were overwritten
+shutil.rmtree(OUTPUT_DIR, ignore_errors=True)
+sink = ParquetSink(OUTPUT_DIR, schema=subset_schema(OUTPUT_COLUMNS))
 
 # Main scraping logic
 def scrape_chunk(fighter_chunk, chunk_num):
-    output = []
-
     for row in fighter_chunk:
         fighter_name = row['winner']
         fighter_url = urljoin("https://www.tapology.com", row['winner_link'])
 
         print(f"Scraping {fighter_name}: {fighter_url}")
-        row_count_before = len(output)
-
-        # Initialize new driver for this fighter
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        driver = webdriver.Chrome(options=chrome_options)
 
         try:
+            # Timeouts and blocks slow the pace and are retried; anything else skips the fighter
+            page = pacer.call(fighter_url, lambda: fetcher.fetch(fighter_url, FIGHTER_RESULTS_SELECTOR))
+
             try:
-                driver.get(fighter_url)
-            except Exception as e:
-                print(f"Failed initial load: {e}. Switching VPN and retrying...")
-                driver.quit()
-                run_shell("nordvpn disconnect || true")
-                time.sleep(3)
-                new_city = random.choice(VPN_CITIES)
-                run_shell(f"nordvpn connect {new_city}")
-                time.sleep(5)
-
-                driver = webdriver.Chrome(options=chrome_options)
-                try:
-                    driver.get(fighter_url)
-                except Exception as e2:
-                    print(f"Retry after VPN switch also failed: {e2}")
-                    driver.quit()
-                    continue
-
-
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "section.fighterFightResults"))
-            )
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            results_container = soup.select_one("section.fighterFightResults div#proResults")
-
-            if not results_container:
+                rows = parse_fighter_page(page.html, fighter_name, fighter_url)
+            except MissingResults as e:
                 print("❌  No <div id='proResults'> found — skipping.")
-                driver.quit()
+                pacer.failure(fighter_url, e)
                 continue
 
-            bouts = results_container.select("div[data-fighter-bout-target='bout']")
-            print(f"✅ Found {len(bouts)} bouts")
-
-            for bout in bouts:
-                if 'Amateur Bouts' in bout.text:
-                    print("🚫 Reached 'Amateur Bouts', stopping scrape for this fighter.")
-                    break
-
-                result_div = bout.select_one("div.result div")
-                result_text = result_div.text.strip() if result_div else ''
-                if result_text not in ['W', 'L']:
-                    continue
-
-                record_span = bout.select_one("span[title='Fighter Record Before Fight']")
-                if not record_span or not re.match(r"^\d+-\d+", record_span.text.strip()):
-                    continue
-
-                opponent_tag = bout.select_one('a[href*="/fighters/"]')
-                opponent_name = opponent_tag.text.strip() if opponent_tag else 'null'
-                opponent_link = urljoin("https://www.tapology.com", opponent_tag['href']) if opponent_tag else 'null'
-
-                event_tag = bout.select_one('a[href*="/fightcenter/events/"]')
-                event_url = urljoin("https://www.tapology.com", event_tag['href']) if event_tag else 'null'
-
-                year_span = event_tag.select_one('span.font-bold') if event_tag else None
-                date_span = event_tag.select_one('span.text-neutral-600') if event_tag else None
-                event_year = year_span.text.strip() if year_span else 'null'
-                event_md = date_span.text.strip() if date_span else 'null'
-
-                victory_details = 'null'
-                middle_col = bout.select_one("div.md\\:flex.flex-col.justify-center.gap-1\\.5")
-                if middle_col:
-                    method_tag = middle_col.select_one("a[href*='/fightcenter/bouts/']")
-                    time_div = middle_col.select_one("div.text-xs11.text-neutral-600")
-                    method_text = method_tag.text.strip() if method_tag else ''
-                    time_text = time_div.get_text(strip=True) if time_div else ''
-                    victory_details = f"{method_text} · {time_text}".strip(' ·')
-
-                duration = weight = odds = 'null'
-                bout_id = bout.get('data-bout-id')
-                if bout_id:
-                    detail_div = soup.select_one(f'#boutDetails{bout_id}')
-                    if detail_div:
-                        for t in detail_div.select('div.h-\\[34px\\]'):
-                            label_tag = t.select_one('span.font-bold')
-                            value_tag = t.select_one('span:not(.font-bold)')
-                            if not label_tag or not value_tag:
-                                continue
-                            label = label_tag.text.strip().replace(':', '')
-                            value = value_tag.text.strip()
-                            if label == 'Duration':
-                                duration = value
-                            elif label == 'Weight':
-                                weight = value
-                            elif label == 'Odds':
-                                odds = value
-
-                output.append({
-                    'original_fighter_name': clean_text(fighter_name),
-                    'original_fighter_url': clean_text(fighter_url),
-                    'opponent_name': clean_text(opponent_name),
-                    'opponent_url': clean_text(opponent_link),
-                    'event_url': clean_text(event_url),
-                    'event_year': clean_text(event_year),
-                    'event_month_day': clean_text(event_md),
-                    'duration': clean_text(duration),
-                    'weight': clean_text(weight),
-                    'odds': clean_text(odds),
-                    'victory_details': clean_text(victory_details),
-                    'result': clean_text(result_text)
-                })
-
-            new_rows = len(output) - row_count_before
+            # This pass only keeps a subset of the parsed columns
+            rows = [{col: bout[col] for col in OUTPUT_COLUMNS} for bout in rows]
+            sink.write_rows(rows)
+
+            new_rows = len(rows)
             if new_rows > 0:
                 print(f"📦 Added {new_rows} row(s) for {fighter_name}")
             else:
@@ -165,23 +88,17 @@ def scrape_chunk(fighter_chunk, chunk_num):
 
         except Exception as e:
             print(f"❌ Error scraping {fighter_url}: {e}")
-        finally:
-            driver.quit()
 
-        time.sleep(random.uniform(2, 8))
-
-    filename = f"4b_fighter_bouts_{(chunk_num+1)*chunk_size}.parquet"
-    pd.DataFrame(output).to_parquet(filename, index=False)
-    print(f"✅ Saved chunk {chunk_num+1} → {filename}\n")
+    sink.flush()
+    print(f"✅ Finished chunk {chunk_num+1}")
+    print(sink.report())
+    print(driver_pool.report())
+    print(pacer.report() + "\n")
 
 # Loop through chunks
 total_chunks = (len(fighters) + chunk_size - 1) // chunk_size
 
 for chunk_num in range(total_chunks):
-    city = random.choice(VPN_CITIES)
-    run_shell("nordvpn disconnect || true")
-    run_shell(f"nordvpn connect {city}")
-
     start_idx = chunk_num * chunk_size
     end_idx = start_idx + chunk_size
     fighter_chunk = fighters.iloc[start_idx:end_idx].to_dict(orient="records")
@@ -191,5 +108,10 @@ for chunk_num in range(total_chunks):
     except Exception as e:
         print(f"🚨 Error during chunk {chunk_num+1}: {e}")
 
-    run_shell("nordvpn disconnect")
-    time.sleep(10)
+driver_pool.close()
+sink.close()
+compact(OUTPUT_DIR, OUTPUT_DATASET)
+print(driver_pool.report())
+print(fetcher.report())
+print(fetcher.cache.report())
+print(pacer.report())
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import random
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+from fake_useragent import UserAgent
+
+from fetch import BLOCK_STATUSES, OFFLINE, Blocked, CacheMiss, Page, ServerError, site_url
+from metrics import timed
+
+# Connections kept open to one host at a time; the rate limiter still decides how often they are used
+PER_HOST = int(os.environ.get("ASYNC_PER_HOST", 4))
+RETRIES = 3
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+# Statuses worth another try after a pause (Retry-After when the server gives one)
+RETRY_STATUSES = {403, 429, 500, 502, 503, 504}
+
+
+class SelectorMissing(LookupError):
+    pass
+
+
+class BadStatus(RuntimeError):
+    def __init__(self, url, status):
+        super().__init__(f"{url} answered {status}")
+        self.status = status
+
+
+class AsyncFetcher:
+    # Asyncio counterpart of fetch.Fetcher for the listing and event crawlers: one pooled
+    # aiohttp session, at most `per_host` requests in flight per host, the same shared
+    # HostRateLimiter and PageCache, per-request timeouts, and retries with jittered
+    # exponential backoff (honouring Retry-After). Pages whose selector only appears after
+    # JS runs go to `fallback`, a blocking Fetcher with a driver pool, on a worker thread.
+    def __init__(self, rate_limiter=None, per_host=PER_HOST, timeout=20, retries=RETRIES, cache=None,
+                 offline=OFFLINE, fallback=None, pacer=None, metrics=None):
+        self.rate_limiter = rate_limiter
+        self.per_host = per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.cache = cache
+        self.offline = offline
+        self.fallback = fallback
+        self.pacer = pacer
+        self.metrics = metrics
+        self.session = None
+        self._slots = {}
+
+        self.counts = {'cache': 0, 'http': 0, 'browser': 0}
+        self.seconds = {'cache': 0.0, 'http': 0.0, 'browser': 0.0}
+        self.retried = 0
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit_per_host=self.per_host, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(
+            connector=connector, timeout=self.timeout,
+            headers={'User-Agent': UserAgent().random, 'Accept-Encoding': 'gzip, deflate'},
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def _slot(self, url):
+        host = urlparse(url).netloc
+        if host not in self._slots:
+            self._slots[host] = asyncio.Semaphore(self.per_host)
+        return self._slots[host]
+
+    def _record(self, source, seconds):
+        self.counts[source] += 1
+        self.seconds[source] += seconds
+
+    # Rate-limited GET with retries; returns the body text of a 200
+    async def get(self, url):
+        target = site_url(url)
+        for attempt in range(1, self.retries + 1):
+            async with self._slot(target):
+                if self.rate_limiter:
+                    waited = await self.rate_limiter.wait_async(target)
+                    if self.metrics is not None:
+                        self.metrics.record('rate_wait', waited)
+                try:
+                    with timed(self.metrics, 'http'):
+                        async with self.session.get(target) as response:
+                            status = response.status
+                            retry_after = response.headers.get('Retry-After', '')
+                            text = await response.text() if status == 200 else None
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if self.pacer is not None:
+                        self.pacer.failure(url, e)
+                    if attempt == self.retries:
+                        raise
+                    status, retry_after, text = None, '', None
+
+            if status == 200:
+                if self.pacer is not None:
+                    self.pacer.success(url)
+                return text
+            if status is not None and status not in RETRY_STATUSES:
+                raise BadStatus(url, status)
+            if status in BLOCK_STATUSES:
+                blocked = Blocked(f"{url} answered {status}", status, float(retry_after) if retry_after.isdigit() else None)
+                if self.pacer is not None:
+                    self.pacer.failure(url, blocked)
+                if attempt == self.retries:
+                    raise blocked
+            else:
+                if status is not None and self.pacer is not None:
+                    self.pacer.failure(url, ServerError(f"{url} answered {status}", status))
+                if attempt == self.retries:
+                    raise BadStatus(url, status)
+
+            self.retried += 1
+            delay = float(retry_after) if retry_after.isdigit() else RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+            await asyncio.sleep(min(delay, RETRY_MAX_SECONDS) * random.uniform(1.0, 1.5))
+
+    # Same contract as Fetcher.fetch: cache, then HTTP, then the browser fallback
+    async def fetch(self, url, selector=None, max_age=None):
+        start = time.perf_counter()
+        if self.cache is not None:
+            with timed(self.metrics, 'cache'):
+                html = self.cache.get(url, max_age=float('inf') if self.offline else max_age)
+            if html is not None:
+                page = Page(url, html, 'cache', time.perf_counter() - start)
+                self._record('cache', page.seconds)
+                return page
+        if self.offline:
+            raise CacheMiss(f"{url} is not in the page cache")
+
+        page = Page(url, await self.get(url), 'http', 0.0)
+        if selector is not None and page.soup.select_one(selector) is None:
+            if self.fallback is None:
+                raise SelectorMissing(f"{url} has no {selector!r} without JS and there is no browser fallback")
+            page = await asyncio.to_thread(self.fallback.fetch_browser, url, selector)
+            self._record('browser', page.seconds)
+            return page
+
+        page.seconds = time.perf_counter() - start
+        self._record('http', page.seconds)
+        if self.cache is not None:
+            self.cache.put(url, page.html)
+        return page
+
+    # fetch() for every URL, `concurrency` at a time; yields (url, page or exception) as each finishes
+    async def fetch_all(self, urls, selector=None, max_age=None, concurrency=None):
+        urls = list(urls)
+        queue = asyncio.Queue()
+        for url in urls:
+            queue.put_nowait(url)
+        done = asyncio.Queue()
+
+        async def worker():
+            while True:
+                try:
+                    url = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    result = await self.fetch(url, selector, max_age)
+                except Exception as e:
+                    result = e
+                await done.put((url, result))
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency or self.per_host)]
+        for _ in urls:
+            yield await done.get()
+        await asyncio.gather(*workers)
+
+    # fetch() for every URL, results (page or exception) in the order given
+    async def fetch_many(self, urls, selector=None, max_age=None):
+        return await asyncio.gather(*(self.fetch(url, selector, max_age) for url in urls), return_exceptions=True)
+
+    def report(self):
+        parts = []
+        for source in ('cache', 'http', 'browser'):
+            count = self.counts[source]
+            avg = self.seconds[source] / count if count else 0.0
+            parts.append(f"{source} {count} (avg {avg:.2f}s)")
+        return f"🌐 Async fetch paths: {', '.join(parts)} — {self.retried} retried request(s)"
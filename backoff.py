@@ -0,0 +1,247 @@
+import os
+import random
+import subprocess
+import threading
+import time
+
+import requests
+from selenium.common.exceptions import TimeoutException
+
+from fetch import Blocked, CacheMiss, ServerError, site_url
+from fighter_parser import MissingResults
+
+# Pacing bounds (page loads per second per host) and the AIMD steps between them
+MIN_RATE = float(os.environ.get("SCRAPE_MIN_RATE", 0.05))
+MAX_RATE = float(os.environ.get("SCRAPE_MAX_RATE", 2.0))
+RATE_INCREASE = float(os.environ.get("SCRAPE_RATE_INCREASE", 0.02))
+TIMEOUT_DECREASE = 0.5
+BLOCKED_DECREASE = 0.25
+
+# Blocks within BREAKER_WINDOW seconds that open the breaker, and how long it stays open
+BREAKER_THRESHOLD = int(os.environ.get("BREAKER_THRESHOLD", 2))
+BREAKER_WINDOW = 120.0
+BREAKER_COOLDOWN = float(os.environ.get("BREAKER_COOLDOWN", 60))
+BREAKER_MAX_COOLDOWN = 900.0
+
+# EGRESS_ROTATE=none keeps the current connection when the breaker trips
+EGRESS_ROTATE = os.environ.get("EGRESS_ROTATE", "nordvpn")
+
+OK = 'ok'
+TIMEOUT = 'timeout'
+BLOCKED = 'blocked'
+SERVER_ERROR = 'server_error'
+PARSE_MISS = 'parse_miss'
+ERROR = 'error'
+# Worth another attempt after pacing down (and, for blocks, after the breaker has reset)
+RETRYABLE = {TIMEOUT, BLOCKED, SERVER_ERROR}
+
+
+# What a failed fetch or parse says about our pacing
+def classify(exc):
+    if isinstance(exc, Blocked):
+        return BLOCKED
+    if isinstance(exc, (TimeoutException, requests.Timeout, TimeoutError)):
+        return TIMEOUT
+    if isinstance(exc, ServerError):
+        return SERVER_ERROR
+    if isinstance(exc, MissingResults):
+        return PARSE_MISS
+    return ERROR
+
+
+def run_shell(cmd):
+    print(f"\n▶️ Running: {cmd}")
+    subprocess.run(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+# Egress rotation through the NordVPN CLI: a fresh random city each time
+def nordvpn_rotator(cities, settle_seconds=5):
+    def rotate():
+        run_shell("nordvpn disconnect || true")
+        run_shell(f"nordvpn connect {random.choice(cities)}")
+        time.sleep(settle_seconds)
+    return rotate
+
+
+def no_rotation():
+    pass
+
+
+def default_rotator(cities):
+    return nordvpn_rotator(cities) if EGRESS_ROTATE == "nordvpn" else no_rotation
+
+
+class CircuitBreaker:
+    # Closed until `threshold` blocks land within `window` seconds; then open: every caller
+    # waits out the cooldown, the egress is rotated once, and a single probe goes through
+    # (half-open). A successful probe closes the breaker; another block re-opens it with
+    # the cooldown doubled, up to `max_cooldown`.
+    def __init__(self, rotate=no_rotation, threshold=BREAKER_THRESHOLD, window=BREAKER_WINDOW,
+                 cooldown=BREAKER_COOLDOWN, max_cooldown=BREAKER_MAX_COOLDOWN, metrics=None, sleep=time.sleep):
+        self.rotate = rotate
+        self.threshold = threshold
+        self.window = window
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.metrics = metrics
+        self._sleep = sleep
+        self._cond = threading.Condition()
+        self._blocks = []
+        self._opened_at = None
+        self._probing = False
+
+        self.trips = 0
+        self.rotations = 0
+        self.waited_seconds = 0.0
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        return 'half-open' if self._probing else 'open'
+
+    # Block until a request may go out; the first caller past the cooldown rotates egress
+    def wait(self):
+        started = time.monotonic()
+        with self._cond:
+            while self._opened_at is not None:
+                if self._probing:
+                    self._cond.wait(1.0)
+                    continue
+                remaining = self._opened_at + self.cooldown - time.monotonic()
+                if remaining > 0:
+                    self._cond.release()
+                    try:
+                        self._sleep(min(remaining, 5.0))
+                    finally:
+                        self._cond.acquire()
+                    continue
+                self._probing = True
+                self._cond.release()
+                try:
+                    rotated = time.perf_counter()
+                    self.rotate()
+                    if self.metrics is not None:
+                        self.metrics.record('vpn', time.perf_counter() - rotated)
+                finally:
+                    self._cond.acquire()
+                self.rotations += 1
+                break
+            waited = time.monotonic() - started
+            self.waited_seconds += waited
+        if waited > 0.01 and self.metrics is not None:
+            self.metrics.record('breaker_wait', waited)
+        return waited
+
+    def success(self):
+        with self._cond:
+            if self._opened_at is not None and self._probing:
+                self._opened_at = None
+                self._probing = False
+                self.cooldown = self.base_cooldown
+                self._blocks.clear()
+                print("🟢 Circuit breaker closed")
+                self._cond.notify_all()
+
+    def blocked(self, retry_after=None):
+        now = time.monotonic()
+        with self._cond:
+            if self._probing:
+                # The probe after a rotation was blocked too: back off harder
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self._open(now, retry_after)
+                return
+            if self._opened_at is not None:
+                return
+            self._blocks = [t for t in self._blocks if now - t < self.window] + [now]
+            if len(self._blocks) >= self.threshold:
+                self._open(now, retry_after)
+
+    def _open(self, now, retry_after):
+        self._opened_at = now
+        self._probing = False
+        if retry_after:
+            self.cooldown = min(max(self.cooldown, retry_after), self.max_cooldown)
+        self.trips += 1
+        print(f"🔴 Circuit breaker open for {self.cooldown:.0f}s after repeated blocks")
+        self._cond.notify_all()
+
+
+class AdaptivePacer:
+    # AIMD over the per-host token buckets of a HostRateLimiter: every success adds
+    # `increase` page loads/s, a timeout or 5xx halves the rate and a block quarters it, within
+    # [min_rate, max_rate]. Blocks also feed the circuit breaker. Parse misses are counted
+    # but leave the pacing alone: a page without results is the page, not the pace.
+    def __init__(self, rate_limiter, breaker=None, min_rate=MIN_RATE, max_rate=MAX_RATE,
+                 increase=RATE_INCREASE, timeout_decrease=TIMEOUT_DECREASE, blocked_decrease=BLOCKED_DECREASE):
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = {TIMEOUT: timeout_decrease, SERVER_ERROR: timeout_decrease, BLOCKED: blocked_decrease}
+        self._lock = threading.Lock()
+        self.outcomes = {OK: 0, TIMEOUT: 0, SERVER_ERROR: 0, BLOCKED: 0, PARSE_MISS: 0, ERROR: 0}
+
+    # The bucket fetches of `url` wait on: the host they go to, which is the replay or
+    # override host when TAPOLOGY_BASE_URL is set
+    def _bucket(self, url):
+        return self.rate_limiter.bucket(site_url(url))
+
+    def _adjust(self, url, factor=None):
+        bucket = self._bucket(url)
+        rate = bucket.rate * factor if factor is not None else bucket.rate + self.increase
+        bucket.set_rate(min(self.max_rate, max(self.min_rate, rate)))
+
+    def success(self, url):
+        with self._lock:
+            self.outcomes[OK] += 1
+            self._adjust(url)
+        self.breaker.success()
+
+    # Record a failure; returns its kind
+    def failure(self, url, exc):
+        kind = classify(exc)
+        with self._lock:
+            self.outcomes[kind] += 1
+            if kind in self.decrease:
+                self._adjust(url, self.decrease[kind])
+        if kind == BLOCKED:
+            self.breaker.blocked(getattr(exc, 'retry_after', None))
+        else:
+            # Not blocked is all a half-open probe has to prove
+            self.breaker.success()
+        return kind
+
+    # fetch() under the pacer: waits out an open breaker, paces down and retries timeouts and
+    # blocks up to `attempts` times, and re-raises anything else (CacheMiss included) at once
+    def call(self, url, fetch, attempts=3):
+        for attempt in range(1, attempts + 1):
+            self.breaker.wait()
+            try:
+                result = fetch()
+            except CacheMiss:
+                raise
+            except Exception as e:
+                kind = self.failure(url, e)
+                if kind not in RETRYABLE or attempt == attempts:
+                    raise
+                print(f"🐢 {kind} on {url} (attempt {attempt}/{attempts}), now {self.rate(url):.2f} page(s)/s")
+                continue
+            # Cache hits say nothing about how the site copes with our pace
+            if getattr(result, 'source', None) != 'cache':
+                self.success(url)
+            return result
+
+    def rate(self, url):
+        return self._bucket(url).rate
+
+    def report(self):
+        rates = ", ".join(f"{host} {rate:.2f}/s" for host, rate in self.rate_limiter.rates().items())
+        outcomes = ", ".join(f"{kind} {n}" for kind, n in self.outcomes.items())
+        return (
+            f"🚦 Pacing: {rates or 'no requests yet'} — {outcomes} — breaker {self.breaker.state}, "
+            f"{self.breaker.trips} trip(s), {self.breaker.rotations} rotation(s), "
+            f"{self.breaker.waited_seconds:.0f}s waited"
+        )
@@ -0,0 +1,55 @@
+import argparse
+import time
+
+from fighter_parser import MissingResults, parse_fighter_page
+from reparse import find_pages, read_page
+
+BACKENDS = ['html.parser', 'lxml']
+
+
+# Parse every saved page with both backends, check the rows match, and time each backend
+def bench(pages, repeat=3):
+    html_pages = [(url, read_page(path)) for url, path in pages]
+    print(f"Loaded {len(html_pages)} saved fighter page(s)")
+
+    # Pages without a results section parse to no rows on both backends
+    def rows_for(html, url, backend):
+        try:
+            return parse_fighter_page(html, "Unknown", url, backend=backend)
+        except MissingResults:
+            return []
+
+    mismatches = 0
+    for url, html in html_pages:
+        if rows_for(html, url, 'lxml') != rows_for(html, url, 'html.parser'):
+            mismatches += 1
+            print(f"❌ Row mismatch for {url}")
+
+    timings = {}
+    for backend in BACKENDS:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = 0
+            for url, html in html_pages:
+                rows += len(rows_for(html, url, backend))
+            best = min(best, time.perf_counter() - start)
+        timings[backend] = best
+        per_page = best / len(html_pages) * 1000 if html_pages else 0.0
+        print(f"{backend:>12}: {best:.2f}s total, {per_page:.1f} ms/page, {rows} row(s)")
+
+    if timings.get('lxml'):
+        print(f"⚡ lxml speedup: {timings['html.parser'] / timings['lxml']:.1f}x")
+    print("✅ Rows identical across backends" if not mismatches else f"⚠️ {mismatches} page(s) differ")
+    return timings, mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare html.parser and lxml fighter-page parsing")
+    parser.add_argument("--cache-dir", help="page cache to read (default: PAGE_CACHE_DIR)")
+    parser.add_argument("--pages-dir", help="directory of saved <fighter-slug>.html[.gz] pages instead of the cache")
+    parser.add_argument("--limit", type=int, default=200, help="number of pages to benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    bench(find_pages(args.cache_dir, args.pages_dir)[:args.limit], args.repeat)
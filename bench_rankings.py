@@ -0,0 +1,65 @@
+import argparse
+import time
+
+import numpy as np
+
+from fighter_graph import BOUTS_DATASET, build_graph
+from rankings import RANKERS
+
+
+# One PageRank iteration as plain Python loops over the edges, for scale
+def python_loop_iteration(graph, x, damping=0.85):
+    n = graph.num_fighters
+    y = [0.0] * n
+    degree = graph.out_degree().tolist()
+    indptr, indices = graph.indptr.tolist(), graph.indices.tolist()
+    dangling = 0.0
+    for source in range(n):
+        if degree[source] == 0:
+            dangling += x[source]
+            continue
+        share = x[source] / degree[source]
+        for edge in range(indptr[source], indptr[source + 1]):
+            y[indices[edge]] += share
+    return [damping * (v + dangling / n) + (1.0 - damping) / n for v in y]
+
+
+# Time every ranking cold, then warm-started from the rankings of the graph as it stood
+# `days` earlier, the way a weekly update would run
+def bench(path, days=7):
+    start = time.perf_counter()
+    graph = build_graph(path)
+    print(f"{graph.report()} — built in {time.perf_counter() - start:.2f}s")
+
+    known = ~np.isnat(graph.dates)
+    cutoff = graph.dates[known].max() - np.timedelta64(days, 'D')
+    earlier = graph.subgraph(~known | (graph.dates <= cutoff))
+    print(f"Warm start from the graph as of {cutoff} ({graph.num_edges - earlier.num_edges} newer edge(s))\n")
+
+    for name, ranker in RANKERS.items():
+        cold = ranker(graph)
+        previous = ranker(earlier)
+        warm = ranker(graph, start=previous)
+        gap = np.abs(cold.scores - warm.scores).sum()
+        print(
+            f"{name:>20}: cold {cold.iterations:>4} it {cold.seconds * 1000:7.1f} ms | "
+            f"warm {warm.iterations:>4} it {warm.seconds * 1000:7.1f} ms | L1 gap {gap:.1e}"
+        )
+
+    x = [1.0 / graph.num_fighters] * graph.num_fighters
+    start = time.perf_counter()
+    python_loop_iteration(graph, x)
+    loop = time.perf_counter() - start
+    cold = RANKERS['pagerank'](graph)
+    per_iteration = cold.seconds / cold.iterations
+    print(f"\n🐍 One Python-loop PageRank iteration: {loop * 1000:.1f} ms vs {per_iteration * 1000:.2f} ms vectorised "
+          f"({loop / per_iteration:.0f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the fighter rankings on the full bout dataset")
+    parser.add_argument("path", nargs="?", default=BOUTS_DATASET, help="bout dataset, part directory or Parquet file")
+    parser.add_argument("--days", type=int, default=7, help="age of the previous ranking used for the warm start")
+    args = parser.parse_args()
+
+    bench(args.path, args.days)
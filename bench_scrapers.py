@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+import replay_server
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+RESULTS = "bench_results.jsonl"
+# A stage whose pages/sec drops by more than this share against the baseline is a regression
+TOLERANCE = 0.2
+
+
+# Each stage's inputs come from the stage before it, the way the pipeline hands them on
+def prepare_events(workdir):
+    pd.read_parquet(os.path.join(workdir, "scraped_urls.parquet")).to_parquet(
+        os.path.join(workdir, "2a_ufc_events.parquet"), index=False)
+
+
+def prepare_roster(workdir):
+    winners = pd.read_parquet(os.path.join(workdir, "3a_winners_combined.parquet"))
+    winners.rename(columns={'winner': 'fighter_name', 'winner_link': 'fighter_url'})[
+        ['fighter_name', 'fighter_url']].to_parquet(os.path.join(workdir, "4c_unique_fighter_urls.parquet"), index=False)
+
+
+def prepare_rescrape(workdir):
+    roster = pd.read_parquet(os.path.join(workdir, "4c_unique_fighter_urls.parquet"))
+    roster.rename(columns={'fighter_url': 'original_fighter_url'})[['original_fighter_url']].to_parquet(
+        os.path.join(workdir, "rescrape_urls.parquet"), index=False)
+
+
+def parquet_rows(path):
+    return ds.dataset(path, format='parquet').count_rows() if os.path.exists(path) else 0
+
+
+# name -> (script, prepare(workdir) or None, rows(workdir))
+STAGES = {
+    '1': ("1_ufc_events.py", None, lambda d: parquet_rows(os.path.join(d, "scraped_urls.parquet"))),
+    '2': ("2_winner_scrape.py", prepare_events, lambda d: parquet_rows(os.path.join(d, "3a_winners_combined.parquet"))),
+    '4a': ("4a_winners_wins_official.py", prepare_roster,
+           lambda d: parquet_rows(os.path.join(d, "5a_fighter_bouts_dataset"))),
+    '4a2': ("4a2_winners_append.py", prepare_rescrape,
+            lambda d: parquet_rows(os.path.join(d, "5a_rescrape_output_dataset"))),
+}
+
+
+def server_stats(server):
+    with urllib.request.urlopen(server.base_url + "/__stats") as response:
+        return json.load(response)
+
+
+# Run one pipeline script as a child process against the replay server, with a fresh page
+# cache so every page goes over the network; CPU time and peak RSS come from wait4()
+def run_stage(name, workdir, server, rate, log):
+    script, prepare, rows = STAGES[name]
+    if prepare is not None:
+        prepare(workdir)
+    env = dict(
+        os.environ,
+        TAPOLOGY_BASE_URL=server.base_url,
+        PAGE_CACHE_DIR=os.path.join(workdir, f"page_cache_{name}"),
+        SCRAPE_RATE=str(rate),
+        SCRAPE_MAX_RATE=str(rate),
+        EGRESS_ROTATE="none",
+        PYTHONPATH=REPO + os.pathsep + os.environ.get("PYTHONPATH", ""),
+    )
+
+    before = server_stats(server)
+    start = time.perf_counter()
+    child = subprocess.Popen([sys.executable, os.path.join(REPO, script)], cwd=workdir, env=env, stdout=log, stderr=log)
+    _, status, usage = os.wait4(child.pid, 0)
+    child.returncode = os.waitstatus_to_exitcode(status)
+    seconds = time.perf_counter() - start
+    after = server_stats(server)
+
+    pages = after['served'] - before['served']
+    cpu = usage.ru_utime + usage.ru_stime
+    return {
+        'stage': name,
+        'exit_code': child.returncode,
+        'pages': pages,
+        'failed_requests': sum(after[k] - before[k] for k in ('missing', 'errors', 'throttled', 'hung')),
+        'seconds': round(seconds, 3),
+        'pages_per_sec': round(pages / seconds, 3) if seconds else 0.0,
+        'cpu_ms_per_page': round(cpu / pages * 1000, 2) if pages else None,
+        'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),
+        'rows': rows(workdir),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True,
+                              text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+# The most recent recorded result for every stage under the same settings, to compare a run against
+def load_baseline(path, config):
+    baseline = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                result = json.loads(line)
+                if all(result.get(key) == value for key, value in config.items()):
+                    baseline[result['stage']] = result
+    return baseline
+
+
+def report(results, baseline, tolerance=TOLERANCE):
+    regressions = []
+    print(f"{'stage':<6}{'pages':>7}{'secs':>9}{'pages/s':>9}{'cpu ms/pg':>11}{'rss MB':>8}{'rows':>8}  vs baseline")
+    for r in results:
+        base = baseline.get(r['stage'])
+        change = ""
+        if base and base.get('pages_per_sec'):
+            delta = r['pages_per_sec'] / base['pages_per_sec'] - 1
+            change = f"{delta:+.0%} ({base.get('revision') or '?'})"
+            if delta < -tolerance:
+                regressions.append(r['stage'])
+                change += " ⚠️ regression"
+        cpu = f"{r['cpu_ms_per_page']:.1f}" if r['cpu_ms_per_page'] is not None else "-"
+        print(f"{r['stage']:<6}{r['pages']:>7}{r['seconds']:>9.2f}{r['pages_per_sec']:>9.2f}{cpu:>11}"
+              f"{r['peak_rss_mb']:>8.0f}{r['rows']:>8}  {change}")
+        if r['exit_code'] != 0:
+            print(f"❌ Stage {r['stage']} exited with {r['exit_code']}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scraper pipelines against the replay server")
+    parser.add_argument("--corpus", help="page cache to replay (default: a synthetic corpus in a temp dir)")
+    parser.add_argument("--stages", default="1,2,4a,4a2", help="comma-separated stages, in pipeline order")
+    parser.add_argument("--rate", type=float, default=50.0, help="requests/sec the scrapers are allowed")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=30.0)
+    parser.add_argument("--results", default=RESULTS, help="JSONL file results are appended to and compared with")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--no-record", action="store_true", help="compare only, don't append this run")
+    parser.add_argument("--keep", action="store_true", help="keep the work directory (outputs and logs)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_scrapers_")
+    corpus = args.corpus
+    if corpus is None:
+        corpus = os.path.join(workdir, "corpus")
+        print(f"🧪 Synthetic corpus: {replay_server.synthesize_corpus(corpus)} page(s)")
+    server = replay_server.start(
+        cache_dir=corpus, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, hang_rate=args.hang_rate, hang_seconds=args.hang_seconds, seed=0,
+    )
+    print(f"📼 Replaying {len(server.pages)} page(s) at {server.base_url}")
+
+    results = []
+    with open(os.path.join(workdir, "stages.log"), 'w') as log:
+        for name in args.stages.split(","):
+            print(f"▶️ Stage {name}: {STAGES[name][0]}")
+            results.append(run_stage(name, workdir, server, args.rate, log))
+            if results[-1]['exit_code'] != 0:
+                break
+    server.shutdown()
+
+    # Only runs with the same corpus, pace and injected faults are comparable
+    config = {
+        'corpus': args.corpus or 'synthetic', 'rate': args.rate, 'latency': args.latency, 'jitter': args.jitter,
+        'error_rate': args.error_rate, 'throttle_rate': args.throttle_rate, 'hang_rate': args.hang_rate,
+    }
+    regressions = report(results, load_baseline(args.results, config), args.tolerance)
+    if not args.no_record:
+        revision, now = git_revision(), time.strftime('%Y-%m-%dT%H:%M:%S')
+        with open(args.results, 'a') as f:
+            for r in results:
+                f.write(json.dumps(dict(r, **config, revision=revision, recorded_at=now)) + "\n")
+        print(f"✅ Results appended to {args.results}")
+
+    if args.keep:
+        print(f"📁 Outputs and logs in {workdir}")
+    else:
+        shutil.rmtree(workdir)
+    if regressions or any(r['exit_code'] != 0 for r in results):
+        sys.exit(1)
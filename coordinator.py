@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+
+from frontier import Frontier
+
+# Where the crawl frontier lives when several nodes share one crawl:
+#   unset                      this node's own frontier file (single-node, as before)
+#   sqlite:///shared/path.db   a SQLite file every node can open (same host or a shared disk)
+#   tcp://host:port            a frontier served by `python coordinator.py serve`
+CRAWL_COORDINATOR = os.environ.get("CRAWL_COORDINATOR")
+# Name this node's leases go under, and how long one lasts without a heartbeat
+NODE_ID = os.environ.get("CRAWL_NODE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+LEASE_SECONDS = float(os.environ.get("CRAWL_LEASE_SECONDS", 300))
+# The one node that does a crawl's whole-frontier steps: re-queueing for a refresh at the start,
+# and once every node's leases are settled, merging the rows into the shared outputs. A node
+# of its own is always the lead; with CRAWL_COORDINATOR set, start exactly one with CRAWL_LEAD=1.
+CRAWL_LEAD = os.environ.get("CRAWL_LEAD", "0" if CRAWL_COORDINATOR else "1") == "1"
+PEER_POLL_SECONDS = 10.0
+
+# Frontier methods the TCP service answers; the iterators are streamed one item per line
+METHODS = {'add', 'claim', 'heartbeat', 'complete', 'keep', 'fail', 'recover', 'requeue_unproductive',
+           'requeue_done', 'counts', 'row_count', 'urls', 'report'}
+STREAMS = {'iter_rows', 'iter_results'}
+
+
+class FrontierHandler(socketserver.StreamRequestHandler):
+    # One JSON request per line: {"method": ..., "args": [...], "kwargs": {...}}, answered by
+    # {"result": ...} or {"error": ...}; a stream answers {"item": ...} lines, then {"end": true}
+    def handle(self):
+        frontier = self.server.frontier
+        for line in self.rfile:
+            request = json.loads(line)
+            method = request.get('method')
+            try:
+                if method in STREAMS:
+                    for item in getattr(frontier, method)(*request.get('args', ()), **request.get('kwargs', {})):
+                        self._send({'item': item})
+                    self._send({'end': True})
+                    continue
+                if method not in METHODS:
+                    raise AttributeError(f"unknown frontier method {method!r}")
+                result = getattr(frontier, method)(*request.get('args', ()), **request.get('kwargs', {}))
+                self._send({'result': result})
+            except Exception as e:
+                self._send({'error': f"{type(e).__name__}: {e}"})
+
+    def _send(self, message):
+        self.wfile.write(json.dumps(message).encode() + b"\n")
+
+
+class FrontierServer(socketserver.ThreadingTCPServer):
+    # A Frontier served over TCP, so nodes without a shared disk can lease work from one place
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, frontier):
+        super().__init__(address, FrontierHandler)
+        self.frontier = frontier
+
+
+class RemoteFrontier:
+    # Client side of FrontierServer with the Frontier interface the crawlers use; one
+    # connection, shared by the node's threads under a lock
+    def __init__(self, host, port, timeout=60):
+        self.address = (host, port)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._connect()
+
+    def _connect(self):
+        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._file = self._sock.makefile('rwb')
+
+    # Anything JSON has no type for (e.g. the exception handed to fail()) goes over as its text
+    def _send(self, method, args, kwargs):
+        request = json.dumps({'method': method, 'args': args, 'kwargs': kwargs}, default=str)
+        self._file.write(request.encode() + b"\n")
+        self._file.flush()
+
+    def _receive(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError(f"coordinator at {self.address[0]}:{self.address[1]} closed the connection")
+        message = json.loads(line)
+        if 'error' in message:
+            raise RuntimeError(f"coordinator: {message['error']}")
+        return message
+
+    def _call(self, method, *args, **kwargs):
+        with self._lock:
+            self._send(method, args, kwargs)
+            return self._receive()['result']
+
+    def _stream(self, method):
+        # Read the whole stream under the lock; other threads get the connection back afterwards
+        items = []
+        with self._lock:
+            self._send(method, [], {})
+            while True:
+                message = self._receive()
+                if message.get('end'):
+                    return items
+                items.append(message['item'])
+
+    def __getattr__(self, method):
+        if method in METHODS:
+            return lambda *args, **kwargs: self._call(method, *args, **kwargs)
+        raise AttributeError(method)
+
+    def iter_rows(self):
+        return iter(self._stream('iter_rows'))
+
+    def iter_results(self):
+        return iter(tuple(item) for item in self._stream('iter_results'))
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+
+# The frontier a crawl should use: its own file at `path` unless CRAWL_COORDINATOR points
+# at a shared one
+def open_frontier(path, coordinator=CRAWL_COORDINATOR):
+    if not coordinator:
+        return Frontier(path)
+    target = urlparse(coordinator)
+    if target.scheme == 'sqlite':
+        return Frontier(target.path)
+    if target.scheme == 'tcp':
+        return RemoteFrontier(target.hostname, target.port)
+    raise ValueError(f"CRAWL_COORDINATOR must be sqlite:///<path> or tcp://<host>:<port>, not {coordinator!r}")
+
+
+# Whether URLs are still leased to some node, so the lead should wait (and claim again,
+# to pick up the leases of a node that died) before merging
+def peers_busy(frontier):
+    return frontier.counts()['in_flight'] > 0
+
+
+class Heartbeat:
+    # Renews this node's leases every `lease_seconds / 3` on a daemon thread while the crawl
+    # runs, so only a node that has died (or hung) loses its URLs to the others
+    def __init__(self, frontier, owner=NODE_ID, lease_seconds=LEASE_SECONDS):
+        self.frontier = frontier
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.beats = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                self.frontier.heartbeat(self.owner, self.lease_seconds)
+                self.beats += 1
+            except Exception as e:
+                self.failures += 1
+                print(f"💔 Heartbeat for {self.owner} failed: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a crawl frontier to several crawl nodes over TCP")
+    parser.add_argument("command", choices=["serve", "status"])
+    parser.add_argument("frontier", help="frontier SQLite file, e.g. 4a_fighter_frontier.sqlite")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (0.0.0.0 for other machines)")
+    parser.add_argument("--port", type=int, default=8750)
+    args = parser.parse_args()
+
+    frontier = Frontier(args.frontier)
+    print(frontier.report())
+    if args.command == "serve":
+        server = FrontierServer((args.host, args.port), frontier)
+        print(f"🛰️ Serving {args.frontier} on tcp://{args.host}:{args.port}")
+        print(f"   run crawl nodes with CRAWL_COORDINATOR=tcp://<this host>:{args.port}")
+        print("   and exactly one of them with CRAWL_LEAD=1 to merge the results")
+        server.serve_forever()
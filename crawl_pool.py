@@ -0,0 +1,50 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class CrawlStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.pages = 0
+        self.errors = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def record(self, rows=0, error=False):
+        with self._lock:
+            self.pages += 1
+            self.rows += rows
+            if error:
+                self.errors += 1
+
+    def pages_per_minute(self):
+        elapsed = time.monotonic() - self.started
+        return self.pages / elapsed * 60 if elapsed > 0 else 0.0
+
+    def report(self):
+        return (
+            f"⏱️ {self.pages} page(s), {self.rows} row(s), {self.errors} error(s) — "
+            f"{self.pages_per_minute():.1f} pages/min"
+        )
+
+
+# Runs `work(item)` over `items` on `workers` threads and yields (item, result) as each finishes.
+# Failed items are yielded with result None; `work` is expected to handle its own politeness.
+def run_pool(items, work, workers=4, stats=None):
+    stats = stats if stats is not None else CrawlStats()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(work, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Worker error on {item}: {e}")
+                stats.record(error=True)
+                yield item, None
+                continue
+
+            stats.record(rows=len(result) if result else 0)
+            yield item, result
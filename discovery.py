@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from fighter_registry import fighter_slugs
+
+# DISCOVER=1: opponents found on scraped fighter pages join the crawl, up to DISCOVER_DEPTH hops
+# from the roster. DISCOVER_EVENTS (a Parquet file with a URL column, e.g. 2a_ufc_events.parquet)
+# limits discovery to opponents met at those events, i.e. within one promotion.
+DISCOVER = os.environ.get("DISCOVER") == "1"
+DISCOVER_DEPTH = int(os.environ.get("DISCOVER_DEPTH", 2))
+DISCOVER_EVENTS = os.environ.get("DISCOVER_EVENTS")
+
+
+class SeenSet:
+    # Set of strings kept as 64-bit BLAKE2b fingerprints in one flat uint64 table with linear
+    # probing (0 marks an empty slot), doubled whenever it is half full: O(1) membership at
+    # 16-32 bytes per key, where a Python set of URL strings costs well over 100.
+    # Two keys sharing a fingerprint is a ~1e-9 event at a million keys; the loser is
+    # treated as already seen.
+    def __init__(self, capacity=1 << 16):
+        capacity = 1 << max(capacity - 1, 1).bit_length()
+        self._table = np.zeros(capacity, dtype=np.uint64)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        return self._table.nbytes
+
+    @staticmethod
+    def fingerprint(key):
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+        return np.uint64(digest or 1)
+
+    # Slot holding `fp`, or the empty slot where it would go
+    def _slot(self, table, fp):
+        mask = len(table) - 1
+        i = int(fp) & mask
+        while table[i] != 0 and table[i] != fp:
+            i = (i + 1) & mask
+        return i
+
+    def _grow(self):
+        old = self._table[self._table != 0]
+        self._table = np.zeros(len(self._table) * 2, dtype=np.uint64)
+        for fp in old:
+            self._table[self._slot(self._table, fp)] = fp
+
+    def __contains__(self, key):
+        fp = self.fingerprint(key)
+        with self._lock:
+            return self._table[self._slot(self._table, fp)] == fp
+
+    # Add a key; True when it wasn't there before
+    def add(self, key):
+        fp = self.fingerprint(key)
+        with self._lock:
+            i = self._slot(self._table, fp)
+            if self._table[i] == fp:
+                return False
+            self._table[i] = fp
+            self._count += 1
+            if self._count * 2 > len(self._table):
+                self._grow()
+            return True
+
+
+class Discovery:
+    # Grows a fighter frontier breadth-first over the opponent graph: every scraped fighter's
+    # opponents that haven't been seen (by URL slug) are queued behind the current ones with
+    # their depth, one more than the fighter's. Opponents past `max_depth`, or met outside
+    # `event_urls` when a promotion's events are given, are counted and left out. The seen-set
+    # is rebuilt from the frontier on start, so a resumed run doesn't queue anyone twice.
+    def __init__(self, frontier, max_depth=DISCOVER_DEPTH, event_urls=None):
+        self.frontier = frontier
+        self.max_depth = max_depth
+        self.event_urls = set(event_urls) if event_urls is not None else None
+        self.seen = SeenSet()
+        for slug in fighter_slugs(pa.array(frontier.urls(), pa.string())).to_pylist():
+            if slug:
+                self.seen.add(slug)
+        self.counts = {'queued': 0, 'seen': 0, 'too_deep': 0, 'off_promotion': 0}
+        self._lock = threading.Lock()
+
+    # Queue the unseen opponents in one fighter's bout rows; returns how many were queued
+    def feed(self, rows, depth=0):
+        candidates = [
+            row for row in rows
+            if row.get('opponent_url') and row['opponent_url'] != 'null'
+        ]
+        if not candidates:
+            return 0
+        slugs = fighter_slugs(pa.array([row['opponent_url'] for row in candidates], pa.string())).to_pylist()
+
+        urls, payloads = [], []
+        counts = dict.fromkeys(self.counts, 0)
+        for row, slug in zip(candidates, slugs):
+            if not slug:
+                continue
+            if self.event_urls is not None and row.get('event_url') not in self.event_urls:
+                counts['off_promotion'] += 1
+            elif depth + 1 > self.max_depth:
+                counts['too_deep'] += 1
+            elif not self.seen.add(slug):
+                counts['seen'] += 1
+            else:
+                counts['queued'] += 1
+                urls.append(row['opponent_url'])
+                payloads.append({'fighter_name': row.get('opponent_name'), 'depth': depth + 1})
+
+        if urls:
+            self.frontier.add(urls, payloads)
+        with self._lock:
+            for key, n in counts.items():
+                self.counts[key] += n
+        return len(urls)
+
+    # Feed every fighter the frontier already finished, e.g. when discovery is switched on for a
+    # crawl that ran without it; anyone already queued is skipped by the seen-set
+    def backfill(self):
+        queued = 0
+        for _, payload, rows in self.frontier.iter_results():
+            queued += self.feed(rows, payload.get('depth', 0))
+        return queued
+
+    def report(self):
+        c = self.counts
+        return (
+            f"🔭 Discovery: {c['queued']} new fighter(s) queued (depth ≤ {self.max_depth}), "
+            f"{c['seen']} already seen, {c['too_deep']} too deep, {c['off_promotion']} outside the promotion — "
+            f"{len(self.seen)} fighter(s) in a {self.seen.nbytes / 1e6:.1f} MB seen-set"
+        )
+
+
+# Event URLs a promotion filter keeps, from a Parquet file with a URL column
+def load_event_urls(path=DISCOVER_EVENTS):
+    if not path:
+        return None
+    return pd.read_parquet(path, columns=['URL'])['URL'].tolist()
@@ -0,0 +1,205 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+# LEAN_BROWSER=0 loads pages the way a normal browser would (full load, every resource)
+LEAN_BROWSER = os.environ.get("LEAN_BROWSER", "1") == "1"
+
+# Nothing the scrapers read lives in these: images, media, fonts, and ad/analytics hosts
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*googletagmanager.com*", "*google-analytics.com*", "*googlesyndication.com*", "*doubleclick.net*",
+    "*adservice.google.com*", "*amazon-adsystem.com*", "*adnxs.com*", "*criteo.com*", "*taboola.com*",
+    "*outbrain.com*", "*scorecardresearch.com*", "*quantserve.com*", "*facebook.net*", "*hotjar.com*",
+    "*pubmatic.com*", "*rubiconproject.com*", "*moatads.com*",
+]
+
+
+# Same headless flags the fighter scrapers have always used
+def default_chrome_options():
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    return chrome_options
+
+
+# driver.get returns at DOMContentLoaded instead of waiting for every subresource, and
+# Chrome doesn't even decode images
+def lean_options(options):
+    options.page_load_strategy = 'eager'
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    return options
+
+
+# Refuse the BLOCKED_URLS requests outright (Chrome DevTools Network.setBlockedURLs)
+def block_resources(driver, patterns=BLOCKED_URLS):
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except (AttributeError, WebDriverException):
+        # Not a Chromium driver; it still works, just without the blocking
+        pass
+
+
+# A selenium error that means the browser itself is broken (not just a slow page)
+def is_crash(exc):
+    return isinstance(exc, WebDriverException) and not isinstance(exc, TimeoutException)
+
+
+class DriverSession:
+    def __init__(self, driver, startup_seconds):
+        self.driver = driver
+        self.startup_seconds = startup_seconds
+        self.pages = 0
+        self.checked_out_at = None
+
+
+class DriverPool:
+    # Keeps up to `size` long-lived Chrome sessions and hands them out to workers.
+    # A session is quit and replaced after `max_pages` pages or after a crash.
+    # With a Metrics, Chrome startups and waits for a free session are spans.
+    # `lean` sessions use an eager page load and block images, media, fonts and ad hosts.
+    def __init__(self, size=1, max_pages=100, options_factory=default_chrome_options, driver_factory=None,
+                 metrics=None, lean=LEAN_BROWSER):
+        self.size = size
+        self.metrics = metrics
+        self.max_pages = max_pages
+        self.lean = lean
+        if driver_factory is None:
+            build_options = (lambda: lean_options(options_factory())) if lean else options_factory
+            driver_factory = lambda: webdriver.Chrome(options=build_options())
+        self._driver_factory = driver_factory
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._live = 0
+        self._closed = False
+
+        self.startups = 0
+        self.startup_seconds = 0.0
+        self.pages = 0
+        self.page_seconds = 0.0
+        self.recycled = 0
+        self.crashes = 0
+
+    def _start_session(self):
+        start = time.perf_counter()
+        try:
+            driver = self._driver_factory()
+            if self.lean:
+                block_resources(driver)
+        except Exception:
+            with self._lock:
+                self._live -= 1
+            raise
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.startups += 1
+            self.startup_seconds += elapsed
+        if self.metrics is not None:
+            self.metrics.record('driver_startup', elapsed)
+        return DriverSession(driver, elapsed)
+
+    def acquire(self, timeout=None):
+        if self._closed:
+            raise RuntimeError("DriverPool is closed")
+
+        began = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                session = self._idle.get_nowait()
+                break
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                can_start = self._live < self.size
+                if can_start:
+                    self._live += 1
+            if can_start:
+                session = self._start_session()
+                break
+
+            # Every session is busy; poll so a retired session frees a slot too
+            try:
+                session = self._idle.get(timeout=0.5)
+                break
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError("No browser session became available")
+
+        session.checked_out_at = time.perf_counter()
+        if self.metrics is not None:
+            self.metrics.record('driver_acquire', session.checked_out_at - began)
+        return session
+
+    def release(self, session, crashed=False):
+        if session is None or session.checked_out_at is None:
+            return
+
+        elapsed = time.perf_counter() - session.checked_out_at
+        session.checked_out_at = None
+        session.pages += 1
+
+        with self._lock:
+            self.pages += 1
+            self.page_seconds += elapsed
+            if crashed:
+                self.crashes += 1
+
+        if crashed or session.pages >= self.max_pages or self._closed:
+            self._retire(session, recycled=not self._closed)
+        else:
+            self._idle.put(session)
+
+    def _retire(self, session, recycled=True):
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
+        with self._lock:
+            self._live -= 1
+            if recycled:
+                self.recycled += 1
+
+    @contextmanager
+    def driver(self):
+        session = self.acquire()
+        crashed = False
+        try:
+            yield session.driver
+        except Exception as e:
+            crashed = is_crash(e)
+            raise
+        finally:
+            self.release(session, crashed=crashed)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._retire(session, recycled=False)
+
+    def report(self):
+        avg_startup = self.startup_seconds / self.startups if self.startups else 0.0
+        avg_page = self.page_seconds / self.pages if self.pages else 0.0
+        startup_per_page = self.startup_seconds / self.pages if self.pages else 0.0
+        return (
+            f"🚗 Driver pool: {self.startups} startup(s) avg {avg_startup:.2f}s, "
+            f"{self.pages} page(s) avg {avg_page:.2f}s, "
+            f"startup cost per page {startup_per_page:.2f}s "
+            f"({self.recycled} recycled, {self.crashes} crashed)"
+        )
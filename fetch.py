@@ -0,0 +1,324 @@
+import hashlib
+import os
+import re
+import threading
+import time
+
+import requests
+from bs4 import BeautifulSoup
+from fake_useragent import UserAgent
+from requests.adapters import HTTPAdapter
+from selenium.common.exceptions import JavascriptException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from fighter_parser import BASE_URL
+from metrics import timed
+
+# FETCH_OFFLINE=1 serves every page from the page cache and never touches the network
+OFFLINE = os.environ.get("FETCH_OFFLINE") == "1"
+# TAPOLOGY_BASE_URL=http://127.0.0.1:8000 sends every request to a local server instead; URLs in
+# the data, the frontier and the page cache keep the real site, only the network target changes
+SITE_URL = os.environ.get("TAPOLOGY_BASE_URL", BASE_URL).rstrip('/')
+
+# Text that only shows up on rate-limit / bot-challenge pages, never on a real Tapology page
+BLOCK_MARKERS = re.compile(
+    r"too many requests|access denied|attention required|just a moment\.\.\.|cf-challenge|captcha|rate limit",
+    re.IGNORECASE,
+)
+
+
+# Default content fingerprint: the whole page with whitespace collapsed
+def page_digest(html):
+    return hashlib.sha256(" ".join(html.split()).encode('utf-8')).hexdigest()
+
+
+# Validators for a conditional GET of a page we downloaded before (None for a first visit)
+def conditional_headers(fingerprint):
+    if fingerprint is None:
+        return None
+    headers = {}
+    if fingerprint['etag']:
+        headers['If-None-Match'] = fingerprint['etag']
+    if fingerprint['last_modified']:
+        headers['If-Modified-Since'] = fingerprint['last_modified']
+    return headers or None
+
+
+# Resolves as soon as `selector` matches (a MutationObserver, no polling), or false after the timeout
+WAIT_FOR_SELECTOR = """
+const [selector, timeoutMs, done] = arguments;
+if (document.querySelector(selector)) { done(true); return; }
+const observer = new MutationObserver(() => {
+    if (document.querySelector(selector)) { observer.disconnect(); clearTimeout(timer); done(true); }
+});
+const timer = setTimeout(() => { observer.disconnect(); done(false); }, timeoutMs);
+observer.observe(document.documentElement, {childList: true, subtree: true});
+"""
+
+
+class CacheMiss(LookupError):
+    pass
+
+
+# The site refused us (HTTP 429/403, or a challenge page instead of the content); slowing down
+# or changing egress helps, retrying straight away doesn't
+class Blocked(RuntimeError):
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+# The site failed to answer (HTTP 5xx): worth another try at a slower pace, not a browser load
+class ServerError(RuntimeError):
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+# Statuses that mean we are being refused rather than served
+BLOCK_STATUSES = {403, 429}
+
+
+# Where a site URL is actually fetched from
+def site_url(url, site=SITE_URL):
+    return site + url[len(BASE_URL):] if site != BASE_URL and url.startswith(BASE_URL) else url
+
+
+def looks_blocked(html):
+    return bool(html) and BLOCK_MARKERS.search(html[:20000]) is not None
+
+
+class Page:
+    def __init__(self, url, html, source, seconds):
+        self.url = url
+        self.html = html
+        self.source = source
+        self.seconds = seconds
+        # The server or the content digest says this is the copy we already had
+        self.unchanged = False
+        self._soup = None
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.html, 'html.parser')
+        return self._soup
+
+
+class Fetcher:
+    # Tries a pooled keep-alive requests.Session first and only falls back to a pooled
+    # browser when the selector we need is missing from the server-rendered HTML.
+    # With a page cache, fresh cached copies are served first and every fetch is stored.
+    # With a Metrics, every phase (cache, rate wait, HTTP, driver.get, selector wait) is a span.
+    # Re-fetches of cached URLs are conditional (If-None-Match / If-Modified-Since from the
+    # last download); a 304, or a body whose `digest` matches the last one, comes back as
+    # page.unchanged so callers can skip parsing and writing it.
+    def __init__(self, driver_pool=None, rate_limiter=None, pool_size=10, timeout=20, wait_seconds=15,
+                 cache=None, offline=OFFLINE, metrics=None, digest=page_digest):
+        self.driver_pool = driver_pool
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.metrics = metrics
+        self.digest = digest
+        self.offline = offline
+        self.timeout = timeout
+        self.wait_seconds = wait_seconds
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            'User-Agent': UserAgent().random,
+            'Accept-Encoding': 'gzip, deflate',
+        })
+
+        self._lock = threading.Lock()
+        self.counts = {'cache': 0, 'http': 0, 'browser': 0}
+        self.seconds = {'cache': 0.0, 'http': 0.0, 'browser': 0.0}
+        self.fallbacks = {'status': 0, 'selector': 0, 'error': 0}
+        # Browser waits: driver.get (to DOMContentLoaded with the eager strategy) and the selector after it
+        self.waits = {'get': 0.0, 'selector': 0.0}
+        self.max_selector_wait = 0.0
+        # Re-fetches that turned out unchanged, and the download bytes/seconds 304s spared us
+        self.unchanged = {'not_modified': 0, 'same_content': 0}
+        self.saved_bytes = 0
+        self.saved_seconds = 0.0
+
+    def _record(self, source, seconds):
+        with self._lock:
+            self.counts[source] += 1
+            self.seconds[source] += seconds
+
+    def _fallback(self, reason):
+        with self._lock:
+            self.fallbacks[reason] += 1
+
+    def _wait_turn(self, url):
+        if self.rate_limiter:
+            waited = self.rate_limiter.wait(url)
+            if self.metrics is not None:
+                self.metrics.record('rate_wait', waited)
+
+    # Plain rate-limited GET through the pooled session
+    def get(self, url, headers=None):
+        url = site_url(url)
+        self._wait_turn(url)
+        with timed(self.metrics, 'http'):
+            return self.session.get(url, timeout=self.timeout, headers=headers)
+
+    # `max_age` (seconds) overrides the cache TTL, e.g. for listing pages that change weekly
+    def fetch(self, url, selector, max_age=None):
+        start = time.perf_counter()
+        if self.cache is not None:
+            with timed(self.metrics, 'cache'):
+                html = self.cache.get(url, max_age=float('inf') if self.offline else max_age)
+            if html is not None:
+                page = Page(url, html, 'cache', time.perf_counter() - start)
+                self._record('cache', page.seconds)
+                return page
+        if self.offline:
+            raise CacheMiss(f"{url} is not in the page cache")
+
+        fingerprint = self.cache.fingerprint(url) if self.cache is not None else None
+        try:
+            response = self.get(url, conditional_headers(fingerprint))
+        except requests.RequestException:
+            response = None
+            self._fallback('error')
+
+        if response is not None:
+            # A block or an overloaded server is an answer, not a rendering problem: a browser
+            # load would only cost more and make it worse, so the pacer gets to slow down instead
+            status = response.status_code
+            retry_after = response.headers.get('Retry-After', '')
+            retry_after = float(retry_after) if retry_after.isdigit() else None
+            if status in BLOCK_STATUSES:
+                self._note('http', f"HTTP{status}")
+                raise Blocked(f"{url} answered {status}", status, retry_after)
+            if status >= 500:
+                self._note('http', f"HTTP{status}")
+                raise ServerError(f"{url} answered {status}", status, retry_after)
+            if response.status_code == 304 and fingerprint is not None:
+                html = self.cache.revalidate(url)
+                if html is not None:
+                    page = Page(url, html, 'http', time.perf_counter() - start)
+                    page.unchanged = True
+                    self._record('http', page.seconds)
+                    with self._lock:
+                        self.unchanged['not_modified'] += 1
+                        self.saved_bytes += fingerprint['size']
+                        self.saved_seconds += max(fingerprint['seconds'] - page.seconds, 0.0)
+                    return page
+            if response.status_code == 200:
+                page = Page(url, response.text, 'http', 0.0)
+                if page.soup.select_one(selector) is not None:
+                    page.seconds = time.perf_counter() - start
+                    self._record('http', page.seconds)
+                    self._store(page, fingerprint, response)
+                    return page
+                if looks_blocked(response.text):
+                    self._note('http', 'BlockPage')
+                    raise Blocked(f"{url} served a block page", 200)
+                self._fallback('selector')
+                self._note('http', 'SelectorMissing')
+            else:
+                self._fallback('status')
+                self._note('http', f"HTTP{response.status_code}")
+
+        if self.driver_pool is None:
+            raise RuntimeError(f"{url} needs a browser but the fetcher has no driver pool")
+        return self.fetch_browser(url, selector)
+
+    def fetch_browser(self, url, selector):
+        start = time.perf_counter()
+        self._wait_turn(site_url(url))
+        with self.driver_pool.driver() as driver:
+            loading = time.perf_counter()
+            with timed(self.metrics, 'driver_get'):
+                driver.get(site_url(url))
+            waiting = time.perf_counter()
+            try:
+                with timed(self.metrics, 'selector_wait'):
+                    self._wait_for(driver, selector)
+            except TimeoutException as e:
+                if looks_blocked(driver.page_source):
+                    raise Blocked(f"{url} served a block page") from e
+                raise
+            finally:
+                self._record_wait(waiting - loading, time.perf_counter() - waiting)
+            html = driver.page_source
+
+        seconds = time.perf_counter() - start
+        self._record('browser', seconds)
+        page = Page(url, html, 'browser', seconds)
+        self._store(page, self.cache.fingerprint(url) if self.cache is not None else None)
+        return page
+
+    # Return the moment `selector` is in the DOM: a MutationObserver inside the page, with
+    # WebDriverWait (tight polling) for drivers that can't run async scripts
+    def _wait_for(self, driver, selector):
+        try:
+            driver.set_script_timeout(self.wait_seconds + 5)
+            found = driver.execute_async_script(WAIT_FOR_SELECTOR, selector, int(self.wait_seconds * 1000))
+        except (JavascriptException, AttributeError):
+            WebDriverWait(driver, self.wait_seconds, poll_frequency=0.1).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+            )
+            return
+        if not found:
+            raise TimeoutException(f"{selector!r} did not appear within {self.wait_seconds}s")
+
+    def _record_wait(self, get_seconds, selector_seconds):
+        with self._lock:
+            self.waits['get'] += get_seconds
+            self.waits['selector'] += selector_seconds
+            self.max_selector_wait = max(self.max_selector_wait, selector_seconds)
+
+    # A fetch that didn't raise but still didn't give us the page, counted as an error of `phase`
+    def _note(self, phase, error):
+        if self.metrics is not None:
+            self.metrics.error(phase, error)
+
+    # Cache the page and its validators; a digest equal to the last download's marks it unchanged
+    def _store(self, page, fingerprint=None, response=None):
+        if self.cache is None:
+            return
+        digest = self.digest(page.html) if self.digest is not None else None
+        if fingerprint is not None and digest is not None and digest == fingerprint['digest']:
+            page.unchanged = True
+            with self._lock:
+                self.unchanged['same_content'] += 1
+        headers = response.headers if response is not None else {}
+        self.cache.put(page.url, page.html)
+        self.cache.set_fingerprint(
+            page.url, headers.get('ETag'), headers.get('Last-Modified'), digest,
+            len(response.content) if response is not None else len(page.html.encode('utf-8')), page.seconds,
+        )
+
+    def report(self):
+        parts = []
+        for source in ('cache', 'http', 'browser'):
+            count = self.counts[source]
+            avg = self.seconds[source] / count if count else 0.0
+            parts.append(f"{source} {count} (avg {avg:.2f}s)")
+        fallbacks = ", ".join(f"{reason} {n}" for reason, n in self.fallbacks.items())
+        report = f"🌐 Fetch paths: {', '.join(parts)} — browser fallbacks: {fallbacks}"
+        skipped = sum(self.unchanged.values())
+        if skipped:
+            report += (
+                f"\n⏭️ Unchanged on re-fetch: {skipped} page(s) ({self.unchanged['not_modified']} answered 304, "
+                f"{self.unchanged['same_content']} same content) — {self.saved_bytes / 1024 ** 2:.1f} MB and "
+                f"{self.saved_seconds:.0f}s of downloads saved"
+            )
+        loads = self.counts['browser']
+        if loads:
+            report += (
+                f"\n⏳ Browser waits: driver.get avg {self.waits['get'] / loads:.2f}s, "
+                f"selector avg {self.waits['selector'] / loads:.2f}s (max {self.max_selector_wait:.2f}s)"
+            )
+        return report
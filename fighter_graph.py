@@ -0,0 +1,196 @@
+import argparse
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from fighter_registry import FighterRegistry
+from normalize import TYPED_DATASET, parse_dates
+
+# The typed dataset from normalize.py; the compacted string dataset works as well
+BOUTS_DATASET = TYPED_DATASET
+GRAPH_COLUMNS = [
+    'fighter_id', 'opponent_id', 'original_fighter_url', 'opponent_url', 'result',
+    'event_date', 'event_year', 'event_month_day', 'finish_shortened',
+]
+
+
+# Bout rows from a compacted dataset, a part directory or a single Parquet file,
+# read straight into Arrow with only the graph's columns
+def load_bouts(path=BOUTS_DATASET):
+    partitioning = ds.partitioning(pa.schema([('event_year', pa.string())]), flavor='hive')
+    dataset = ds.dataset(path, format='parquet', partitioning=partitioning)
+    columns = [col for col in GRAPH_COLUMNS if col in dataset.schema.names]
+    return dataset.to_table(columns=columns, filter=pc.field('result').isin(['W', 'L']))
+
+
+# Arrow string column -> (int32 codes, distinct values); nulls get code -1
+def _encode(column):
+    encoded = pc.dictionary_encode(column).combine_chunks()
+    codes = pc.fill_null(encoded.indices, -1).to_numpy().astype(np.int32)
+    return codes, encoded.dictionary.to_numpy(zero_copy_only=False)
+
+
+# Bout dates as datetime64[D] (NaT when unknown): the typed dataset's event_date as is,
+# or event_year + event_month_day parsed with the normalisation stage's kernels
+def event_dates(table):
+    if 'event_date' in table.column_names:
+        dates = table['event_date']
+    else:
+        dates = parse_dates(pc.binary_join_element_wise(
+            pc.cast(table['event_year'], pa.string()), table['event_month_day'], " "))
+    return pc.cast(dates, pa.timestamp('s')).to_numpy(zero_copy_only=False).astype('datetime64[D]')
+
+
+class FighterGraph:
+    # Directed win graph in CSR form: fighter ids are 0..n-1 (`urls[i]` is fighter i), and the
+    # edges of fighter i are indices[indptr[i]:indptr[i+1]] with matching `dates` and `methods`
+    # (codes into `method_names`). The forward graph points loser -> winner, so rank flows to
+    # whoever won; reverse() gives winner -> loser. Every array is a flat NumPy buffer.
+    def __init__(self, urls, indptr, indices, dates, methods, method_names, forward=True):
+        self.urls = urls
+        self.indptr = indptr
+        self.indices = indices
+        self.dates = dates
+        self.methods = methods
+        self.method_names = method_names
+        self.forward = forward
+        self._ids = None
+        self._reverse = None
+
+    @classmethod
+    def from_table(cls, table, registry=None):
+        names = table.column_names
+        by_id = 'fighter_id' in names
+        fighter, opponent = ('fighter_id', 'opponent_id') if by_id else ('original_fighter_url', 'opponent_url')
+
+        # Only decided bouts between two known fighters become edges ('null' is a missing link)
+        known = pc.field(fighter).is_valid() & pc.field(opponent).is_valid()
+        if not by_id:
+            known = known & (pc.field(fighter) != 'null') & (pc.field(opponent) != 'null')
+        table = table.filter(pc.field('result').isin(['W', 'L']) & known)
+        n = table.num_rows
+
+        if by_id:
+            # The typed dataset already holds registry ids, so graph ids are registry ids
+            registry = registry if registry is not None else FighterRegistry()
+            urls = registry.urls()
+            ids = np.concatenate([table[fighter].to_numpy(), table[opponent].to_numpy()]).astype(np.int32)
+        else:
+            # Intern every URL once, in Arrow, without building per-row Python strings
+            ids, urls = _encode(pa.chunked_array(table[fighter].chunks + table[opponent].chunks))
+        fighter_ids, opponent_ids = ids[:n], ids[n:]
+
+        won = pc.equal(table['result'], 'W').to_numpy(zero_copy_only=False)
+        loser = np.where(won, opponent_ids, fighter_ids)
+        winner = np.where(won, fighter_ids, opponent_ids)
+
+        dates = event_dates(table) if 'event_date' in names or 'event_month_day' in names \
+            else np.full(n, np.datetime64('NaT', 'D'))
+        method_codes, method_names = _encode(table['finish_shortened']) if 'finish_shortened' in names \
+            else (np.full(n, -1, dtype=np.int32), [])
+
+        # Every bout is scraped once from each side: sort by (loser, winner, date) and keep one
+        # row per bout, which also leaves the edges in CSR order
+        date_keys = dates.view(np.int64)
+        order = np.lexsort((date_keys, winner, loser))
+        loser, winner, date_keys = loser[order], winner[order], date_keys[order]
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = (loser[1:] != loser[:-1]) | (winner[1:] != winner[:-1]) | (date_keys[1:] != date_keys[:-1])
+        order = order[keep]
+
+        indptr = np.zeros(len(urls) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(loser[keep], minlength=len(urls)), out=indptr[1:])
+        return cls(
+            urls, indptr, winner[keep], dates[order], method_codes[order].astype(np.int8), list(method_names),
+        )
+
+    @property
+    def num_fighters(self):
+        return len(self.urls)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def id_of(self, url):
+        if self._ids is None:
+            self._ids = {u: i for i, u in enumerate(self.urls)}
+        return self._ids[url]
+
+    def neighbors(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    # Source id of every edge, aligned with `indices`
+    def sources(self):
+        return np.repeat(np.arange(self.num_fighters, dtype=np.int32), self.out_degree())
+
+    def method_of(self, edge):
+        code = self.methods[edge]
+        return self.method_names[code] if code >= 0 else None
+
+    # The same edges pointing the other way (winner -> loser), built once by a stable sort
+    def reverse(self):
+        if self._reverse is None:
+            order = np.argsort(self.indices, kind='stable')
+            indptr = np.zeros(self.num_fighters + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=self.num_fighters), out=indptr[1:])
+            self._reverse = FighterGraph(
+                self.urls, indptr, self.sources()[order], self.dates[order], self.methods[order],
+                self.method_names, forward=not self.forward,
+            )
+            self._reverse._ids = self._ids
+            self._reverse._reverse = self
+        return self._reverse
+
+    # Same fighters and ids, keeping only the edges where `mask` is set (e.g. dates < cutoff)
+    def subgraph(self, mask):
+        indptr = np.zeros(self.num_fighters + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.sources()[mask], minlength=self.num_fighters), out=indptr[1:])
+        graph = FighterGraph(
+            self.urls, indptr, self.indices[mask], self.dates[mask], self.methods[mask],
+            self.method_names, forward=self.forward,
+        )
+        graph._ids = self._ids
+        return graph
+
+    # Beaten-by edges of fighter i (loser -> winner) and the fighters i beat
+    def beaten_by(self, i):
+        graph = self if self.forward else self.reverse()
+        return graph.neighbors(i)
+
+    def victims(self, i):
+        graph = self.reverse() if self.forward else self
+        return graph.neighbors(i)
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.indptr, self.indices, self.dates, self.methods))
+
+    def report(self):
+        return (
+            f"🕸️ Fighter graph: {self.num_fighters} fighter(s), {self.num_edges} win edge(s), "
+            f"{self.nbytes() / 1024 ** 2:.1f} MB of edge arrays"
+        )
+
+
+def build_graph(path=BOUTS_DATASET, registry=None):
+    return FighterGraph.from_table(load_bouts(path), registry)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the fighter win graph from scraped bouts")
+    parser.add_argument("path", nargs="?", default=BOUTS_DATASET, help="bout dataset, part directory or Parquet file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = load_bouts(args.path)
+    loaded = time.perf_counter()
+    graph = FighterGraph.from_table(table)
+    built = time.perf_counter()
+    print(f"📥 Loaded {table.num_rows} W/L row(s) in {loaded - start:.2f}s, built the graph in {built - loaded:.2f}s")
+    print(graph.report())
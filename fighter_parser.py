@@ -0,0 +1,351 @@
+import hashlib
+import os
+import re
+from urllib.parse import urljoin
+
+import lxml.html
+from bs4 import BeautifulSoup
+from lxml import etree
+
+BASE_URL = "https://www.tapology.com"
+
+# 'lxml' (default) or 'html.parser'; FIGHTER_PARSER overrides it for a whole run
+PARSER_BACKEND = os.environ.get("FIGHTER_PARSER", "lxml")
+
+# Column order of every bout row, shared by the scrapers and the offline re-parse
+BOUT_COLUMNS = [
+    'original_fighter_name', 'original_fighter_url', 'fighter_dob', 'fighter_height',
+    'fighter_reach', 'foundational_style', 'opponent_name', 'opponent_url', 'event_url',
+    'event_year', 'event_month_day', 'duration', 'weight', 'odds', 'victory_details',
+    'result', 'finish_shortened',
+]
+
+
+class MissingResults(ValueError):
+    pass
+
+
+def clean_text(text):
+    if isinstance(text, str):
+        return text.encode('utf-8', 'ignore').decode('utf-8')
+    return text
+
+
+# Bio regexes, shared by both backends; `texts` are each bio div's space-joined strings
+def parse_bio_texts(texts):
+    # Initialize defaults
+    fighter_dob = fighter_height = fighter_reach = foundation_style = 'null'
+
+    for text in texts:
+        # DOB
+        dob_match = re.search(r"Date of Birth:\s*([\d]{4} [A-Za-z]{3} \d{1,2})", text)
+        if dob_match:
+            fighter_dob = dob_match.group(1)
+
+        #Foundation Style
+        style_match = re.search(r"Foundation Style:\s*([^\n]+)", text)
+        if style_match:
+            foundation_style = style_match.group(1).strip()
+
+        # Height and Reach
+        if "Height:" in text and "Reach:" in text:
+            height_match = re.search(r"Height:\s*([^|]+)", text)
+            reach_match = re.search(r"Reach:\s*([^\s]+)", text)
+            if height_match:
+                fighter_height = height_match.group(1).strip()
+            if reach_match:
+                fighter_reach = reach_match.group(1).strip()
+
+    return fighter_dob, fighter_height, fighter_reach, foundation_style
+
+
+def parse_bio(soup):
+    details_container = soup.select_one('#standardDetails')
+    divs = details_container.select('div') if details_container else []
+    return parse_bio_texts(div.get_text(separator=" ", strip=True) for div in divs)
+
+
+def bout_row(fighter_name, fighter_url, fighter_dob, fighter_height, fighter_reach, foundation_style,
+             opponent_name, opponent_link, event_url, event_year, event_md, duration, weight, odds,
+             victory_details, result_text, finish_shortened):
+    return {
+        'original_fighter_name': clean_text(fighter_name),
+        'original_fighter_url': clean_text(fighter_url),
+        'fighter_dob': clean_text(fighter_dob),
+        'fighter_height': clean_text(fighter_height),
+        'fighter_reach': clean_text(fighter_reach),
+        'foundational_style': clean_text(foundation_style),
+        'opponent_name': clean_text(opponent_name),
+        'opponent_url': clean_text(opponent_link),
+        'event_url': clean_text(event_url),
+        'event_year': clean_text(event_year),
+        'event_month_day': clean_text(event_md),
+        'duration': clean_text(duration),
+        'weight': clean_text(weight),
+        'odds': clean_text(odds),
+        'victory_details': clean_text(victory_details),
+        'result': clean_text(result_text),
+        'finish_shortened': clean_text(finish_shortened),
+    }
+
+
+# Pure HTML -> rows extraction of a fighter's pro W/L bouts; no browser or network involved.
+# `backend` is 'lxml' (precompiled XPath, see below) or 'html.parser' (BeautifulSoup);
+# both produce identical rows. An already-parsed BeautifulSoup document is also accepted.
+def parse_fighter_page(html, fighter_name, fighter_url, backend=None):
+    backend = backend or PARSER_BACKEND
+    if isinstance(html, BeautifulSoup) or backend == 'html.parser':
+        return parse_fighter_page_bs4(html, fighter_name, fighter_url)
+    if backend == 'lxml':
+        return parse_fighter_page_lxml(html, fighter_name, fighter_url)
+    raise ValueError(f"Unknown parser backend: {backend}")
+
+
+def parse_fighter_page_bs4(html, fighter_name, fighter_url):
+    soup = html if isinstance(html, BeautifulSoup) else BeautifulSoup(html, 'html.parser')
+    output = []
+
+    fighter_dob, fighter_height, fighter_reach, foundation_style = parse_bio(soup)
+
+    results_container = soup.select_one("section.fighterFightResults div#proResults")
+    if not results_container:
+        raise MissingResults("No <div id='proResults'> found")
+
+    for bout in results_container.select("div[data-fighter-bout-target='bout']"):
+        # Everything after the amateur header belongs to the amateur record
+        if 'Amateur Bouts' in bout.text:
+            break
+
+        result_div = bout.select_one("div.result div")
+        result_text = result_div.text.strip() if result_div else ''
+        if result_text not in ['W', 'L']:
+            continue
+
+        record_span = bout.select_one("span[title='Fighter Record Before Fight']")
+        if not record_span or not re.match(r"^\d+-\d+", record_span.text.strip()):
+            continue
+
+        opponent_tag = bout.select_one('a[href*="/fighters/"]')
+        opponent_name = opponent_tag.text.strip() if opponent_tag else 'null'
+        opponent_link = urljoin(BASE_URL, opponent_tag['href']) if opponent_tag else 'null'
+
+        event_tag = bout.select_one('a[href*="/fightcenter/events/"]')
+        event_url = urljoin(BASE_URL, event_tag['href']) if event_tag else 'null'
+
+        event_year = event_md = 'null'
+        date_container = bout.select_one('div.flex.flex-col.justify-around.items-center')
+
+        if date_container:
+            spans = date_container.find_all('span')
+            if len(spans) >= 2:
+                event_year = spans[0].text.strip()
+                event_md = spans[1].text.strip()
+        elif event_tag:
+            # Older layout keeps the date inside the event link
+            year_span = event_tag.select_one('span.font-bold')
+            date_span = event_tag.select_one('span.text-neutral-600')
+            event_year = year_span.text.strip() if year_span else 'null'
+            event_md = date_span.text.strip() if date_span else 'null'
+
+        victory_details = 'null'
+        middle_col = bout.select_one("div.md\\:flex.flex-col.justify-center.gap-1\\.5")
+        if middle_col:
+            method_tag = middle_col.select_one("a[href*='/fightcenter/bouts/']")
+            time_div = middle_col.select_one("div.text-xs11.text-neutral-600")
+            method_text = method_tag.text.strip() if method_tag else ''
+            time_text = time_div.get_text(strip=True) if time_div else ''
+            victory_details = f"{method_text} · {time_text}".strip(' ·')
+
+        finish_shortened = 'null'
+        short_finish_div = bout.select_one("div.-rotate-90")
+        if short_finish_div:
+            finish_shortened = short_finish_div.text.strip()
+
+        duration = weight = odds = 'null'
+        bout_id = bout.get('data-bout-id')
+        if bout_id:
+            detail_div = soup.select_one(f'#boutDetails{bout_id}')
+            if detail_div:
+                for t in detail_div.select('div.h-\\[34px\\]'):
+                    label_tag = t.select_one('span.font-bold')
+                    value_tag = t.select_one('span:not(.font-bold)')
+                    if not label_tag or not value_tag:
+                        continue
+                    label = label_tag.text.strip().replace(':', '')
+                    value = value_tag.text.strip()
+                    if label == 'Duration':
+                        duration = value
+                    elif label == 'Weight':
+                        weight = value
+                    elif label == 'Odds':
+                        odds = value
+
+        output.append(bout_row(
+            fighter_name, fighter_url, fighter_dob, fighter_height, fighter_reach, foundation_style,
+            opponent_name, opponent_link, event_url, event_year, event_md, duration, weight, odds,
+            victory_details, result_text, finish_shortened,
+        ))
+
+    return output
+
+
+# --- lxml backend -----------------------------------------------------------------------
+# Every CSS selector above, compiled once to XPath. Text extraction mirrors BeautifulSoup:
+# .text joins all descendant strings except script/style/template contents.
+
+def _has_class(*names):
+    return " and ".join(f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')" for name in names)
+
+
+def _first(xpath):
+    compiled = etree.XPath(xpath)
+
+    def first(node):
+        found = compiled(node)
+        return found[0] if found else None
+    return first
+
+
+_TEXTS = etree.XPath(".//text()[not(parent::script or parent::style or parent::template)]")
+
+_STANDARD_DETAILS = _first("//*[@id='standardDetails']")
+_DESCENDANT_DIVS = etree.XPath(".//div")
+_PRO_RESULTS = _first(f"//section[{_has_class('fighterFightResults')}]//div[@id='proResults']")
+_BOUTS = etree.XPath(".//div[@data-fighter-bout-target='bout']")
+_BOUT_DETAILS = etree.XPath("//*[starts-with(@id, 'boutDetails')]")
+_RESULT_DIV = _first(f".//div[{_has_class('result')}]//div")
+_RECORD_SPAN = _first(".//span[@title='Fighter Record Before Fight']")
+_OPPONENT_LINK = _first(".//a[contains(@href, '/fighters/')]")
+_EVENT_LINK = _first(".//a[contains(@href, '/fightcenter/events/')]")
+_DATE_CONTAINER = _first(f".//div[{_has_class('flex', 'flex-col', 'justify-around', 'items-center')}]")
+_SPANS = etree.XPath(".//span")
+_BOLD_SPAN = _first(f".//span[{_has_class('font-bold')}]")
+_NOT_BOLD_SPAN = _first(f".//span[not({_has_class('font-bold')})]")
+_MUTED_SPAN = _first(f".//span[{_has_class('text-neutral-600')}]")
+_MIDDLE_COL = _first(f".//div[{_has_class('md:flex', 'flex-col', 'justify-center', 'gap-1.5')}]")
+_METHOD_LINK = _first(".//a[contains(@href, '/fightcenter/bouts/')]")
+_TIME_DIV = _first(f".//div[{_has_class('text-xs11', 'text-neutral-600')}]")
+_SHORT_FINISH = _first(f".//div[{_has_class('-rotate-90')}]")
+_DETAIL_ROWS = etree.XPath(f".//div[{_has_class('h-[34px]')}]")
+
+
+def _text(node):
+    return "".join(_TEXTS(node))
+
+
+def _stripped_text(node, separator=""):
+    return separator.join(t.strip() for t in _TEXTS(node) if t.strip())
+
+
+# Fingerprint of everything parse_fighter_page reads (#proResults, the bout details and the bio):
+# its text and links with whitespace collapsed, so markup churn elsewhere on the page (ads,
+# tokens, layout) doesn't count as a change. None when the page has no #proResults.
+def results_digest(html):
+    root = lxml.html.document_fromstring(html)
+    results_container = _PRO_RESULTS(root)
+    if results_container is None:
+        return None
+    digest = hashlib.sha256()
+    for node in [_STANDARD_DETAILS(root), results_container, *_BOUT_DETAILS(root)]:
+        if node is None:
+            continue
+        digest.update(" ".join(_stripped_text(node, " ").split()).encode('utf-8'))
+        for link in node.iter('a'):
+            digest.update(b"\0" + (link.get('href') or '').encode('utf-8'))
+        digest.update(b"\1")
+    return digest.hexdigest()
+
+
+def parse_fighter_page_lxml(html, fighter_name, fighter_url):
+    root = lxml.html.document_fromstring(html)
+    output = []
+
+    details_container = _STANDARD_DETAILS(root)
+    divs = _DESCENDANT_DIVS(details_container) if details_container is not None else []
+    fighter_dob, fighter_height, fighter_reach, foundation_style = parse_bio_texts(
+        _stripped_text(div, " ") for div in divs
+    )
+
+    results_container = _PRO_RESULTS(root)
+    if results_container is None:
+        raise MissingResults("No <div id='proResults'> found")
+
+    # One pass over the document instead of an #boutDetails lookup per bout
+    bout_details = {}
+    for node in _BOUT_DETAILS(root):
+        bout_details.setdefault(node.get('id'), node)
+
+    for bout in _BOUTS(results_container):
+        if 'Amateur Bouts' in _text(bout):
+            break
+
+        result_div = _RESULT_DIV(bout)
+        result_text = _text(result_div).strip() if result_div is not None else ''
+        if result_text not in ['W', 'L']:
+            continue
+
+        record_span = _RECORD_SPAN(bout)
+        if record_span is None or not re.match(r"^\d+-\d+", _text(record_span).strip()):
+            continue
+
+        opponent_tag = _OPPONENT_LINK(bout)
+        opponent_name = _text(opponent_tag).strip() if opponent_tag is not None else 'null'
+        opponent_link = urljoin(BASE_URL, opponent_tag.get('href')) if opponent_tag is not None else 'null'
+
+        event_tag = _EVENT_LINK(bout)
+        event_url = urljoin(BASE_URL, event_tag.get('href')) if event_tag is not None else 'null'
+
+        event_year = event_md = 'null'
+        date_container = _DATE_CONTAINER(bout)
+
+        if date_container is not None:
+            spans = _SPANS(date_container)
+            if len(spans) >= 2:
+                event_year = _text(spans[0]).strip()
+                event_md = _text(spans[1]).strip()
+        elif event_tag is not None:
+            year_span = _BOLD_SPAN(event_tag)
+            date_span = _MUTED_SPAN(event_tag)
+            event_year = _text(year_span).strip() if year_span is not None else 'null'
+            event_md = _text(date_span).strip() if date_span is not None else 'null'
+
+        victory_details = 'null'
+        middle_col = _MIDDLE_COL(bout)
+        if middle_col is not None:
+            method_tag = _METHOD_LINK(middle_col)
+            time_div = _TIME_DIV(middle_col)
+            method_text = _text(method_tag).strip() if method_tag is not None else ''
+            time_text = _stripped_text(time_div) if time_div is not None else ''
+            victory_details = f"{method_text} · {time_text}".strip(' ·')
+
+        finish_shortened = 'null'
+        short_finish_div = _SHORT_FINISH(bout)
+        if short_finish_div is not None:
+            finish_shortened = _text(short_finish_div).strip()
+
+        duration = weight = odds = 'null'
+        bout_id = bout.get('data-bout-id')
+        if bout_id:
+            detail_div = bout_details.get(f'boutDetails{bout_id}')
+            if detail_div is not None:
+                for t in _DETAIL_ROWS(detail_div):
+                    label_tag = _BOLD_SPAN(t)
+                    value_tag = _NOT_BOLD_SPAN(t)
+                    if label_tag is None or value_tag is None:
+                        continue
+                    label = _text(label_tag).strip().replace(':', '')
+                    value = _text(value_tag).strip()
+                    if label == 'Duration':
+                        duration = value
+                    elif label == 'Weight':
+                        weight = value
+                    elif label == 'Odds':
+                        odds = value
+
+        output.append(bout_row(
+            fighter_name, fighter_url, fighter_dob, fighter_height, fighter_reach, foundation_style,
+            opponent_name, opponent_link, event_url, event_year, event_md, duration, weight, odds,
+            victory_details, result_text, finish_shortened,
+        ))
+
+    return output
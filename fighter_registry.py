@@ -0,0 +1,130 @@
+import argparse
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from fighter_parser import BASE_URL
+
+REGISTRY = "0_fighter_registry.parquet"
+FIGHTER_PATH = "/fightcenter/fighters/"
+# Placeholder names some stages write when they don't know the fighter's name
+UNKNOWN_NAMES = ['', 'null', 'Unknown']
+
+
+# Any form of a fighter link -> its lowercase slug ('123-jon-jones'): relative or absolute,
+# with or without query string, fragment or trailing slash. Null where it isn't a fighter link.
+def fighter_slugs(urls):
+    urls = urls if isinstance(urls, (pa.Array, pa.ChunkedArray)) else pa.array(urls, pa.string())
+    found = pc.extract_regex(urls, r"/fightcenter/fighters/(?P<slug>[^/?#]+)")
+    return pc.utf8_lower(pc.struct_field(found, 'slug'))
+
+
+def fighter_url(slug):
+    return BASE_URL + FIGHTER_PATH + slug
+
+
+class FighterRegistry:
+    # Canonical fighter ids: one int32 per normalised URL slug, assigned in order of first
+    # sighting and never reused, plus the best known name. Stages intern whole columns at once
+    # with ids_for() and store the ids; urls()/names() turn them back into text for output.
+    def __init__(self, path=REGISTRY):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            table = pd.read_parquet(path).sort_values('fighter_id')
+            self._slugs = table['slug'].tolist()
+            self._names = table['name'].tolist()
+        else:
+            self._slugs, self._names = [], []
+        self._index = pd.Index(self._slugs)
+        self.added = 0
+
+    def __len__(self):
+        return len(self._slugs)
+
+    # int32 id for every URL (-1 where it isn't a fighter link); unseen fighters get new ids,
+    # and real names fill in any the registry is missing
+    def ids_for(self, urls, names=None):
+        slugs = fighter_slugs(urls).to_numpy(zero_copy_only=False)
+        valid = pd.notna(slugs)
+        with self._lock:
+            codes = self._index.get_indexer(slugs)
+            unseen = pd.unique(slugs[valid & (codes < 0)])
+            if len(unseen):
+                self._slugs.extend(unseen.tolist())
+                self._names.extend([None] * len(unseen))
+                self._index = pd.Index(self._slugs)
+                self.added += len(unseen)
+                codes = self._index.get_indexer(slugs)
+            codes = np.where(valid, codes, -1).astype(np.int32)
+
+            if names is not None:
+                names = np.asarray(names.to_numpy(zero_copy_only=False) if isinstance(names, (pa.Array, pa.ChunkedArray))
+                                   else names, dtype=object)
+                current = np.asarray(self._names, dtype=object)
+                missing = (codes >= 0) & pd.isna(current[np.maximum(codes, 0)]) if len(current) else codes >= 0
+                usable = missing & pd.notna(names) & ~pd.Series(names).isin(UNKNOWN_NAMES).to_numpy()
+                fills = pd.Series(names[usable]).groupby(codes[usable]).first()
+                for fighter_id, name in fills.items():
+                    self._names[fighter_id] = name
+        return codes
+
+    def id_for(self, url, name=None):
+        return int(self.ids_for([url], None if name is None else [name])[0])
+
+    # Arrow int32 column of ids with nulls where the URL wasn't a fighter link
+    def id_column(self, urls, names=None):
+        ids = self.ids_for(urls, names)
+        return pa.array(ids, pa.int32(), mask=ids < 0)
+
+    def urls(self, ids=None):
+        slugs = np.asarray(self._slugs, dtype=object)
+        slugs = slugs if ids is None else slugs[np.asarray(ids)]
+        return np.array([fighter_url(slug) for slug in slugs], dtype=object)
+
+    def names(self, ids=None):
+        names = np.asarray(self._names, dtype=object)
+        return names if ids is None else names[np.asarray(ids)]
+
+    def name_of(self, fighter_id, default="Unknown"):
+        name = self._names[fighter_id] if 0 <= fighter_id < len(self._names) else None
+        return name if name is not None else default
+
+    def save(self):
+        with self._lock:
+            table = pa.table({
+                'fighter_id': pa.array(np.arange(len(self._slugs)), pa.int32()),
+                'slug': pa.array(self._slugs, pa.string()),
+                'name': pa.array(self._names, pa.string()),
+            })
+        pq.write_table(table, self.path + ".tmp")
+        os.replace(self.path + ".tmp", self.path)
+
+    def report(self):
+        return f"🪪 Fighter registry: {len(self)} fighter(s), {self.added} new this run ({self.path})"
+
+
+# Seed the registry from every fighter list the pipeline already has
+def seed(registry, roster="4c_unique_fighter_urls.parquet", winners="3a_winners_combined.parquet"):
+    if os.path.exists(roster):
+        df = pd.read_parquet(roster)
+        registry.ids_for(df['fighter_url'].tolist(), df['fighter_name'].tolist())
+    if os.path.exists(winners):
+        df = pd.read_parquet(winners)
+        registry.ids_for(df['winner_link'].tolist(), df['winner'].tolist())
+    return registry
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect the canonical fighter id registry")
+    parser.add_argument("--path", default=REGISTRY)
+    args = parser.parse_args()
+
+    registry = seed(FighterRegistry(args.path))
+    registry.save()
+    print(registry.report())
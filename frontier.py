@@ -0,0 +1,211 @@
+import json
+import sqlite3
+import threading
+import time
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Frontier:
+    # Durable crawl frontier: one row per URL with its state and attempt count, plus the
+    # scraped rows for every finished URL. Each completion is its own transaction, so a
+    # crash loses at most the URLs that were in flight; recover() puts those back.
+    # Several processes (crawl nodes) can share one frontier file: claim(owner=...) leases
+    # URLs for `lease_seconds`, heartbeat() renews them, an expired lease is claimable again,
+    # and complete()/fail() from an owner whose lease was taken over are refused.
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                payload TEXT,
+                last_error TEXT,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS urls_state ON urls (state, seq);
+            CREATE TABLE IF NOT EXISTS results (
+                url TEXT PRIMARY KEY,
+                rows TEXT NOT NULL,
+                finished_at REAL NOT NULL
+            );
+        """)
+        # Frontiers created before leases existed
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(urls)")}
+        for column, kind in (('owner', 'TEXT'), ('lease_expires', 'REAL')):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE urls ADD COLUMN {column} {kind}")
+        self._db.commit()
+
+    # Queue URLs in order; URLs already known keep their state. `payloads` is an optional
+    # dict per URL handed back by claim() (e.g. the fighter name).
+    def add(self, urls, payloads=None, state=PENDING):
+        now = time.time()
+        with self._lock:
+            # Write-locked from the start so another process can't hand out the same seq
+            self._db.execute("BEGIN IMMEDIATE")
+            seq = self._db.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM urls").fetchone()[0]
+            self._db.executemany(
+                "INSERT OR IGNORE INTO urls (url, seq, state, payload, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (url, seq + i, state, json.dumps(payloads[i]) if payloads else None, now)
+                    for i, url in enumerate(urls)
+                ),
+            )
+            self._db.commit()
+
+    # After a crash, anything still in flight goes back to pending. Only for a frontier one
+    # process uses: shared ones get their dead nodes' URLs back when the leases expire.
+    def recover(self):
+        with self._lock:
+            n = self._db.execute(
+                "UPDATE urls SET state = ?, updated_at = ? WHERE state = ?", (PENDING, time.time(), IN_FLIGHT)
+            ).rowcount
+            self._db.commit()
+        return n
+
+    # Send URLs that finished without rows or ran out of attempts back to pending,
+    # e.g. events that were still upcoming when they were last scraped
+    def requeue_unproductive(self):
+        with self._lock:
+            n = self._db.execute(
+                "UPDATE urls SET state = ?, attempts = 0, updated_at = ? WHERE state = ? "
+                "OR (state = ? AND url IN (SELECT url FROM results WHERE rows = '[]'))",
+                (PENDING, time.time(), FAILED, DONE),
+            ).rowcount
+            self._db.commit()
+        return n
+
+    # Send every finished URL back to pending for a refresh pass; their stored rows stay until
+    # a re-scrape replaces them (complete) or confirms them (keep)
+    def requeue_done(self):
+        with self._lock:
+            n = self._db.execute(
+                "UPDATE urls SET state = ?, attempts = 0, updated_at = ? WHERE state = ?", (PENDING, time.time(), DONE)
+            ).rowcount
+            self._db.commit()
+        return n
+
+    # Mark up to `n` pending URLs in flight and return them as payload dicts with 'url' set.
+    # With an `owner` they are leased to it for `lease_seconds`, and URLs whose lease has
+    # expired (their node stopped heartbeating) are claimed as well.
+    def claim(self, n=1, owner=None, lease_seconds=None):
+        now = time.time()
+        expires = now + lease_seconds if lease_seconds else None
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            rows = self._db.execute(
+                "SELECT url, payload FROM urls WHERE state = ? "
+                "OR (state = ? AND lease_expires IS NOT NULL AND lease_expires < ?) ORDER BY seq LIMIT ?",
+                (PENDING, IN_FLIGHT, now, n),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE urls SET state = ?, attempts = attempts + 1, owner = ?, lease_expires = ?, updated_at = ? "
+                "WHERE url = ?",
+                ((IN_FLIGHT, owner, expires, now, url) for url, _ in rows),
+            )
+            self._db.commit()
+        return [dict(json.loads(payload) if payload else {}, url=url) for url, payload in rows]
+
+    # Push back the expiry of every lease `owner` holds; returns how many it holds
+    def heartbeat(self, owner, lease_seconds):
+        with self._lock:
+            with self._db:
+                return self._db.execute(
+                    "UPDATE urls SET lease_expires = ? WHERE owner = ? AND state = ?",
+                    (time.time() + lease_seconds, owner, IN_FLIGHT),
+                ).rowcount
+
+    # Clause limiting an update to URLs `owner` still holds (any URL without an owner)
+    @staticmethod
+    def _held(owner):
+        return (" AND owner = ? AND state = ?", (owner, IN_FLIGHT)) if owner is not None else ("", ())
+
+    # Store a URL's rows and mark it done in one transaction. False (and nothing stored)
+    # when `owner` lost the lease to another node, which will deliver the rows itself.
+    def complete(self, url, rows, owner=None):
+        now = time.time()
+        held, params = self._held(owner)
+        with self._lock:
+            with self._db:
+                updated = self._db.execute(
+                    "UPDATE urls SET state = ?, last_error = NULL, lease_expires = NULL, updated_at = ? "
+                    "WHERE url = ?" + held,
+                    (DONE, now, url) + params,
+                ).rowcount
+                if not updated:
+                    return False
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (url, rows, finished_at) VALUES (?, ?, ?)",
+                    (url, json.dumps(rows), now),
+                )
+        return True
+
+    # Mark a URL done with the rows it already has, e.g. when its page hasn't changed since,
+    # or noting `error` when a re-scrape failed and those rows are still the best there are
+    def keep(self, url, owner=None, error=None):
+        held, params = self._held(owner)
+        with self._lock:
+            with self._db:
+                return self._db.execute(
+                    "UPDATE urls SET state = ?, last_error = ?, lease_expires = NULL, updated_at = ? "
+                    "WHERE url = ? AND url IN (SELECT url FROM results)" + held,
+                    (DONE, str(error)[:500] if error is not None else None, time.time(), url) + params,
+                ).rowcount > 0
+
+    # Requeue a failed URL until it has used up max_attempts; False when `owner` lost the lease
+    def fail(self, url, error, owner=None):
+        held, params = self._held(owner)
+        with self._lock:
+            with self._db:
+                return self._db.execute(
+                    "UPDATE urls SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                    "last_error = ?, lease_expires = NULL, updated_at = ? WHERE url = ?" + held,
+                    (self.max_attempts, FAILED, PENDING, str(error)[:500], time.time(), url) + params,
+                ).rowcount > 0
+
+    def counts(self):
+        with self._lock:
+            found = dict(self._db.execute("SELECT state, COUNT(*) FROM urls GROUP BY state").fetchall())
+        return {state: found.get(state, 0) for state in (PENDING, IN_FLIGHT, DONE, FAILED)}
+
+    def row_count(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(json_array_length(rows)), 0) FROM results").fetchone()[0]
+
+    # Every known URL, whatever its state, in crawl order
+    def urls(self):
+        with self._lock:
+            return [url for (url,) in self._db.execute("SELECT url FROM urls ORDER BY seq").fetchall()]
+
+    # Every stored row of every finished URL, in crawl order
+    def iter_rows(self):
+        with self._lock:
+            results = self._db.execute(
+                "SELECT r.rows FROM results AS r JOIN urls AS u ON u.url = r.url ORDER BY u.seq"
+            ).fetchall()
+        for (rows,) in results:
+            yield from json.loads(rows)
+
+    # (url, payload dict, rows) for every finished URL, in crawl order
+    def iter_results(self):
+        with self._lock:
+            results = self._db.execute(
+                "SELECT u.url, u.payload, r.rows FROM results AS r JOIN urls AS u ON u.url = r.url ORDER BY u.seq"
+            ).fetchall()
+        for url, payload, rows in results:
+            yield url, json.loads(payload) if payload else {}, json.loads(rows)
+
+    def report(self):
+        counts = self.counts()
+        return "🧭 Frontier: " + ", ".join(f"{n} {state}" for state, n in counts.items())
@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+# Defaults, overridable from the environment
+SPANS_LOG = os.environ.get("CRAWL_SPANS_LOG", "crawl_spans.jsonl")
+PROMETHEUS_FILE = os.environ.get("CRAWL_METRICS_PROM", "crawl_metrics.prom")
+# Percentiles, pages/min and error rates cover the last WINDOW_SECONDS of the crawl
+WINDOW_SECONDS = float(os.environ.get("CRAWL_METRICS_WINDOW", 300))
+
+# Phases the fetch path reports, in the order a page goes through them
+PHASES = [
+    'cache', 'rate_wait', 'http', 'driver_acquire', 'driver_startup', 'driver_get', 'selector_wait',
+    'parse', 'write', 'sleep', 'breaker_wait', 'vpn',
+]
+
+
+class Metrics:
+    # Timing spans for every fetch phase, kept two ways: cumulative counts/sums since the
+    # crawl started, and a rolling window the percentiles and rates are computed over.
+    # Each span is also appended to a JSONL log when `spans_log` is set, so a dashboard
+    # can tail it; export() rewrites the Prometheus text file.
+    def __init__(self, spans_log=SPANS_LOG, prometheus_file=PROMETHEUS_FILE, window_seconds=WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.prometheus_file = prometheus_file
+        self.clock = time.time
+        self.started = self.clock()
+        self._lock = threading.Lock()
+        self._log = open(spans_log, 'a', buffering=1) if spans_log else None
+
+        self.counts = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.errors = defaultdict(int)
+        self.pages = 0
+        self.rows = 0
+        self._spans = defaultdict(deque)
+        self._pages = deque()
+        self._errors = deque()
+
+    # Time the block as `phase`; an exception escaping it is counted by its type and re-raised
+    @contextmanager
+    def span(self, phase, **fields):
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.record(phase, time.perf_counter() - start, error, **fields)
+
+    def record(self, phase, seconds, error=None, at=None, **fields):
+        now = self.clock() if at is None else at
+        with self._lock:
+            self.counts[phase] += 1
+            self.seconds[phase] += seconds
+            self._spans[phase].append((now, seconds))
+            if error is not None:
+                self.errors[(phase, error)] += 1
+                self._errors.append((now, phase, error))
+            self._prune(now)
+            if self._log is not None:
+                line = {'ts': round(now, 3), 'phase': phase, 'seconds': round(seconds, 4), 'error': error}
+                line.update(fields)
+                self._log.write(json.dumps(line) + "\n")
+
+    # An outcome that counts as an error of `phase` without a span of its own (e.g. an HTTP 429)
+    def error(self, phase, error, at=None):
+        now = self.clock() if at is None else at
+        with self._lock:
+            self.errors[(phase, error)] += 1
+            self._errors.append((now, phase, error))
+            if self._log is not None:
+                self._log.write(json.dumps({'ts': round(now, 3), 'phase': phase, 'error': error}) + "\n")
+
+    # One finished page (a fighter or event) and the rows it produced
+    def page(self, rows=0, error=None, at=None):
+        now = self.clock() if at is None else at
+        with self._lock:
+            self.pages += 1
+            self.rows += rows
+            self._pages.append((now, rows, error))
+            self._prune(now)
+            if self._log is not None:
+                self._log.write(json.dumps({'ts': round(now, 3), 'page': 1, 'rows': rows, 'error': error}) + "\n")
+
+    def _prune(self, now):
+        cutoff = now - self.window_seconds
+        for window in (*self._spans.values(), self._pages, self._errors):
+            while window and window[0][0] < cutoff:
+                window.popleft()
+
+    # Rolling summary over the window: pages/min, p50/p95 per phase, errors by type, rows per page
+    def summary(self):
+        now = self.clock()
+        with self._lock:
+            self._prune(now)
+            elapsed = min(self.window_seconds, now - self.started) or 1e-9
+            phases = {}
+            for phase, window in self._spans.items():
+                if not window:
+                    continue
+                values = np.fromiter((seconds for _, seconds in window), dtype=np.float64, count=len(window))
+                phases[phase] = {
+                    'count': len(values),
+                    'p50': float(np.percentile(values, 50)),
+                    'p95': float(np.percentile(values, 95)),
+                    'total': float(values.sum()),
+                }
+            errors = defaultdict(int)
+            for _, phase, error in self._errors:
+                errors[error] += 1
+            rows = np.array([rows for _, rows, _ in self._pages], dtype=np.float64)
+            failed = sum(1 for _, _, error in self._pages if error is not None)
+
+        pages = len(rows)
+        return {
+            'window_seconds': elapsed,
+            'pages_per_minute': pages / elapsed * 60,
+            'pages': pages,
+            'page_error_rate': failed / pages if pages else 0.0,
+            'rows_per_page': float(rows.mean()) if pages else 0.0,
+            'rows_per_page_p50': float(np.percentile(rows, 50)) if pages else 0.0,
+            'phases': phases,
+            'errors': dict(errors),
+            'error_rate': {error: n / pages for error, n in errors.items()} if pages else {},
+        }
+
+    def report(self):
+        s = self.summary()
+        lines = [
+            f"📊 Last {s['window_seconds']:.0f}s: {s['pages_per_minute']:.1f} pages/min, "
+            f"{s['rows_per_page']:.1f} rows/page (p50 {s['rows_per_page_p50']:.0f}), "
+            f"{s['page_error_rate']:.0%} pages failed"
+        ]
+        for phase in sorted(s['phases'], key=lambda p: PHASES.index(p) if p in PHASES else len(PHASES)):
+            p = s['phases'][phase]
+            lines.append(f"   {phase:<15} {p['count']:>5}x  p50 {p['p50']:.2f}s  p95 {p['p95']:.2f}s  total {p['total']:.0f}s")
+        if s['errors']:
+            lines.append("   errors: " + ", ".join(f"{error} {n}" for error, n in sorted(s['errors'].items(), key=lambda e: -e[1])))
+        return "\n".join(lines)
+
+    # Prometheus text exposition: cumulative counters plus windowed quantiles per phase
+    def prometheus(self):
+        s = self.summary()
+        with self._lock:
+            counts, seconds, errors = dict(self.counts), dict(self.seconds), dict(self.errors)
+            pages, rows = self.pages, self.rows
+
+        lines = [
+            "# HELP crawl_phase_seconds Time spent per fetch phase (quantiles over the rolling window)",
+            "# TYPE crawl_phase_seconds summary",
+        ]
+        for phase in sorted(counts):
+            if phase in s['phases']:
+                for quantile in ('p50', 'p95'):
+                    lines.append(f'crawl_phase_seconds{{phase="{phase}",quantile="0.{quantile[1:]}"}} {s["phases"][phase][quantile]:.6f}')
+            lines.append(f'crawl_phase_seconds_count{{phase="{phase}"}} {counts[phase]}')
+            lines.append(f'crawl_phase_seconds_sum{{phase="{phase}"}} {seconds[phase]:.6f}')
+        lines += ["# HELP crawl_errors_total Exceptions escaping a phase, by type", "# TYPE crawl_errors_total counter"]
+        for (phase, error), n in sorted(errors.items()):
+            lines.append(f'crawl_errors_total{{phase="{phase}",error="{error}"}} {n}')
+        lines += [
+            "# TYPE crawl_pages_total counter", f"crawl_pages_total {pages}",
+            "# TYPE crawl_rows_total counter", f"crawl_rows_total {rows}",
+            "# TYPE crawl_pages_per_minute gauge", f"crawl_pages_per_minute {s['pages_per_minute']:.3f}",
+            "# TYPE crawl_rows_per_page gauge", f"crawl_rows_per_page {s['rows_per_page']:.3f}",
+            "# TYPE crawl_page_error_rate gauge", f"crawl_page_error_rate {s['page_error_rate']:.4f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    # Rewrite the Prometheus file in place (node_exporter's textfile collector reads it as is)
+    def export(self):
+        if not self.prometheus_file:
+            return
+        with open(self.prometheus_file + ".tmp", 'w') as f:
+            f.write(self.prometheus())
+        os.replace(self.prometheus_file + ".tmp", self.prometheus_file)
+
+    def close(self):
+        self.export()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+# metrics.span(phase) when there is a Metrics, a no-op block otherwise
+def timed(metrics, phase, **fields):
+    return metrics.span(phase, **fields) if metrics is not None else nullcontext()
+
+
+# Replay a spans log into a Metrics (no files written), e.g. to summarise a finished crawl
+def load_spans(path, window_seconds=float('inf')):
+    metrics = Metrics(spans_log=None, prometheus_file=None, window_seconds=window_seconds)
+    first = last = None
+    with open(path) as f:
+        for line in f:
+            span = json.loads(line)
+            first = span['ts'] if first is None else first
+            last = span['ts']
+            if 'page' in span:
+                metrics.page(span['rows'], span['error'], at=span['ts'])
+            elif 'seconds' not in span:
+                metrics.error(span['phase'], span['error'], at=span['ts'])
+            else:
+                metrics.record(span['phase'], span['seconds'], span['error'], at=span['ts'])
+    if first is not None:
+        metrics.started = first
+        metrics.clock = lambda: last
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarise a crawl spans log")
+    parser.add_argument("path", nargs="?", default=SPANS_LOG)
+    parser.add_argument("--prometheus", action="store_true", help="print the Prometheus text format instead")
+    args = parser.parse_args()
+
+    metrics = load_spans(args.path)
+    print(metrics.prometheus() if args.prometheus else metrics.report())
@@ -0,0 +1,234 @@
+import argparse
+import os
+import shutil
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from fighter_registry import REGISTRY, FighterRegistry
+
+BOUTS_DATASET = "5a_fighter_bouts_dataset"
+TYPED_DATASET = "5a_fighter_bouts_typed"
+
+# Date layouts seen in fighter_dob and event_year + event_month_day, tried in order
+DATE_FORMATS = ["%Y %b %d", "%Y %B %d", "%Y %m.%d", "%Y %m/%d"]
+
+CM_PER_INCH = 2.54
+LBS_PER_KG = 2.20462
+DEFAULT_ROUND_SECONDS = 300
+
+# Method categories, first match wins (case-insensitive regex on the method text)
+METHOD_CATEGORIES = [
+    ('No Contest', r"no contest|\bnc\b|overturned"),
+    ('DQ', r"disqualif|\bdq\b"),
+    ('Decision', r"decision|\bdec\b"),
+    ('Submission', r"submission|\bsub\b"),
+    ('KO/TKO', r"\bt?ko\b|knockout|stoppage|retire"),
+    ('Draw', r"draw"),
+]
+
+# Columns that stay text but repeat a lot, stored dictionary-encoded
+CATEGORY_COLUMNS = ['foundational_style', 'result', 'finish_shortened']
+
+
+# The scrapers write the literal 'null' (or nothing) for missing values
+def nullify(column):
+    column = pc.utf8_trim_whitespace(column)
+    return pc.if_else(pc.is_in(column, pa.array(['null', ''])), pa.scalar(None, pa.string()), column)
+
+
+# Named regex groups of `pattern` as float64 columns (null where the pattern doesn't match)
+def extract_numbers(column, pattern):
+    groups = pc.extract_regex(column, pattern)
+    names = [field.name for field in groups.type]
+    values = {}
+    for name in names:
+        text = pc.struct_field(groups, name)
+        text = pc.if_else(pc.equal(text, ''), pa.scalar(None, pa.string()), text)
+        values[name] = pc.cast(text, pa.float64())
+    return values
+
+
+# Run `parse` once per distinct value of `column` and spread the result(s) back over the
+# rows. Heights, weights, dates and methods repeat heavily, so this does most of the work
+# on a few thousand strings instead of every bout row.
+def on_distinct(column, parse):
+    encoded = pc.dictionary_encode(column)
+    if isinstance(encoded, pa.ChunkedArray):
+        encoded = encoded.combine_chunks() if encoded.num_chunks else pa.array([], column.type).dictionary_encode()
+    parsed = parse(encoded.dictionary)
+    if isinstance(parsed, tuple):
+        return tuple(pc.take(values, encoded.indices) for values in parsed)
+    return pc.take(parsed, encoded.indices)
+
+
+# Date strings -> date32 by Arrow's strptime
+def parse_dates(column, formats=DATE_FORMATS):
+    def parse(values):
+        parsed = pa.nulls(len(values), pa.timestamp('s'))
+        for fmt in formats:
+            parsed = pc.coalesce(parsed, pc.strptime(values, format=fmt, unit='s', error_is_null=True))
+        return pc.cast(parsed, pa.date32())
+    return on_distinct(column, parse)
+
+
+# '5\'11" (180cm)' or '5\'11"' -> 180.3; the metric value wins when the page gives one
+def height_cm(column):
+    metric = extract_numbers(column, r"(?P<cm>\d+(?:\.\d+)?)\s*cm")['cm']
+    imperial = extract_numbers(column, r"(?P<ft>\d+)'\s*(?P<inch>\d+(?:\.\d+)?)?")
+    inches = pc.add(pc.multiply(imperial['ft'], 12.0), pc.fill_null(imperial['inch'], 0.0))
+    return pc.cast(pc.coalesce(metric, pc.multiply(inches, CM_PER_INCH)), pa.float32())
+
+
+# '74.0"' or '188cm' -> cm
+def reach_cm(column):
+    metric = extract_numbers(column, r"(?P<cm>\d+(?:\.\d+)?)\s*cm")['cm']
+    inches = extract_numbers(column, r"^(?P<inch>\d+(?:\.\d+)?)\s*(?:\"|in|$)")['inch']
+    return pc.cast(pc.coalesce(metric, pc.multiply(inches, CM_PER_INCH)), pa.float32())
+
+
+# '155 lbs (70.3 kgs)' -> 155; kg-only weights are converted
+def weight_lbs(column):
+    lbs = extract_numbers(column, r"(?P<lbs>\d+(?:\.\d+)?)\s*lbs?")['lbs']
+    kgs = extract_numbers(column, r"(?P<kgs>\d+(?:\.\d+)?)\s*kgs?")['kgs']
+    return pc.cast(pc.coalesce(lbs, pc.multiply(kgs, LBS_PER_KG)), pa.float32())
+
+
+# '+150 (Moderate Underdog)' -> 150, '-200' -> -200; 'Even' -> 100
+def american_odds(column):
+    odds = extract_numbers(column, r"(?P<odds>[+-]?\d+)")['odds']
+    even = pc.fill_null(pc.match_substring(column, 'even', ignore_case=True), False)
+    return pc.cast(pc.if_else(even, 100.0, odds), pa.int32())
+
+
+# '3 x 5 Minute Rounds' -> (3, 300)
+def scheduled_rounds(column):
+    values = extract_numbers(column, r"(?P<rounds>\d+)\s*x\s*(?P<minutes>\d+)")
+    return pc.cast(values['rounds'], pa.int8()), pc.cast(pc.multiply(values['minutes'], 60.0), pa.int16())
+
+
+# 'KO/TKO (Punches) · 2:17 Round 2 of 3' -> method category, detail, round, seconds into
+# that round, and the total elapsed seconds when the page states it ('25:00 Total')
+def victory(column):
+    method = pc.utf8_trim_whitespace(pc.struct_field(pc.extract_regex(column, r"^(?P<m>[^·]*)"), 'm'))
+    detail = pc.struct_field(pc.extract_regex(method, r"\((?P<d>[^)]*)\)"), 'd')
+
+    conditions = [pc.fill_null(pc.match_substring_regex(method, pattern, ignore_case=True), False)
+                  for _, pattern in METHOD_CATEGORIES]
+    category = pc.case_when(
+        pc.make_struct(*conditions, field_names=[name for name, _ in METHOD_CATEGORIES]),
+        *[name for name, _ in METHOD_CATEGORIES],
+        pc.if_else(pc.equal(method, ''), pa.scalar(None, pa.string()), 'Other'),
+    )
+
+    clock = extract_numbers(column, r"·\s*(?P<min>\d+):(?P<sec>\d{2})")
+    total = extract_numbers(column, r"(?P<min>\d+):(?P<sec>\d{2})\s*Total")
+    round_number = extract_numbers(column, r"(?:Round|R)\s*(?P<round>\d+)")['round']
+
+    detail = pc.if_else(pc.equal(detail, ''), pa.scalar(None, pa.string()), detail)
+    return (
+        category, detail, pc.cast(round_number, pa.int8()),
+        pc.add(pc.multiply(clock['min'], 60.0), clock['sec']),
+        pc.add(pc.multiply(total['min'], 60.0), total['sec']),
+    )
+
+
+# String bout rows -> typed columns. Every step is an Arrow compute kernel over whole
+# columns; columns a table doesn't have (e.g. the 4a2 subset) are skipped. With a registry,
+# fighter URLs and names become int32 fighter_id / opponent_id and the names live there.
+def normalize_table(table, registry=None):
+    raw = {name: nullify(table[name]) if pa.types.is_string(table.schema.field(name).type) else table[name]
+           for name in table.column_names}
+    columns = {}
+
+    if registry is not None:
+        for url, name, id_column in (('original_fighter_url', 'original_fighter_name', 'fighter_id'),
+                                     ('opponent_url', 'opponent_name', 'opponent_id')):
+            if url in raw:
+                columns[id_column] = registry.id_column(raw.pop(url), raw.pop(name, None))
+            raw.pop(name, None)
+
+    for name in ('original_fighter_name', 'original_fighter_url'):
+        if name in raw:
+            columns[name] = raw[name]
+    if 'fighter_dob' in raw:
+        columns['fighter_dob'] = parse_dates(raw['fighter_dob'])
+    if 'fighter_height' in raw:
+        columns['fighter_height_cm'] = on_distinct(raw['fighter_height'], height_cm)
+    if 'fighter_reach' in raw:
+        columns['fighter_reach_cm'] = on_distinct(raw['fighter_reach'], reach_cm)
+    for name in ('opponent_name', 'opponent_url', 'event_url'):
+        if name in raw:
+            columns[name] = raw[name]
+    if 'event_year' in raw:
+        year = pc.cast(raw['event_year'], pa.string())
+        if 'event_month_day' in raw:
+            columns['event_date'] = parse_dates(pc.binary_join_element_wise(year, raw['event_month_day'], ' '))
+        columns['event_year'] = pc.cast(extract_numbers(year, r"^(?P<year>\d{4})$")['year'], pa.int16())
+
+    round_seconds = None
+    if 'duration' in raw:
+        columns['scheduled_rounds'], round_seconds = on_distinct(raw['duration'], scheduled_rounds)
+        columns['round_seconds'] = round_seconds
+    if 'weight' in raw:
+        columns['weight_lbs'] = on_distinct(raw['weight'], weight_lbs)
+    if 'odds' in raw:
+        columns['odds'] = on_distinct(raw['odds'], american_odds)
+    if 'victory_details' in raw:
+        # Elapsed time depends on the round length too, so only the text parts go per distinct value
+        method, detail, finish_round, clock, total = on_distinct(raw['victory_details'], victory)
+        length = pc.fill_null(pc.cast(round_seconds, pa.float64()), float(DEFAULT_ROUND_SECONDS)) \
+            if round_seconds is not None else float(DEFAULT_ROUND_SECONDS)
+        elapsed = pc.add(pc.multiply(pc.subtract(pc.fill_null(pc.cast(finish_round, pa.float64()), 1.0), 1.0), length), clock)
+        columns['method'] = pc.dictionary_encode(method)
+        columns['method_detail'] = pc.dictionary_encode(detail)
+        columns['finish_round'] = finish_round
+        columns['finish_seconds'] = pc.cast(pc.coalesce(total, elapsed), pa.int32())
+    for name in CATEGORY_COLUMNS:
+        if name in raw:
+            columns[name] = pc.dictionary_encode(raw[name])
+
+    return pa.table(columns)
+
+
+# Normalise a compacted bout dataset into a typed dataset with the same event_year
+# partitions, interning fighters in the registry (saved afterwards)
+def normalize_dataset(source=BOUTS_DATASET, destination=TYPED_DATASET, registry_path=REGISTRY):
+    start = time.perf_counter()
+    partitioning = ds.partitioning(pa.schema([('event_year', pa.string())]), flavor='hive')
+    table = ds.dataset(source, format='parquet', partitioning=partitioning).to_table()
+    registry = FighterRegistry(registry_path)
+    typed = normalize_table(table, registry)
+    registry.save()
+
+    if os.path.exists(destination):
+        shutil.rmtree(destination)
+    ds.write_dataset(
+        typed, destination, format='parquet',
+        partitioning=['event_year'] if 'event_year' in typed.column_names else None, partitioning_flavor='hive',
+        file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'),
+        max_rows_per_group=100000,
+    )
+    print(
+        f"✅ Normalised {typed.num_rows} row(s) in {time.perf_counter() - start:.2f}s: "
+        f"{_size(source) / 1024 ** 2:.1f} MB → {_size(destination) / 1024 ** 2:.1f} MB ({destination})"
+    )
+    return typed
+
+
+def _size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Turn the string bout columns into typed Arrow columns")
+    parser.add_argument("source", nargs="?", default=BOUTS_DATASET, help="compacted string dataset")
+    parser.add_argument("destination", nargs="?", default=TYPED_DATASET, help="typed output dataset")
+    parser.add_argument("--registry", default=REGISTRY, help="fighter id registry to intern URLs into")
+    args = parser.parse_args()
+
+    normalize_dataset(args.source, args.destination, args.registry)
@@ -0,0 +1,237 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+# Defaults, overridable from the environment
+CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", "page_cache")
+CACHE_TTL_DAYS = float(os.environ.get("PAGE_CACHE_TTL_DAYS", 30))
+CACHE_MAX_BYTES = int(float(os.environ.get("PAGE_CACHE_MAX_GB", 5)) * 1024 ** 3)
+# How often a long-running process sweeps out expired pages, whatever the cache's size
+EXPIRE_INTERVAL_SECONDS = 3600
+
+
+def url_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+class PageCache:
+    # Gzipped raw HTML on disk, one file per (URL, fetch date):
+    #   <root>/<key[:2]>/<key>-<YYYYMMDD>.html.gz
+    # A SQLite index tracks size and last access for TTL and size-bounded LRU eviction,
+    # and the validators of each URL's last download (ETag, Last-Modified, content digest)
+    # for conditional re-fetches.
+    def __init__(self, root=CACHE_DIR, ttl_days=CACHE_TTL_DAYS, max_bytes=CACHE_MAX_BYTES):
+        self.root = root
+        self.ttl_seconds = ttl_days * 86400
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT NOT NULL,
+                fetch_date TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (url, fetch_date)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                digest TEXT,
+                size INTEGER NOT NULL,
+                seconds REAL NOT NULL,
+                checked_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+        self.total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        # Pages past the TTL are swept on the first put() and then every EXPIRE_INTERVAL_SECONDS,
+        # not only under size pressure. A cache only read from (FETCH_OFFLINE, reparse.py)
+        # keeps them, since re-parsing old pages is what those are for.
+        self._expired_at = 0.0
+
+    def _path(self, url, fetch_date):
+        key = url_key(url)
+        return os.path.join(key[:2], f"{key}-{fetch_date.replace('-', '')}.html.gz")
+
+    # Newest cached copy of `url` no older than `max_age` seconds (defaults to the TTL)
+    def get(self, url, max_age=None):
+        max_age = self.ttl_seconds if max_age is None else max_age
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fetch_date, path FROM pages WHERE url = ? AND fetched_at >= ? "
+                "ORDER BY fetched_at DESC LIMIT 1",
+                (url, now - max_age),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE pages SET last_access = ? WHERE url = ? AND fetch_date = ?", (now, url, row[0])
+            )
+            self._db.commit()
+
+        try:
+            html = read_cached_page(os.path.join(self.root, row[1]))
+        except OSError:
+            self._forget(url, row[0])
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return html
+
+    def put(self, url, html):
+        now = time.time()
+        fetch_date = datetime.fromtimestamp(now, timezone.utc).strftime('%Y-%m-%d')
+        rel_path = self._path(url, fetch_date)
+        full_path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        tmp_path = f"{full_path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(tmp_path, full_path)
+        size = os.path.getsize(full_path)
+
+        with self._lock:
+            old = self._db.execute(
+                "SELECT size FROM pages WHERE url = ? AND fetch_date = ?", (url, fetch_date)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (url, fetch_date, rel_path, size, now, now),
+            )
+            self._db.commit()
+            self.total_bytes += size - (old[0] if old else 0)
+            superseded = self._db.execute(
+                "SELECT fetch_date FROM pages WHERE url = ? AND fetch_date != ?", (url, fetch_date)
+            ).fetchall()
+        # Only the newest copy of a URL is ever served; earlier days' copies just take up space
+        for (old_date,) in superseded:
+            self._forget(url, old_date)
+
+        if now - self._expired_at > EXPIRE_INTERVAL_SECONDS:
+            self.expire()
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    # Validators from the last download of `url`, as a dict; None unless a cached copy is
+    # still on hand to serve should the server answer 304
+    def fingerprint(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, digest, size, seconds FROM fingerprints AS f "
+                "WHERE url = ? AND EXISTS (SELECT 1 FROM pages WHERE url = f.url)",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('etag', 'last_modified', 'digest', 'size', 'seconds'), row))
+
+    # `size` is the downloaded body in bytes and `seconds` what the download took
+    def set_fingerprint(self, url, etag, last_modified, digest, size, seconds):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, digest, size, seconds, time.time()),
+            )
+            self._db.commit()
+
+    # Newest cached copy of `url` whatever its age, marked fresh again: the server has
+    # just confirmed it is unchanged
+    def revalidate(self, url):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fetch_date FROM pages WHERE url = ? ORDER BY fetched_at DESC LIMIT 1", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE pages SET fetched_at = ?, last_access = ? WHERE url = ? AND fetch_date = ?",
+                (now, now, url, row[0]),
+            )
+            self._db.execute("UPDATE fingerprints SET checked_at = ? WHERE url = ?", (now, url))
+            self._db.commit()
+        return self.get(url)
+
+    def _forget(self, url, fetch_date):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT path, size FROM pages WHERE url = ? AND fetch_date = ?", (url, fetch_date)
+            ).fetchone()
+            if row is None:
+                return
+            self._db.execute("DELETE FROM pages WHERE url = ? AND fetch_date = ?", (url, fetch_date))
+            self._db.commit()
+            self.total_bytes -= row[1]
+        try:
+            os.remove(os.path.join(self.root, row[0]))
+        except FileNotFoundError:
+            pass
+
+    # Drop every page older than the TTL; returns how many
+    def expire(self):
+        self._expired_at = time.time()
+        with self._lock:
+            expired = self._db.execute(
+                "SELECT url, fetch_date FROM pages WHERE fetched_at < ?", (self._expired_at - self.ttl_seconds,)
+            ).fetchall()
+        for url, fetch_date in expired:
+            self._forget(url, fetch_date)
+        return len(expired)
+
+    # Drop expired pages, then least recently used pages until under max_bytes
+    def evict(self):
+        self.expire()
+        while self.total_bytes > self.max_bytes:
+            with self._lock:
+                lru = self._db.execute(
+                    "SELECT url, fetch_date FROM pages ORDER BY last_access ASC LIMIT 100"
+                ).fetchall()
+            if not lru:
+                break
+            for url, fetch_date in lru:
+                self._forget(url, fetch_date)
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    # Newest copy of every cached URL, e.g. for re-parsing without the network
+    def entries(self, url_prefix=""):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, fetch_date, path FROM pages AS p WHERE url LIKE ? AND fetched_at = "
+                "(SELECT MAX(fetched_at) FROM pages WHERE url = p.url) ORDER BY url",
+                (url_prefix + '%',),
+            ).fetchall()
+        return [(url, fetch_date, os.path.join(self.root, path)) for url, fetch_date, path in rows]
+
+    def report(self):
+        return (
+            f"🗄️ Page cache: {self.hits} hit(s), {self.misses} miss(es), "
+            f"{self.total_bytes / 1024 ** 2:.1f} MB on disk"
+        )
+
+
+def read_cached_page(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return f.read()
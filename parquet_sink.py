@@ -0,0 +1,211 @@
+import argparse
+import glob
+import os
+import re
+import shutil
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from fighter_parser import BOUT_COLUMNS
+
+# Every scraped field is kept as a string (with 'null' for missing values)
+BOUT_SCHEMA = pa.schema([(col, pa.string()) for col in BOUT_COLUMNS])
+
+IN_PROGRESS = ".inprogress"
+
+
+def subset_schema(columns, schema=BOUT_SCHEMA):
+    return pa.schema([schema.field(col) for col in columns])
+
+
+class ParquetSink:
+    # Streams rows into <directory>/part-NNNNN.parquet with a fixed schema. Rows are buffered
+    # into row groups of `row_group_rows`, and a part is closed and a new one started once it
+    # reaches `max_file_bytes`. Parts are written as *.inprogress and renamed when closed, so
+    # readers only ever see complete files.
+    def __init__(self, directory, schema=BOUT_SCHEMA, max_file_bytes=256 * 1024 ** 2,
+                 row_group_rows=20000, compression='zstd'):
+        self.directory = directory
+        self.schema = schema
+        self.max_file_bytes = max_file_bytes
+        self.row_group_rows = row_group_rows
+        self.compression = compression
+        os.makedirs(directory, exist_ok=True)
+
+        # A part left open by a crash has no footer and can't be read back
+        self.discarded_parts = 0
+        for path in glob.glob(os.path.join(directory, f"*{IN_PROGRESS}")):
+            os.remove(path)
+            self.discarded_parts += 1
+
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._writer = None
+        self._path = None
+        self._next_part = self._last_part_number() + 1
+        self.rows_written = 0
+
+    def _last_part_number(self):
+        numbers = [
+            int(m.group(1)) for m in
+            (re.match(r"part-(\d+)\.parquet$", name) for name in os.listdir(self.directory)) if m
+        ]
+        return max(numbers, default=-1)
+
+    def parts(self):
+        return sorted(glob.glob(os.path.join(self.directory, "part-*.parquet")))
+
+    # Rows already in closed parts, read from the Parquet footers only
+    def stored_rows(self):
+        return sum(pq.ParquetFile(path).metadata.num_rows for path in self.parts())
+
+    def write_rows(self, rows):
+        with self._lock:
+            self._buffer.extend(rows)
+            if len(self._buffer) >= self.row_group_rows:
+                self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        if self._writer is None:
+            self._path = os.path.join(self.directory, f"part-{self._next_part:05d}.parquet")
+            self._next_part += 1
+            self._writer = pq.ParquetWriter(self._path + IN_PROGRESS, self.schema, compression=self.compression)
+
+        table = pa.Table.from_pylist(self._buffer, schema=self.schema)
+        self._writer.write_table(table, row_group_size=self.row_group_rows)
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+        if os.path.getsize(self._path + IN_PROGRESS) >= self.max_file_bytes:
+            self._close_part()
+
+    def _close_part(self):
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self._path + IN_PROGRESS, self._path)
+            self._writer = None
+            self._path = None
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._close_part()
+
+    # Replace every part with `rows`, e.g. from the frontier after a crash
+    def rebuild(self, rows):
+        with self._lock:
+            self._buffer = []
+            if self._writer is not None:
+                self._writer.close()
+                os.remove(self._path + IN_PROGRESS)
+                self._writer = None
+            for path in self.parts():
+                os.remove(path)
+            self._next_part = 0
+
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.row_group_rows:
+                self.write_rows(batch)
+                batch = []
+        self.write_rows(batch)
+        self.close()
+
+    def report(self):
+        return f"🧱 Parquet sink: {self.rows_written} row(s) written to {self.directory}"
+
+
+# Merge many parts into one deduplicated dataset, hive-partitioned by `partition_by`
+def compact(source, destination, partition_by=('event_year',), schema=None):
+    parts = sorted(glob.glob(os.path.join(source, "part-*.parquet")))
+    table = ds.dataset(parts, format='parquet', schema=schema).to_table()
+    table = table.group_by(table.column_names).aggregate([]).select(table.column_names)
+
+    if os.path.exists(destination):
+        shutil.rmtree(destination)
+    ds.write_dataset(
+        table, destination, format='parquet',
+        partitioning=list(partition_by) if partition_by else None, partitioning_flavor='hive',
+        file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'),
+        max_rows_per_group=100000,
+    )
+    print(f"✅ Compacted {table.num_rows} unique row(s) from {source} → {destination}")
+    return table.num_rows
+
+
+# Insert or replace `rows` in a dataset written by compact(), matching on the `key` columns.
+# Rows already stored unchanged are dropped first, and only the partitions the remaining
+# rows fall in, or their replaced rows sat in, are read and rewritten, so the cost follows
+# the changed rows, not the dataset.
+def upsert(destination, rows, key, schema=BOUT_SCHEMA, partition_by='event_year'):
+    new = pa.Table.from_pylist(rows, schema=schema)
+    new = new.group_by(new.column_names).aggregate([]).select(new.column_names)
+    if new.num_rows == 0:
+        return 0
+
+    partitions = []
+    if os.path.isdir(destination):
+        dataset = ds.dataset(destination, format='parquet', schema=schema, partitioning='hive')
+        stored = dataset.to_table(filter=pc.field(key[0]).isin(pc.unique(new[key[0]])))
+        new = new.filter(pc.invert(pc.is_in(_row_ids(new), _row_ids(stored.select(new.column_names)))))
+        # A replaced row can sit in another partition than its replacement (a re-scrape that
+        # corrected or filled in the date); that partition is rewritten without it as well
+        replaced = stored.join(new.select(key), key, join_type='left semi')
+        partitions = pc.unique(replaced[partition_by]).to_pylist()
+    if new.num_rows == 0:
+        return 0
+
+    keys = new.select(key)
+    partitions += [value for value in pc.unique(new[partition_by]).to_pylist() if value not in partitions]
+    for value in partitions:
+        part_dir = os.path.join(destination, f"{partition_by}={value}")
+        changed = new.filter(pc.equal(new[partition_by], value)).drop_columns([partition_by])
+        if os.path.isdir(part_dir):
+            old_files = glob.glob(os.path.join(part_dir, "*.parquet"))
+            old = ds.dataset(old_files, format='parquet', schema=changed.schema).to_table()
+            # Keep every stored row whose key isn't being replaced
+            kept = old.join(keys, key, join_type='left anti').select(old.column_names)
+            changed = pa.concat_tables([kept, changed])
+        else:
+            os.makedirs(part_dir)
+            old_files = []
+
+        # The new file lands before the old ones go: a crash in between leaves duplicates, not gaps
+        if changed.num_rows:
+            path = os.path.join(part_dir, f"part-upsert-{time.time_ns()}.parquet")
+            pq.write_table(changed, path + IN_PROGRESS, compression='zstd')
+            os.replace(path + IN_PROGRESS, path)
+        for old_file in old_files:
+            os.remove(old_file)
+
+    print(f"✅ Upserted {new.num_rows} new or changed row(s) into {destination}")
+    return new.num_rows
+
+
+# One string per row of all columns, for whole-row set membership
+def _row_ids(table):
+    return pc.binary_join_element_wise(
+        *[pc.fill_null(table[col].cast(pa.string()), '\x00') for col in table.column_names], '\x1f'
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact streamed Parquet parts into one partitioned dataset")
+    parser.add_argument("source", help="directory of part-*.parquet files, e.g. 5a_fighter_bouts")
+    parser.add_argument("destination", help="output dataset directory, e.g. 5a_fighter_bouts_dataset")
+    parser.add_argument("--partition-by", nargs="*", default=["event_year"])
+    args = parser.parse_args()
+
+    compact(args.source, args.destination, args.partition_by)
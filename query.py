@@ -0,0 +1,190 @@
+import argparse
+import os
+import re
+
+import duckdb
+import pandas as pd
+
+from fighter_registry import FIGHTER_PATH, REGISTRY
+from fighter_parser import BASE_URL
+from normalize import TYPED_DATASET
+
+EVENTS = "2a_ufc_events.parquet"
+WINNERS = "3a_winners_combined.parquet"
+RESCRAPE_DATASET = "5a_rescrape_output_dataset"
+# DuckDB threads for scans; defaults to every core
+QUERY_THREADS = int(os.environ.get("QUERY_THREADS", 0))
+
+FIGHTER_SLUG = r"/fightcenter/fighters/([^/?#]+)"
+
+
+def _parquet(path):
+    # A partitioned dataset directory or a single file
+    if os.path.isdir(path):
+        return f"read_parquet('{os.path.join(path, '**', '*.parquet')}', hive_partitioning = true)"
+    return f"read_parquet('{path}')"
+
+
+class Queries:
+    # The pipeline's Parquet outputs as DuckDB views over the files themselves:
+    #   events    event_url of every promotion event (2a_ufc_events.parquet)
+    #   winners   winner, winner_link, winner_id (3a_winners_combined.parquet)
+    #   fighters  fighter_id, slug, name, url (the fighter registry)
+    #   bouts     the typed bout dataset, hive-partitioned by event_year
+    #   rescrape  the 4a2 subset, when it has been run
+    # Nothing is loaded up front: each query scans only the columns it names, predicates go
+    # into the Parquet scan (event_year ranges prune whole partitions, the rest skip row
+    # groups by their min/max statistics), and only the result comes back as a DataFrame.
+    def __init__(self, events=EVENTS, winners=WINNERS, registry=REGISTRY, bouts=TYPED_DATASET,
+                 rescrape=RESCRAPE_DATASET, threads=QUERY_THREADS):
+        self.con = duckdb.connect()
+        if threads:
+            self.con.execute(f"SET threads = {threads}")
+        self.views = []
+        self._view('events', events, "SELECT URL AS event_url FROM {}")
+        self._view('winners', winners, "SELECT * FROM {}")
+        self._view('fighters', registry,
+                   f"SELECT fighter_id, slug, name, '{BASE_URL + FIGHTER_PATH}' || slug AS url FROM {{}}")
+        self._view('bouts', bouts, "SELECT * FROM {}")
+        self._view('rescrape', rescrape, "SELECT * FROM {}")
+
+    def _view(self, name, path, select):
+        if path and os.path.exists(path):
+            self.con.execute(f"CREATE VIEW {name} AS " + select.format(_parquet(path)))
+            self.views.append(name)
+
+    def _require(self, *views):
+        missing = [view for view in views if view not in self.views]
+        if missing:
+            raise FileNotFoundError(f"No data for view(s) {', '.join(missing)}; run the stage that writes them first")
+
+    # Any SQL over the views, as a DataFrame
+    def sql(self, query, params=None):
+        return self.con.execute(query, params or []).df()
+
+    # DuckDB's physical plan for `query`: the Parquet scans list the projected columns and
+    # the filters pushed into them
+    def explain(self, query, params=None):
+        return "\n".join(row[1] for row in self.con.execute("EXPLAIN " + query, params or []).fetchall())
+
+    # Registry id of a fighter given by id, URL (any form) or name (case-insensitive, exact
+    # match preferred over a substring one)
+    def fighter_id(self, fighter):
+        self._require('fighters')
+        if isinstance(fighter, int) or str(fighter).isdigit():
+            return int(fighter)
+        match = re.search(FIGHTER_SLUG, str(fighter))
+        if match:
+            found = self.con.execute(
+                "SELECT fighter_id FROM fighters WHERE slug = ?", [match.group(1).lower()]
+            ).fetchall()
+        else:
+            found = self.con.execute(
+                "SELECT fighter_id, name FROM fighters WHERE name ILIKE ? "
+                "ORDER BY lower(name) = lower(?) DESC, fighter_id LIMIT 10",
+                [f"%{fighter}%", fighter],
+            ).fetchall()
+            exact = [row for row in found if row[1].lower() == str(fighter).lower()]
+            if len(found) > 1 and len(exact) != 1:
+                names = ", ".join(f"{name} ({fighter_id})" for fighter_id, name in found)
+                raise LookupError(f"{fighter!r} matches several fighters: {names}")
+        if not found:
+            raise LookupError(f"No fighter matches {fighter!r}")
+        return found[0][0]
+
+    # Wins, losses and finishes over a fighter's pro bouts, with their first and last dates
+    def record(self, fighter):
+        self._require('bouts', 'fighters')
+        fighter_id = self.fighter_id(fighter)
+        return self.sql("""
+            SELECT f.name, count(*) AS bouts,
+                   count(*) FILTER (WHERE b.result = 'W') AS wins,
+                   count(*) FILTER (WHERE b.result = 'L') AS losses,
+                   count(*) FILTER (WHERE b.result = 'W' AND b.method IN ('KO/TKO', 'Submission')) AS finishes,
+                   min(b.event_date) AS first_bout, max(b.event_date) AS last_bout
+            FROM bouts AS b JOIN fighters AS f ON f.fighter_id = b.fighter_id
+            WHERE b.fighter_id = ?
+            GROUP BY f.name
+        """, [fighter_id])
+
+    # A fighter's bouts, newest first
+    def history(self, fighter):
+        self._require('bouts', 'fighters')
+        return self.sql("""
+            SELECT b.event_date, b.result, o.name AS opponent, b.method, b.finish_round, b.event_url
+            FROM bouts AS b LEFT JOIN fighters AS o ON o.fighter_id = b.opponent_id
+            WHERE b.fighter_id = ?
+            ORDER BY b.event_date DESC NULLS LAST
+        """, [self.fighter_id(fighter)])
+
+    # Every bout between two fighters, from the first one's side. A bout scraped from both
+    # pages counts once; one only on the second fighter's page has its result flipped.
+    def head_to_head(self, fighter, opponent):
+        self._require('bouts', 'fighters')
+        a, b = self.fighter_id(fighter), self.fighter_id(opponent)
+        return self.sql("""
+            SELECT event_date, result, method, finish_round, event_url FROM (
+                SELECT DISTINCT ON (event_url) event_url, event_date, method, finish_round,
+                       CASE WHEN fighter_id = $1 THEN result
+                            WHEN result = 'W' THEN 'L' WHEN result = 'L' THEN 'W' ELSE result END AS result
+                FROM bouts
+                WHERE (fighter_id = $1 AND opponent_id = $2) OR (fighter_id = $2 AND opponent_id = $1)
+                ORDER BY event_url, fighter_id = $1 DESC
+            )
+            ORDER BY event_date
+        """, [a, b])
+
+    # Events and distinct bouts per year, optionally within [start, end] and only for events
+    # on the promotion's listing
+    def events_by_year(self, start=None, end=None, promotion_only=True):
+        self._require('bouts')
+        promotion = ""
+        if promotion_only and 'events' in self.views:
+            promotion = "AND event_url IN (SELECT event_url FROM events)"
+        return self.sql(f"""
+            SELECT event_year, count(DISTINCT event_url) AS events,
+                   count(DISTINCT (event_url, least(fighter_id, opponent_id),
+                                   greatest(fighter_id, opponent_id))) AS bouts
+            FROM bouts
+            WHERE event_year BETWEEN coalesce($1, 0) AND coalesce($2, 9999) {promotion}
+            GROUP BY event_year
+            ORDER BY event_year
+        """, [start, end])
+
+    def report(self):
+        return f"🦆 Query views: {', '.join(self.views) or 'none (no datasets found)'}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the scraped Parquet datasets without loading them")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("record", help="a fighter's record").add_argument("fighter", help="name, URL or registry id")
+    sub.add_parser("history", help="a fighter's bouts").add_argument("fighter", help="name, URL or registry id")
+    h2h = sub.add_parser("h2h", help="bouts between two fighters")
+    h2h.add_argument("fighter")
+    h2h.add_argument("opponent")
+    years = sub.add_parser("events-by-year", help="events and bouts per year")
+    years.add_argument("--from", dest="start", type=int)
+    years.add_argument("--to", dest="end", type=int)
+    years.add_argument("--all-promotions", action="store_true", help="count events off the promotion's listing too")
+    raw = sub.add_parser("sql", help="any SQL over the views")
+    raw.add_argument("query")
+    raw.add_argument("--explain", action="store_true", help="print the plan instead, to check the pushdown")
+    args = parser.parse_args()
+
+    pd.set_option('display.max_colwidth', None)
+    pd.set_option('display.width', 200)
+    queries = Queries()
+    print(queries.report())
+    if args.command == "record":
+        print(queries.record(args.fighter).to_string(index=False))
+    elif args.command == "history":
+        print(queries.history(args.fighter).to_string(index=False))
+    elif args.command == "h2h":
+        print(queries.head_to_head(args.fighter, args.opponent).to_string(index=False))
+    elif args.command == "events-by-year":
+        print(queries.events_by_year(args.start, args.end, not args.all_promotions).to_string(index=False))
+    elif args.explain:
+        print(queries.explain(args.query))
+    else:
+        print(queries.sql(args.query).to_string(index=False))
@@ -0,0 +1,175 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from fighter_graph import BOUTS_DATASET, build_graph
+
+RANKINGS = "6_fighter_rankings.parquet"
+# Half-life of a win in the time-decayed rankings: a win this old counts half as much as one today
+HALF_LIFE_DAYS = float(os.environ.get("RANKING_HALF_LIFE_DAYS", 730))
+
+
+class Ranking:
+    # One score per fighter id of `graph`, plus how the power iteration went
+    def __init__(self, graph, scores, iterations, converged, seconds):
+        self.graph = graph
+        self.scores = scores
+        self.iterations = iterations
+        self.converged = converged
+        self.seconds = seconds
+
+    def top(self, k=20):
+        order = np.argsort(-self.scores, kind='stable')[:k]
+        return pd.DataFrame({'fighter_url': self.graph.urls[order], 'score': self.scores[order]})
+
+    def report(self, name):
+        state = "converged" if self.converged else "did NOT converge"
+        return f"🏆 {name}: {state} in {self.iterations} iteration(s), {self.seconds * 1000:.0f} ms"
+
+
+# Per-edge weights halving every `half_life_days` before `as_of` (default: the latest bout).
+# Bouts without a date count as much as the oldest dated bout.
+def decay_weights(graph, half_life_days=HALF_LIFE_DAYS, as_of=None):
+    dates = graph.dates
+    known = ~np.isnat(dates)
+    if not known.any():
+        return np.ones(graph.num_edges)
+    as_of = np.datetime64(as_of, 'D') if as_of is not None else dates[known].max()
+    age = (as_of - dates).astype('timedelta64[D]').astype(np.float64)
+    age[~known] = age[known].max()
+    return 0.5 ** (np.maximum(age, 0.0) / half_life_days)
+
+
+# Previous scores re-indexed onto this graph's ids by URL; fighters new to the graph start
+# at the mean, then the vector is normalised like the iteration expects
+def _warm_start(graph, start):
+    if start is None:
+        return np.full(graph.num_fighters, 1.0 / graph.num_fighters)
+    if isinstance(start, Ranking):
+        start = pd.Series(start.scores, index=start.graph.urls)
+    previous = start.reindex(graph.urls).to_numpy(dtype=np.float64, copy=True)
+    missing = np.isnan(previous)
+    previous[missing] = previous[~missing].mean() if (~missing).any() else 1.0
+    return previous / previous.sum()
+
+
+# y = A^T x over the CSR edges: every source pushes x[source] * weight along its edges
+def _spmv(graph, sources, x, weights):
+    return np.bincount(graph.indices, weights=x[sources] * weights, minlength=graph.num_fighters)
+
+
+# PageRank on the loser -> winner graph: a loss hands the loser's rank to whoever beat them.
+# Fighters without losses spread their rank evenly, as do teleports (1 - damping).
+def pagerank(graph, damping=0.85, weights=None, start=None, tol=1e-10, max_iter=200):
+    began = time.perf_counter()
+    n = graph.num_fighters
+    sources = graph.sources()
+    weights = np.ones(graph.num_edges) if weights is None else weights
+    out_weight = np.bincount(sources, weights=weights, minlength=n)
+    dangling = out_weight == 0
+    # Normalise once so every iteration is a single weighted bincount
+    edge_share = weights / np.where(out_weight > 0, out_weight, 1.0)[sources]
+
+    x = _warm_start(graph, start)
+    converged = False
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        y = damping * (_spmv(graph, sources, x, edge_share) + x[dangling].sum() / n) + (1.0 - damping) / n
+        delta = np.abs(y - x).sum()
+        x = y
+        if delta < tol:
+            converged = True
+            break
+    return Ranking(graph, x, iterations, converged, time.perf_counter() - began)
+
+
+# Eigenvector centrality of the win graph in its Katz form: beating well-ranked fighters ranks
+# you highly, and every fighter also starts with a score of one. x = alpha * A^T x + 1 has a
+# unique positive solution while alpha * rho(A) < 1, whereas the plain leading eigenvector is
+# zero off the largest strongly connected component and the power method finds no fixed point on
+# a near-acyclic graph. alpha is `attenuation` over the smaller of the largest weighted out- and
+# in-degree, which bound rho(A), so the iteration contracts by at least `attenuation` a step.
+def eigenvector(graph, weights=None, start=None, attenuation=0.9, tol=1e-10, max_iter=1000):
+    began = time.perf_counter()
+    n = graph.num_fighters
+    sources = graph.sources()
+    weights = np.ones(graph.num_edges) if weights is None else weights
+    out_weight = np.bincount(sources, weights=weights, minlength=n)
+    in_weight = np.bincount(graph.indices, weights=weights, minlength=n)
+    bound = min(out_weight.max(initial=0.0), in_weight.max(initial=0.0))
+    alpha = attenuation / bound if bound > 0 else 0.0
+
+    # Iterated unnormalised, compared and returned normalised like the other rankings. The
+    # normalised start x is scaled to the total a fixed point along x would have,
+    # n / (1 - alpha * sum(A^T x)), so a warm start from converged scores is converged already
+    x = _warm_start(graph, start)
+    gain = alpha * (x @ out_weight)
+    z = x * (n / (1.0 - gain) if gain < 1.0 else n)
+    converged = False
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        z = alpha * _spmv(graph, sources, z, weights) + 1.0
+        y = z / z.sum()
+        delta = np.abs(y - x).sum()
+        x = y
+        if delta < tol:
+            converged = True
+            break
+    return Ranking(graph, x, iterations, converged, time.perf_counter() - began)
+
+
+def pagerank_decayed(graph, half_life_days=HALF_LIFE_DAYS, as_of=None, **kwargs):
+    return pagerank(graph, weights=decay_weights(graph, half_life_days, as_of), **kwargs)
+
+
+def eigenvector_decayed(graph, half_life_days=HALF_LIFE_DAYS, as_of=None, **kwargs):
+    return eigenvector(graph, weights=decay_weights(graph, half_life_days, as_of), **kwargs)
+
+
+RANKERS = {
+    'pagerank': pagerank,
+    'eigenvector': eigenvector,
+    'pagerank_decayed': pagerank_decayed,
+    'eigenvector_decayed': eigenvector_decayed,
+}
+
+
+# Every ranking for `graph`, warm-started from a previous rankings table when given
+def rank_all(graph, previous=None):
+    results = {}
+    for name, ranker in RANKERS.items():
+        start = previous[name] if previous is not None and name in previous else None
+        results[name] = ranker(graph, start=start)
+        print(results[name].report(name))
+    return results
+
+
+def to_frame(results):
+    graph = next(iter(results.values())).graph
+    frame = pd.DataFrame({name: ranking.scores for name, ranking in results.items()})
+    frame.insert(0, 'fighter_url', graph.urls)
+    return frame
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank fighters by who beat whom")
+    parser.add_argument("path", nargs="?", default=BOUTS_DATASET, help="bout dataset, part directory or Parquet file")
+    parser.add_argument("--output", default=RANKINGS)
+    parser.add_argument("--cold", action="store_true", help="ignore the previous rankings instead of warm-starting")
+    args = parser.parse_args()
+
+    graph = build_graph(args.path)
+    print(graph.report())
+
+    previous = None
+    if os.path.exists(args.output) and not args.cold:
+        previous = pd.read_parquet(args.output).set_index('fighter_url')
+        print(f"♨️ Warm-starting from {args.output}")
+
+    results = rank_all(graph, previous)
+    to_frame(results).to_parquet(args.output, index=False)
+    print(results['pagerank'].top(10).to_string(index=False))
+    print(f"✅ Saved rankings to {args.output}")
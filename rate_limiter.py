@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    # Refills `rate` tokens per second up to `burst`; acquire() blocks until a token is free
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+    # Takes a token and returns 0 if one is free, otherwise returns how long until one will be
+    def try_acquire(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    # Returns how long the caller had to wait
+    def acquire(self):
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    # acquire() for coroutines: sleeps on the event loop instead of blocking the thread
+    async def acquire_async(self):
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+
+class HostRateLimiter:
+    # One shared token bucket per host, so every worker respects the same politeness limit
+    def __init__(self, requests_per_second, burst=1):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def bucket(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+            return self._buckets[host]
+
+    # Current rate of every host seen so far
+    def rates(self):
+        with self._lock:
+            return {host: bucket.rate for host, bucket in self._buckets.items()}
+
+    def wait(self, url):
+        waited = self.bucket(url).acquire()
+        with self._lock:
+            self.waited_seconds += waited
+        return waited
+
+    async def wait_async(self, url):
+        waited = await self.bucket(url).acquire_async()
+        with self._lock:
+            self.waited_seconds += waited
+        return waited
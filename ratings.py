@@ -0,0 +1,142 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from fighter_graph import BOUTS_DATASET, build_graph
+
+RATINGS = "8_fighter_ratings.parquet"
+# Every bout already folded into RATINGS, so the next run only applies the ones after it
+RATED_BOUTS = "8_rated_bouts.parquet"
+BOUT_KEY = ['winner_url', 'loser_url', 'date']
+
+INITIAL_RATING = 1500.0
+K_FACTOR = float(os.environ.get("ELO_K", 32))
+# Fighters still on their first few bouts move faster, until the rating has settled
+PROVISIONAL_BOUTS = 5
+PROVISIONAL_K = 1.5
+# A finish says more about the gap between two fighters than a decision does
+METHOD_K = {'KO/TKO': 1.2, 'SUB': 1.2}
+
+
+# One row per bout (the graph already merged both fighters' copies), oldest first.
+# Bouts without a usable date can't be placed in the stream and are left out.
+def bout_stream(graph):
+    wins = graph if not graph.forward else graph.reverse()
+    dated = ~np.isnat(wins.dates)
+    order = np.argsort(wins.dates[dated], kind='stable')
+    sources = wins.sources()[dated][order]
+    methods = wins.methods[dated][order]
+    names = np.array(list(wins.method_names) + [None], dtype=object)
+    return pd.DataFrame({
+        'winner_url': wins.urls[sources],
+        'loser_url': wins.urls[wins.indices[dated][order]],
+        'date': wins.dates[dated][order],
+        'method': names[methods],
+    })
+
+
+class RatingEngine:
+    # Elo over a date-ordered bout stream. State is three dicts keyed by fighter URL plus
+    # the ledger of rated bouts; apply() folds bouts in order, update() applies only the
+    # bouts the ledger hasn't seen and falls back to a full recompute if any of them is
+    # older than the newest rated bout (Elo depends on order).
+    def __init__(self, k=K_FACTOR, initial=INITIAL_RATING):
+        self.k = k
+        self.initial = initial
+        self.ratings = {}
+        self.bouts = {}
+        self.last_date = {}
+        self.rated = pd.DataFrame(columns=BOUT_KEY)
+
+    @property
+    def as_of(self):
+        return self.rated['date'].max() if len(self.rated) else None
+
+    # Fold bouts (oldest first) into the ratings; returns the fighters whose rating moved
+    def apply(self, bouts):
+        ratings, counts, last_date = self.ratings, self.bouts, self.last_date
+        initial, k = self.initial, self.k
+        touched = set()
+        for winner, loser, date, method in zip(bouts['winner_url'], bouts['loser_url'], bouts['date'], bouts['method']):
+            rw = ratings.get(winner, initial)
+            rl = ratings.get(loser, initial)
+            expected = 1.0 / (1.0 + 10.0 ** ((rl - rw) / 400.0))
+            step = k * METHOD_K.get(method, 1.0) * (1.0 - expected)
+            nw, nl = counts.get(winner, 0), counts.get(loser, 0)
+            ratings[winner] = rw + step * (PROVISIONAL_K if nw < PROVISIONAL_BOUTS else 1.0)
+            ratings[loser] = rl - step * (PROVISIONAL_K if nl < PROVISIONAL_BOUTS else 1.0)
+            counts[winner], counts[loser] = nw + 1, nl + 1
+            last_date[winner] = last_date[loser] = date
+            touched.add(winner)
+            touched.add(loser)
+
+        rated = bouts[BOUT_KEY]
+        self.rated = rated if not len(self.rated) else pd.concat([self.rated, rated], ignore_index=True)
+        return touched
+
+    def recompute(self, bouts):
+        self.ratings, self.bouts, self.last_date = {}, {}, {}
+        self.rated = pd.DataFrame(columns=BOUT_KEY)
+        return self.apply(bouts)
+
+    # Apply whatever in `bouts` isn't rated yet; the weekly path touches only those fighters
+    def update(self, bouts):
+        if not len(self.rated):
+            return self.recompute(bouts)
+        merged = bouts.merge(self.rated.drop_duplicates(), on=BOUT_KEY, how='left', indicator=True)
+        new = bouts[(merged['_merge'] == 'left_only').to_numpy()]
+        if len(new) and new['date'].min() < self.as_of:
+            print(f"⚠️ {int((new['date'] < self.as_of).sum())} new bout(s) predate {self.as_of}; recomputing from scratch")
+            return self.recompute(bouts)
+        return self.apply(new)
+
+    def table(self):
+        frame = pd.DataFrame({
+            'fighter_url': list(self.ratings),
+            'rating': list(self.ratings.values()),
+            'bouts': [self.bouts[url] for url in self.ratings],
+            'last_bout': [self.last_date[url] for url in self.ratings],
+        })
+        return frame.sort_values('rating', ascending=False, ignore_index=True)
+
+    def save(self, ratings_path=RATINGS, rated_path=RATED_BOUTS):
+        self.table().to_parquet(ratings_path, index=False)
+        self.rated.to_parquet(rated_path, index=False)
+
+    @classmethod
+    def load(cls, ratings_path=RATINGS, rated_path=RATED_BOUTS, **kwargs):
+        engine = cls(**kwargs)
+        if os.path.exists(ratings_path) and os.path.exists(rated_path):
+            table = pd.read_parquet(ratings_path)
+            engine.ratings = dict(zip(table['fighter_url'], table['rating']))
+            engine.bouts = dict(zip(table['fighter_url'], table['bouts']))
+            engine.last_date = dict(zip(table['fighter_url'], table['last_bout']))
+            engine.rated = pd.read_parquet(rated_path)
+        return engine
+
+    def report(self):
+        return f"📈 Ratings: {len(self.ratings)} fighter(s) over {len(self.rated)} bout(s), as of {self.as_of}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Elo ratings from the scraped bouts, updated incrementally")
+    parser.add_argument("path", nargs="?", default=BOUTS_DATASET, help="bout dataset, part directory or Parquet file")
+    parser.add_argument("--full", action="store_true", help="recompute from the first bout instead of the snapshot")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    bouts = bout_stream(build_graph(args.path))
+    loaded = time.perf_counter()
+    engine = RatingEngine() if args.full else RatingEngine.load()
+    touched = engine.update(bouts)
+    rated = time.perf_counter()
+    engine.save()
+
+    print(f"📥 {len(bouts)} dated bout(s) loaded in {loaded - start:.2f}s")
+    print(f"🔁 {len(touched)} fighter(s) re-rated in {rated - loaded:.2f}s")
+    print(engine.report())
+    print(engine.table().head(15).to_string(index=False))
+    print(f"✅ Saved {RATINGS} and {RATED_BOUTS}")
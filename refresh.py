@@ -0,0 +1,157 @@
+import argparse
+import os
+from urllib.parse import urljoin
+
+import lxml.html
+import pandas as pd
+from lxml import etree
+
+from backoff import AdaptivePacer, CircuitBreaker, default_rotator
+from crawl_pool import CrawlStats, run_pool
+from driver_pool import DriverPool
+from fetch import Fetcher
+from fighter_parser import BASE_URL, MissingResults, clean_text, parse_fighter_page, results_digest
+from frontier import Frontier
+from normalize import TYPED_DATASET, normalize_dataset
+from page_cache import PageCache
+from parquet_sink import upsert
+from rate_limiter import HostRateLimiter
+
+NEW_EVENTS = "2b_new_events.parquet"
+ROSTER = "4c_unique_fighter_urls.parquet"
+BOUTS_DATASET = "5a_fighter_bouts_dataset"
+FIGHTER_FRONTIER = "4a_fighter_frontier.sqlite"
+# A bout is the same bout whenever these match, whatever else was re-scraped
+BOUT_KEY = ['original_fighter_url', 'opponent_url', 'event_url']
+CARD_SELECTOR = "a[href*='/fightcenter/fighters/']"
+FIGHTER_RESULTS_SELECTOR = "section.fighterFightResults"
+# VPN city pool the circuit breaker rotates through
+VPN_CITIES = [
+    "Atlanta", "Boston", "Buffalo", "Charlotte", "Chicago", "Dallas", "Denver",
+    "Houston", "Kansas_City", "Los_Angeles", "Manassas", "McAllen", "Miami",
+    "New_York", "Omaha", "Phoenix", "Saint_Louis", "Salt_Lake_City",
+    "San_Francisco", "Seattle"
+]
+
+_FIGHTER_LINKS = etree.XPath("//a[contains(@href, '/fightcenter/fighters/')]")
+
+
+# Every fighter linked from an event page, as {fighter_url: name}
+def card_fighters(html):
+    fighters = {}
+    for link in _FIGHTER_LINKS(lxml.html.fromstring(html)):
+        url = urljoin(BASE_URL, link.get('href')).split('?')[0].split('#')[0]
+        name = clean_text(" ".join(link.text_content().split()))
+        # Photo links have no text; keep the first real name seen for each fighter
+        if not fighters.get(url):
+            fighters[url] = name
+    return fighters
+
+
+# The fighters whose pages can have changed: everyone on the new events' cards
+def plan_refresh(event_urls, fetcher):
+    fighters = {}
+    for event_url in event_urls:
+        try:
+            page = fetcher.fetch(event_url, CARD_SELECTOR)
+        except Exception as e:
+            print(f"❌ Could not load card {event_url}: {e}")
+            continue
+        card = card_fighters(page.html)
+        print(f"🗓️ {event_url}: {len(card)} fighter(s)")
+        for url, name in card.items():
+            if not fighters.get(url):
+                fighters[url] = name or "Unknown"
+    return fighters
+
+
+# Re-fetch each planned fighter past the page cache and upsert their bouts into the dataset.
+# Re-fetches are conditional: a fighter whose page hasn't changed since it was last scraped
+# keeps the rows it has and is neither parsed nor upserted. Fetches go through `pacer`
+# (AIMD pacing and the circuit breaker) like the full crawl's; a fighter whose refresh fails
+# keeps the rows it had, with the error noted, and is only failed if it had none.
+def refresh(fighters, fetcher, frontier, dataset=BOUTS_DATASET, workers=4, pacer=None):
+    pacer = pacer if pacer is not None else AdaptivePacer(fetcher.rate_limiter)
+    stats = CrawlStats()
+    rows = []
+    unchanged = set()
+    errors = {}
+
+    def scrape(item):
+        url, name = item
+        try:
+            page = pacer.call(url, lambda: fetcher.fetch(url, FIGHTER_RESULTS_SELECTOR, max_age=0))
+            if page.unchanged and frontier.keep(url):
+                unchanged.add(url)
+                return []
+            try:
+                return parse_fighter_page(page.html, name, url)
+            except MissingResults as e:
+                pacer.failure(url, e)
+                raise
+        except Exception as e:
+            errors[url] = e
+            raise
+
+    # The full crawl's frontier keeps the fresh rows, so its next rebuild doesn't bring back stale ones
+    frontier.add(list(fighters), [{'fighter_name': name} for name in fighters.values()])
+    for (url, name), result in run_pool(list(fighters.items()), scrape, workers=workers, stats=stats):
+        if result is None:
+            error = errors.get(url, "refresh failed")
+            print(f"❌ Refresh failed for {name}: {url}")
+            if not frontier.keep(url, error=error):
+                frontier.fail(url, error)
+            continue
+        if url in unchanged:
+            continue
+        frontier.complete(url, result)
+        rows.extend(result)
+
+    changed = upsert(dataset, rows, BOUT_KEY)
+    print(stats.report())
+    print(pacer.report())
+    print(f"🔁 Refreshed {len(fighters)} fighter(s): {len(unchanged)} unchanged and skipped, "
+          f"{len(rows)} bout row(s) scraped, {changed} new or changed")
+    print(fetcher.report())
+    return changed
+
+
+# Fighters who debuted on a new card join the roster the full crawl works from
+def extend_roster(fighters, path=ROSTER):
+    roster = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame(columns=['fighter_url', 'fighter_name'])
+    known = set(roster['fighter_url'])
+    debuts = [(url, name) for url, name in fighters.items() if url not in known]
+    if debuts:
+        roster = pd.concat([roster, pd.DataFrame(debuts, columns=['fighter_url', 'fighter_name'])], ignore_index=True)
+        roster.to_parquet(path, index=False)
+        print(f"🆕 Added {len(debuts)} fighter(s) to {path}")
+    return len(debuts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-scrape only the fighters on newly scraped event cards")
+    parser.add_argument("--events", default=NEW_EVENTS, help="parquet of new event URLs (column URL)")
+    parser.add_argument("--dataset", default=BOUTS_DATASET, help="bout dataset to upsert into")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("SCRAPE_WORKERS", 4)))
+    parser.add_argument("--rate", type=float, default=float(os.environ.get("SCRAPE_RATE", 0.5)),
+                        help="page loads per second per host")
+    args = parser.parse_args()
+
+    driver_pool = DriverPool(size=args.workers, max_pages=50)
+    rate_limiter = HostRateLimiter(args.rate)
+    fetcher = Fetcher(driver_pool=driver_pool, rate_limiter=rate_limiter,
+                      pool_size=args.workers, cache=PageCache(), digest=results_digest)
+    # AIMD on the rate limiter; only repeated blocks trip the breaker, which rotates the VPN city
+    pacer = AdaptivePacer(rate_limiter, CircuitBreaker(rotate=default_rotator(VPN_CITIES)))
+
+    event_urls = pd.read_parquet(args.events)["URL"].tolist()
+    fighters = plan_refresh(event_urls, fetcher)
+    print(f"🧮 {len(event_urls)} new event(s) → {len(fighters)} fighter(s) to refresh")
+
+    extend_roster(fighters)
+    if refresh(fighters, fetcher, Frontier(FIGHTER_FRONTIER), args.dataset, args.workers, pacer):
+        normalize_dataset(args.dataset, TYPED_DATASET)
+
+    driver_pool.close()
+    print(driver_pool.report())
+    print(fetcher.report())
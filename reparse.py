@@ -0,0 +1,90 @@
+import argparse
+import gzip
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from fighter_parser import BASE_URL, MissingResults, parse_fighter_page
+from page_cache import PageCache
+from parquet_sink import BOUT_SCHEMA
+
+FIGHTER_URL_PREFIX = BASE_URL + "/fightcenter/fighters/"
+
+
+def read_page(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+# Saved pages: every page cached for a fighter URL, or a directory of <slug>.html[.gz] files
+def find_pages(cache_dir=None, pages_dir=None):
+    if pages_dir:
+        pages = []
+        for name in sorted(os.listdir(pages_dir)):
+            if name.endswith('.html') or name.endswith('.html.gz'):
+                slug = name.split('.html')[0]
+                pages.append((FIGHTER_URL_PREFIX + slug, os.path.join(pages_dir, name)))
+        return pages
+
+    cache = PageCache(cache_dir) if cache_dir else PageCache()
+    return [(url, path) for url, _, path in cache.entries(FIGHTER_URL_PREFIX)]
+
+
+def load_fighter_names(path="4c_unique_fighter_urls.parquet"):
+    if not os.path.exists(path):
+        return {}
+    df = pd.read_parquet(path, columns=['fighter_name', 'fighter_url'])
+    return {urljoin(BASE_URL, url): name for url, name in zip(df['fighter_url'], df['fighter_name'])}
+
+
+# Runs in a worker process: read one saved page and parse it to rows
+def parse_saved_page(job):
+    url, path, name = job
+    try:
+        return url, parse_fighter_page(read_page(path), name, url), None
+    except MissingResults as e:
+        return url, [], str(e)
+    except Exception as e:
+        return url, [], f"{type(e).__name__}: {e}"
+
+
+def reparse(pages, output_path, names=None, workers=None):
+    names = names or {}
+    jobs = [(url, path, names.get(url, "Unknown")) for url, path in pages]
+    start = time.perf_counter()
+    rows = []
+    failures = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for url, page_rows, error in executor.map(parse_saved_page, jobs, chunksize=16):
+            if error:
+                failures += 1
+                print(f"⚠️ {url}: {error}")
+            rows.extend(page_rows)
+
+    table = pa.Table.from_pylist(rows, schema=BOUT_SCHEMA)
+    pq.write_table(table, output_path)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"✅ Re-parsed {len(jobs)} page(s) into {len(rows)} row(s) in {elapsed:.1f}s "
+        f"({len(jobs) / elapsed if elapsed else 0:.0f} pages/s, {failures} failed) → {output_path}"
+    )
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-extract fighter bouts from saved pages without the network")
+    parser.add_argument("--cache-dir", help="page cache to read (default: PAGE_CACHE_DIR)")
+    parser.add_argument("--pages-dir", help="directory of saved <fighter-slug>.html[.gz] pages instead of the cache")
+    parser.add_argument("--output", default="5b_reparsed_fighter_bouts.parquet")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all CPU cores)")
+    args = parser.parse_args()
+
+    reparse(find_pages(args.cache_dir, args.pages_dir), args.output, load_fighter_names(), args.workers)
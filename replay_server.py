@@ -0,0 +1,234 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fighter_parser import BASE_URL
+from page_cache import CACHE_DIR, PageCache
+
+PROMOTION_PATH = "/fightcenter/promotions/1-ultimate-fighting-championship-ufc"
+
+
+class ReplayServer(ThreadingHTTPServer):
+    # Serves a page cache as if it were the site: GET <path> answers with the newest cached
+    # copy of BASE_URL + <path>, gzip bytes straight from disk when the client accepts gzip.
+    # Every response can be delayed (latency + uniform jitter) and a share of them replaced by
+    # a 503, a 429 with Retry-After, or a hang long enough to trip client timeouts.
+    # Pages carry an ETag and Last-Modified, and a matching If-None-Match gets a 304.
+    # GET /__stats returns the counters as JSON.
+    daemon_threads = True
+
+    def __init__(self, address, cache_dir=CACHE_DIR, latency=0.0, jitter=0.0, error_rate=0.0,
+                 throttle_rate=0.0, hang_rate=0.0, hang_seconds=30.0, seed=None):
+        super().__init__(address, ReplayHandler)
+        self.pages = {url: path for url, _, path in PageCache(cache_dir).entries()}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'served': 0, 'bytes': 0, 'not_modified': 0, 'missing': 0, 'errors': 0, 'throttled': 0,
+                      'hung': 0}
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    # What this request gets: 'error', 'throttle', 'hang' or 'ok'
+    def fault(self):
+        with self._lock:
+            roll = self.random.random()
+            delay = self.latency + self.random.uniform(0, self.jitter)
+        for fault, rate in (('error', self.error_rate), ('throttle', self.throttle_rate), ('hang', self.hang_rate)):
+            if roll < rate:
+                return fault, delay
+            roll -= rate
+        return 'ok', delay
+
+    def lookup(self, path):
+        url = BASE_URL + path
+        # The bare listing URL is fetched without the cache, so fall back to its first page
+        return self.pages.get(url) or (self.pages.get(url + "?page=1") if '?' not in path else None)
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        if self.path == "/__stats":
+            with server._lock:
+                self._send(200, json.dumps(server.stats).encode())
+            return
+
+        fault, delay = server.fault()
+        time.sleep(delay)
+        if fault == 'error':
+            server.count('errors')
+            self._send(503, b"Service Unavailable")
+            return
+        if fault == 'throttle':
+            server.count('throttled')
+            self._send(429, b"Too Many Requests", {'Retry-After': '1'})
+            return
+        if fault == 'hang':
+            server.count('hung')
+            time.sleep(server.hang_seconds)
+
+        path = server.lookup(self.path)
+        if path is None:
+            server.count('missing')
+            self._send(404, b"Not Found")
+            return
+
+        with open(path, 'rb') as f:
+            body = f.read()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            server.count('not_modified')
+            self._send(304, b"", {'ETag': etag})
+            return
+        headers = {
+            'Content-Type': 'text/html; charset=utf-8',
+            'ETag': etag,
+            'Last-Modified': formatdate(os.path.getmtime(path), usegmt=True),
+        }
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            headers['Content-Encoding'] = 'gzip'
+        else:
+            body = gzip.decompress(body)
+        server.count('served')
+        server.count('bytes', len(body))
+        self._send(200, body, headers)
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start(port=0, **kwargs):
+    server = ReplayServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --- synthetic corpus -------------------------------------------------------------------
+# Pages shaped like the live site's (same selectors the scrapers and both parser backends
+# look for), for benchmarking when no recorded crawl is at hand.
+
+def _listing_page(pages, events):
+    links = "".join(
+        f'<span class="hidden md:inline text-tap_3"><a href="/fightcenter/events/{event}">{event}</a></span>'
+        for event in events
+    )
+    return (f'<html><body>{links}<span class="last"><a href="{PROMOTION_PATH}?page={pages}">Last</a></span>'
+            f'</body></html>')
+
+
+def _event_page(winners):
+    divs = "".join(
+        f'<div class="div hidden md:flex order-1 text-sm text-tap_3">'
+        f'<a class="link-primary-red" href="/fightcenter/fighters/{slug}">{name}</a></div>'
+        for slug, name in winners
+    )
+    return f'<html><body>{divs}</body></html>'
+
+
+def _bout(n, result, opponent, event, year, month_day):
+    return f'''
+<div data-fighter-bout-target="bout" data-bout-id="{n}">
+  <div class="result"><div>{result}</div></div>
+  <span title="Fighter Record Before Fight">{n}-{n // 3}</span>
+  <a href="/fightcenter/fighters/{opponent[0]}">{opponent[1]}</a>
+  <div class="flex flex-col justify-around items-center"><span>{year}</span><span>{month_day}</span></div>
+  <div class="md:flex flex-col justify-center gap-1.5">
+    <a href="/fightcenter/bouts/{n}">Decision (Unanimous)</a>
+    <div class="text-xs11 text-neutral-600">5:00 Round 3 of 3</div>
+  </div>
+  <a href="/fightcenter/events/{event}">Event</a>
+  <div class="-rotate-90">DEC</div>
+</div>
+<div id="boutDetails{n}">
+  <div class="h-[34px]"><span class="font-bold">Duration:</span><span>3 x 5 Minute Rounds</span></div>
+  <div class="h-[34px]"><span class="font-bold">Weight:</span><span>155 lbs (70.3 kgs)</span></div>
+  <div class="h-[34px]"><span class="font-bold">Odds:</span><span>+150 (Moderate Underdog)</span></div>
+</div>'''
+
+
+def _fighter_page(bouts):
+    return f'''<html><body>
+<div id="standardDetails">
+  <div>Date of Birth: 1990 Jan 15</div>
+  <div>Height: 5'11" (180cm) | Reach: 74.0"</div>
+  <div>Foundation Style: Wrestling</div>
+</div>
+<section class="fighterFightResults"><div id="proResults">{"".join(bouts)}</div></section>
+</body></html>'''
+
+
+# A promotion listing of `pages` pages, `events_per_page` events per page, `winners` winners
+# per event and a fighter page for each winner with `bouts` bouts; returns the page count
+def synthesize_corpus(cache_dir, pages=5, events_per_page=20, winners=6, bouts=12, seed=0):
+    rng = random.Random(seed)
+    cache = PageCache(cache_dir)
+    events = [f"{n}-synthetic-event-{n}" for n in range(1, pages * events_per_page + 1)]
+    fighters = [(f"{n}-synthetic-fighter-{n}", f"Fighter {n}") for n in range(1, len(events) * winners + 1)]
+
+    for page in range(1, pages + 1):
+        chunk = events[(page - 1) * events_per_page:page * events_per_page]
+        cache.put(f"{BASE_URL}{PROMOTION_PATH}?page={page}", _listing_page(pages, chunk))
+    for i, event in enumerate(events):
+        cache.put(f"{BASE_URL}/fightcenter/events/{event}", _event_page(fighters[i * winners:(i + 1) * winners]))
+    for slug, _ in fighters:
+        rows = [
+            _bout(n, rng.choice("WL"), rng.choice(fighters), rng.choice(events),
+                  rng.randint(2000, 2025), f"{rng.choice(['Jan', 'Mar', 'Jun', 'Sep', 'Dec'])} {rng.randint(1, 28):02d}")
+            for n in range(bouts)
+        ]
+        cache.put(f"{BASE_URL}/fightcenter/fighters/{slug}", _fighter_page(rows))
+    return pages + len(events) + len(fighters)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded pages as a local stand-in for the site")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="page cache holding the corpus")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform random delay, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered 429")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="share of requests held for --hang-seconds")
+    parser.add_argument("--hang-seconds", type=float, default=30.0)
+    parser.add_argument("--synthesize", action="store_true", help="write a synthetic corpus into --cache-dir first")
+    args = parser.parse_args()
+
+    if args.synthesize:
+        print(f"🧪 Wrote {synthesize_corpus(args.cache_dir)} synthetic page(s) to {args.cache_dir}")
+    server = ReplayServer(
+        ("127.0.0.1", args.port), args.cache_dir, args.latency, args.jitter,
+        args.error_rate, args.throttle_rate, args.hang_rate, args.hang_seconds,
+    )
+    print(f"📼 Replaying {len(server.pages)} page(s) from {args.cache_dir} at {server.base_url}")
+    print(f"   run a scraper with TAPOLOGY_BASE_URL={server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,22 @@
+import backoff
+import fetch
+from backoff import AdaptivePacer
+from fighter_parser import BASE_URL
+from rate_limiter import HostRateLimiter
+
+REPLAY = "http://127.0.0.1:8765"
+FIGHTER = BASE_URL + "/fightcenter/fighters/1-someone"
+
+
+def test_pacer_adjusts_the_bucket_fetches_wait_on(monkeypatch):
+    # As with TAPOLOGY_BASE_URL set: fetches wait on the replay host's bucket
+    monkeypatch.setattr(backoff, "site_url", lambda url: fetch.site_url(url, REPLAY))
+    limiter = HostRateLimiter(1.0)
+    pacer = AdaptivePacer(limiter, increase=0.5)
+
+    limiter.wait(fetch.site_url(FIGHTER, REPLAY))
+    pacer.success(FIGHTER)
+    pacer.failure(FIGHTER, TimeoutError("slow"))
+
+    assert list(limiter.rates()) == ["127.0.0.1:8765"]
+    assert pacer.rate(FIGHTER) == limiter.bucket(REPLAY).rate == 0.75
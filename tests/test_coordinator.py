@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from coordinator import FrontierServer, RemoteFrontier, peers_busy
+from frontier import DONE, FAILED, PENDING, Frontier
+
+URLS = ["https://example.com/a", "https://example.com/b", "https://example.com/c"]
+
+
+@pytest.fixture
+def remote(tmp_path):
+    frontier = Frontier(str(tmp_path / "frontier.sqlite"), max_attempts=1)
+    server = FrontierServer(("127.0.0.1", 0), frontier)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = RemoteFrontier(*server.server_address)
+    yield frontier, client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def states(frontier):
+    return dict(frontier._db.execute("SELECT url, state FROM urls").fetchall())
+
+
+def test_complete_keep_and_fail_round_trip(remote):
+    frontier, client = remote
+    client.add(URLS, [{'fighter_name': name} for name in "abc"])
+    claimed = client.claim(3, owner="node-1", lease_seconds=60)
+    assert [item['url'] for item in claimed] == URLS
+
+    assert client.complete(URLS[0], [{'result': 'W'}], owner="node-1") is True
+    # The exception itself, as the crawlers hand it over, arrives as its text
+    assert client.fail(URLS[1], TimeoutError("page load timed out"), owner="node-1") is True
+    assert client.fail(URLS[2], ValueError("bad page"), owner="node-2") is False
+
+    assert states(frontier) == {URLS[0]: DONE, URLS[1]: FAILED, URLS[2]: 'in_flight'}
+    last_error = frontier._db.execute("SELECT last_error FROM urls WHERE url = ?", (URLS[1],)).fetchone()[0]
+    assert last_error == "page load timed out"
+    assert list(client.iter_rows()) == [{'result': 'W'}]
+
+    # A finished URL queued again for a refresh can be kept with the rows it has
+    assert client.requeue_done() == 1
+    client.claim(1, owner="node-1", lease_seconds=60)
+    assert client.keep(URLS[0], owner="node-1") is True
+    assert client.keep(URLS[2], owner="node-1") is False
+    assert states(frontier)[URLS[0]] == DONE
+    assert client.counts() == {PENDING: 0, 'in_flight': 1, DONE: 1, FAILED: 1}
+
+
+def test_peers_busy_until_every_lease_is_settled(remote):
+    frontier, client = remote
+    client.add(URLS[:2])
+    assert not peers_busy(client)
+    client.claim(1, owner="node-1", lease_seconds=60)
+    client.claim(1, owner="node-2", lease_seconds=60)
+    client.complete(URLS[0], [], owner="node-1")
+    assert peers_busy(client)
+    client.fail(URLS[1], "blocked", owner="node-2")
+    assert not peers_busy(client)
@@ -0,0 +1,69 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backoff import AdaptivePacer
+from fetch import Blocked, Fetcher, ServerError
+from rate_limiter import HostRateLimiter
+
+RESULTS = '<html><body><section class="fighterFightResults">bouts</section></body></html>'
+CHALLENGE = '<html><head><title>Just a moment...</title></head><body>cf-challenge</body></html>'
+
+
+class Handler(BaseHTTPRequestHandler):
+    # /403, /503 and /challenge always answer that way; /flaky fails with a 503 once, then works
+    flaky = {'count': 0}
+
+    def do_GET(self):
+        status, body = 200, RESULTS
+        if self.path == '/403':
+            status = 403
+        elif self.path == '/503':
+            status = 503
+        elif self.path == '/challenge':
+            body = CHALLENGE
+        elif self.path == '/flaky':
+            self.flaky['count'] += 1
+            status = 503 if self.flaky['count'] == 1 else 200
+        self.send_response(status)
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetcher():
+    # No driver pool: any browser fallback would raise RuntimeError instead
+    return Fetcher(rate_limiter=HostRateLimiter(1000))
+
+
+def test_refusals_raise_blocked_without_a_browser_load(site, fetcher):
+    with pytest.raises(Blocked) as forbidden:
+        fetcher.fetch(site + '/403', 'section.fighterFightResults')
+    assert forbidden.value.status == 403
+    with pytest.raises(Blocked):
+        fetcher.fetch(site + '/challenge', 'section.fighterFightResults')
+    assert fetcher.fallbacks == {'status': 0, 'selector': 0, 'error': 0}
+
+
+def test_server_errors_are_retried_by_the_pacer(site, fetcher):
+    with pytest.raises(ServerError):
+        fetcher.fetch(site + '/503', 'section.fighterFightResults')
+
+    pacer = AdaptivePacer(fetcher.rate_limiter)
+    page = pacer.call(site + '/flaky', lambda: fetcher.fetch(site + '/flaky', 'section.fighterFightResults'))
+    assert page.source == 'http'
+    assert pacer.outcomes['server_error'] == 1
+    assert pacer.outcomes['ok'] == 1
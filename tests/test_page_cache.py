@@ -0,0 +1,47 @@
+import os
+import time
+
+import page_cache
+from page_cache import PageCache
+
+DAY = 86400
+
+
+def put_at(monkeypatch, cache, url, html, when):
+    monkeypatch.setattr(page_cache.time, "time", lambda: when)
+    cache.put(url, html)
+    monkeypatch.undo()
+
+
+def files(root):
+    return sorted(name for _, _, names in os.walk(root) for name in names if name.endswith(".html.gz"))
+
+
+def test_new_copy_replaces_earlier_days(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path), ttl_days=30)
+    put_at(monkeypatch, cache, "https://example.com/a", "<p>old</p>", time.time() - 3 * DAY)
+    cache.put("https://example.com/a", "<p>new</p>")
+
+    assert len(files(tmp_path)) == 1
+    assert cache.get("https://example.com/a") == "<p>new</p>"
+    assert cache.total_bytes == os.path.getsize(cache.entries()[0][2])
+
+
+def test_expired_pages_are_swept_below_the_size_cap(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path), ttl_days=1)
+    put_at(monkeypatch, cache, "https://example.com/stale", "<p>stale</p>", time.time() - 2 * DAY)
+    # A later process: its first write sweeps, though the cache is far from full
+    cache = PageCache(str(tmp_path), ttl_days=1)
+    cache.put("https://example.com/fresh", "<p>fresh</p>")
+
+    assert [url for url, _, _ in cache.entries()] == ["https://example.com/fresh"]
+    assert len(files(tmp_path)) == 1
+
+
+def test_read_only_cache_keeps_expired_pages(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path), ttl_days=1)
+    put_at(monkeypatch, cache, "https://example.com/stale", "<p>stale</p>", time.time() - 2 * DAY)
+
+    reader = PageCache(str(tmp_path), ttl_days=1)
+    assert reader.get("https://example.com/stale") is None
+    assert reader.get("https://example.com/stale", max_age=float('inf')) == "<p>stale</p>"
@@ -0,0 +1,41 @@
+import pyarrow.dataset as ds
+
+from fighter_parser import BOUT_COLUMNS
+from parquet_sink import upsert
+from refresh import BOUT_KEY
+
+
+def bout(opponent, year, result='W'):
+    row = dict.fromkeys(BOUT_COLUMNS, 'null')
+    row.update(original_fighter_url='https://example.com/f/1', opponent_url=f'https://example.com/f/{opponent}',
+               event_url=f'https://example.com/e/{opponent}', event_year=year, result=result)
+    return row
+
+
+def stored(path):
+    table = ds.dataset(path, format='parquet', partitioning='hive').to_table()
+    return sorted(zip(table['opponent_url'].to_pylist(), table['event_year'].cast('string').to_pylist()))
+
+
+def test_upsert_moves_a_bout_whose_year_changed(tmp_path):
+    path = str(tmp_path / "bouts")
+    upsert(path, [bout(2, '2019'), bout(3, '2019'), bout(4, 'null')], BOUT_KEY)
+
+    # Re-scraped: bout 2's date was corrected, bout 4's was missing before
+    assert upsert(path, [bout(2, '2020'), bout(3, '2019'), bout(4, '2021')], BOUT_KEY) == 2
+
+    assert stored(path) == [
+        ('https://example.com/f/2', '2020'),
+        ('https://example.com/f/3', '2019'),
+        ('https://example.com/f/4', '2021'),
+    ]
+
+
+def test_upsert_replaces_a_changed_bout_in_place(tmp_path):
+    path = str(tmp_path / "bouts")
+    upsert(path, [bout(2, '2019', 'L')], BOUT_KEY)
+    assert upsert(path, [bout(2, '2019', 'W')], BOUT_KEY) == 1
+    assert upsert(path, [bout(2, '2019', 'W')], BOUT_KEY) == 0
+
+    table = ds.dataset(path, format='parquet', partitioning='hive').to_table()
+    assert table['result'].to_pylist() == ['W']
@@ -0,0 +1,56 @@
+import numpy as np
+
+from fighter_graph import FighterGraph
+from rankings import eigenvector, pagerank
+
+
+# Forward (loser -> winner) graph over fighters 0..n-1 from (loser, winner) pairs
+def win_graph(n, wins):
+    wins = sorted(wins)
+    sources = np.array([loser for loser, _ in wins], dtype=np.int32)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=n))]).astype(np.int64)
+    return FighterGraph(
+        urls=np.array([f"https://example.com/fighter/{i}" for i in range(n)], dtype=object),
+        indptr=indptr,
+        indices=np.array([winner for _, winner in wins], dtype=np.int32),
+        dates=np.full(len(wins), np.datetime64('NaT'), dtype='datetime64[D]'),
+        methods=np.zeros(len(wins), dtype=np.int32),
+        method_names=np.array(['Decision'], dtype=object),
+    )
+
+
+def test_eigenvector_converges_on_an_acyclic_chain():
+    # Fighter i + 1 beat fighter i, all the way up a 50-fighter chain
+    graph = win_graph(50, [(i, i + 1) for i in range(49)])
+    ranking = eigenvector(graph)
+
+    assert ranking.converged
+    assert np.isclose(ranking.scores.sum(), 1.0)
+    assert (ranking.scores > 0).all()
+    assert (np.diff(ranking.scores) > 0).all()
+
+
+def test_eigenvector_on_a_cycle_with_a_tail():
+    # 0 -> 1 -> 2 -> 0 beat each other in turn; 3 beat 2, 4 lost to 3
+    graph = win_graph(5, [(0, 1), (1, 2), (2, 0), (2, 3), (4, 3)])
+    ranking = eigenvector(graph)
+
+    assert ranking.converged
+    scores = ranking.scores
+    assert scores[3] == scores.max()
+    assert scores[4] == scores.min()
+    assert (scores > 0).all()
+
+
+def test_eigenvector_warm_start_reaches_the_cold_result():
+    graph = win_graph(6, [(0, 1), (1, 2), (2, 0), (3, 2), (4, 3), (5, 3), (5, 4)])
+    cold = eigenvector(graph)
+    warm = eigenvector(graph, start=pagerank(graph))
+    again = eigenvector(graph, start=cold)
+
+    assert warm.converged and again.converged
+    assert np.abs(cold.scores - warm.scores).sum() < 1e-8
+    assert np.abs(cold.scores - again.scores).sum() < 1e-8
+    # Restarting from its own result picks up where it stopped
+    assert again.iterations < cold.iterations
+    assert again.iterations <= 2
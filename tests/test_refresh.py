@@ -0,0 +1,41 @@
+from backoff import AdaptivePacer
+from frontier import DONE, PENDING, Frontier
+from rate_limiter import HostRateLimiter
+from refresh import refresh
+
+KNOWN = "https://www.tapology.com/fightcenter/fighters/1-known"
+NEW = "https://www.tapology.com/fightcenter/fighters/2-new"
+
+
+class BrokenFetcher:
+    # Every page load fails the way a dead page does
+    def __init__(self):
+        self.rate_limiter = HostRateLimiter(1000)
+
+    def fetch(self, url, selector, max_age=None):
+        raise ValueError(f"no results section on {url}")
+
+    def report(self):
+        return ""
+
+
+def state(frontier, url):
+    return frontier._db.execute("SELECT state, last_error FROM urls WHERE url = ?", (url,)).fetchone()
+
+
+def test_failed_refresh_keeps_a_scraped_fighter_done(tmp_path):
+    frontier = Frontier(str(tmp_path / "frontier.sqlite"), max_attempts=1)
+    frontier.add([KNOWN])
+    frontier.claim(1)
+    frontier.complete(KNOWN, [{'result': 'W'}])
+    fetcher = BrokenFetcher()
+    pacer = AdaptivePacer(fetcher.rate_limiter)
+
+    changed = refresh({KNOWN: "Known", NEW: "New"}, fetcher, frontier, str(tmp_path / "bouts"), workers=2, pacer=pacer)
+
+    assert changed == 0
+    assert state(frontier, KNOWN) == (DONE, f"no results section on {KNOWN}")
+    assert list(frontier.iter_rows()) == [{'result': 'W'}]
+    # Never scraped: left for the full crawl to pick up, with the reason noted
+    assert state(frontier, NEW) == (PENDING, f"no results section on {NEW}")
+    assert pacer.outcomes['error'] == 2
@@ -0,0 +1,359 @@
+import argparse
+import heapq
+import time
+
+import numpy as np
+import pandas as pd
+
+from fighter_graph import BOUTS_DATASET, build_graph
+
+UNREACHED = np.inf
+
+
+# Strongly connected components of a CSR graph (iterative Tarjan), numbered so that every
+# edge between two components goes from a lower to a higher number (a topological order)
+def topological_components(indptr, indices):
+    n = len(indptr) - 1
+    index, low, on_stack, comp = [-1] * n, [0] * n, [False] * n, [-1] * n
+    indptr, indices = indptr.tolist(), indices.tolist()
+    stack, counter, found = [], 0, 0
+
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        work = [(root, indptr[root])]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            node, edge = work[-1]
+            if edge < indptr[node + 1]:
+                work[-1] = (node, edge + 1)
+                nxt = indices[edge]
+                if index[nxt] < 0:
+                    index[nxt] = low[nxt] = counter
+                    counter += 1
+                    stack.append(nxt)
+                    on_stack[nxt] = True
+                    work.append((nxt, indptr[nxt]))
+                elif on_stack[nxt]:
+                    low[node] = min(low[node], index[nxt])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    comp[member] = found
+                    if member == node:
+                        break
+                found += 1
+
+    # Tarjan finishes sinks first; flip so edges point to higher numbers
+    return found - 1 - np.array(comp, dtype=np.int64)
+
+
+class Chain:
+    # A win chain: fighters[0] beat fighters[1], who beat fighters[2], ...; `edges` are the
+    # winner -> loser edge ids of those bouts
+    def __init__(self, index, fighters, edges):
+        self.index = index
+        self.fighters = list(fighters)
+        self.edges = list(edges)
+
+    def __len__(self):
+        return len(self.edges)
+
+    @property
+    def urls(self):
+        return [self.index.wins.urls[i] for i in self.fighters]
+
+    def to_frame(self):
+        wins = self.index.wins
+        return pd.DataFrame({
+            'winner_url': [wins.urls[i] for i in self.fighters[:-1]],
+            'loser_url': [wins.urls[i] for i in self.fighters[1:]],
+            'date': [wins.dates[e] for e in self.edges],
+            'method': [wins.method_of(e) for e in self.edges],
+        })
+
+
+class _Search:
+    # Level-by-level label search over one CSR direction. A label is the earliest "time" a
+    # fighter can be reached with at most `level` wins; only fighters whose label improved
+    # are expanded next. With every edge key 0 this is plain BFS; with dates as keys it only
+    # follows fights in chronological order.
+    def __init__(self, graph, keys, edge_ok, allowed, root, start_key):
+        self.graph = graph
+        self.keys = keys
+        self.edge_ok = edge_ok
+        self.allowed = allowed
+        n = graph.num_fighters
+        self.labels = np.full(n, UNREACHED)
+        self.labels[root] = start_key
+        self.last_level = np.full(n, -1, dtype=np.int64)
+        self.last_level[root] = 0
+        self.first_level = self.last_level.copy()
+        self.frontier = np.array([root], dtype=np.int64)
+        self.records = [(self.frontier, np.array([-1], dtype=np.int64))]
+
+    @property
+    def level(self):
+        return len(self.records) - 1
+
+    def expand(self):
+        graph, frontier = self.graph, self.frontier
+        starts, ends = graph.indptr[frontier], graph.indptr[frontier + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0:
+            self.frontier = frontier[:0]
+            self.records.append((frontier[:0], frontier[:0]))
+            return self.frontier
+
+        # Every outgoing edge of the frontier in one flat array
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        edges = offsets + np.arange(total)
+        arrival = self.keys[edges]
+        targets = graph.indices[edges]
+        keep = self.edge_ok[edges] & self.allowed[targets] & (arrival >= np.repeat(self.labels[frontier], lengths))
+        edges, arrival, targets = edges[keep], arrival[keep], targets[keep]
+
+        # Best (earliest) arrival per target, then only the ones that beat the current label
+        order = np.lexsort((arrival, targets))
+        edges, arrival, targets = edges[order], arrival[order], targets[order]
+        first = np.ones(len(targets), dtype=bool)
+        first[1:] = targets[1:] != targets[:-1]
+        edges, arrival, targets = edges[first], arrival[first], targets[first]
+        better = arrival < self.labels[targets]
+        edges, arrival, targets = edges[better], arrival[better], targets[better]
+
+        level = self.level + 1
+        self.labels[targets] = arrival
+        self.last_level[targets] = level
+        self.first_level[targets[self.first_level[targets] < 0]] = level
+        self.frontier = targets.astype(np.int64)
+        self.records.append((self.frontier, edges))
+        return self.frontier
+
+    # Edge that set `node`'s label at `level`
+    def edge_at(self, node, level):
+        nodes, edges = self.records[level]
+        return int(edges[np.searchsorted(nodes, node)])
+
+    # Fighters and edges from the root to `node`, following the labels back level by level
+    def trace(self, node, level, sources):
+        fighters, path = [node], []
+        while level > 0:
+            edge = self.edge_at(node, level)
+            path.append(edge)
+            node = int(sources[edge])
+            fighters.append(node)
+            level -= 1
+        return fighters[::-1], path[::-1]
+
+
+class WinPathIndex:
+    # Query index over the win graph: both CSR directions, edge id maps between them, and a
+    # topological numbering of the strongly connected components. A chain a -> b can only
+    # pass through fighters whose component number lies between a's and b's, which rejects
+    # unreachable pairs instantly and keeps both searches inside that band.
+    def __init__(self, graph):
+        start = time.perf_counter()
+        self.losses = graph if graph.forward else graph.reverse()
+        self.wins = self.losses.reverse()
+        # Winner -> loser edge id for each loser -> winner edge, and back
+        self.to_wins = np.empty(self.losses.num_edges, dtype=np.int64)
+        self.to_wins[np.argsort(self.losses.indices, kind='stable')] = np.arange(self.losses.num_edges)
+        self.win_sources = self.wins.sources()
+        self.loss_sources = self.losses.sources()
+
+        days = self.wins.dates.astype(np.int64).astype(np.float64)
+        self.dated = ~np.isnat(self.wins.dates)
+        self.win_keys = {False: np.zeros(self.wins.num_edges), True: days}
+        self.loss_keys = {False: np.zeros(self.wins.num_edges), True: -days[self.to_wins]}
+        self.rank = topological_components(self.wins.indptr, self.wins.indices)
+        self.seconds = time.perf_counter() - start
+
+    def id(self, fighter):
+        return fighter if isinstance(fighter, (int, np.integer)) else self.wins.id_of(fighter)
+
+    def _edge_mask(self, chronological, banned_edges=None):
+        ok = self.dated.copy() if chronological else np.ones(self.wins.num_edges, dtype=bool)
+        if banned_edges is not None and len(banned_edges):
+            ok[np.asarray(banned_edges)] = False
+        return ok
+
+    # Shortest chain a -> b by bidirectional search, or None. `chronological` only follows
+    # chains whose fights happened in order (each no earlier than the one before it).
+    def shortest(self, a, b, chronological=False, max_length=None, banned_nodes=None, banned_edges=None,
+                 start_key=-np.inf):
+        a, b = self.id(a), self.id(b)
+        if a == b:
+            return Chain(self, [a], [])
+        if self.rank[a] > self.rank[b]:
+            return None
+
+        edge_ok = self._edge_mask(chronological, banned_edges)
+        band = (self.rank >= self.rank[a]) & (self.rank <= self.rank[b])
+        if banned_nodes is not None and len(banned_nodes):
+            band[np.asarray(banned_nodes)] = False
+            band[a] = band[b] = True
+        forward = _Search(self.wins, self.win_keys[chronological], edge_ok, band, a, start_key)
+        backward = _Search(self.losses, self.loss_keys[chronological], edge_ok[self.to_wins], band, b, -np.inf)
+
+        while True:
+            # A fighter joins the chain if we can reach them no later than we can leave them
+            both = np.flatnonzero((forward.last_level >= 0) & (backward.last_level >= 0))
+            meet = both[forward.labels[both] + backward.labels[both] <= 0]
+            if len(meet):
+                hops = forward.last_level[meet] + backward.last_level[meet]
+                node = int(meet[np.argmin(hops)])
+                head, head_edges = forward.trace(node, int(forward.last_level[node]), self.win_sources)
+                tail, tail_edges = backward.trace(node, int(backward.last_level[node]), self.loss_sources)
+                return Chain(self, head + tail[::-1][1:], head_edges + [int(self.to_wins[e]) for e in tail_edges[::-1]])
+
+            if max_length is not None and forward.level + backward.level >= max_length:
+                return None
+            if not len(forward.frontier) and not len(backward.frontier):
+                return None
+            # Grow the cheaper side
+            side = forward if len(backward.frontier) == 0 or (
+                len(forward.frontier) and len(forward.frontier) <= len(backward.frontier)) else backward
+            side.expand()
+
+    # Up to k loopless chains a -> b in order of length (Yen's algorithm); chains differ in
+    # the fighters they pass through, not just in which of two rematches they use
+    def k_shortest(self, a, b, k=3, chronological=False, max_length=None):
+        a, b = self.id(a), self.id(b)
+        best = self.shortest(a, b, chronological, max_length)
+        if best is None:
+            return []
+        found, candidates, seen = [best], [], {tuple(best.fighters)}
+        counter = 0
+
+        while len(found) < k:
+            previous = found[-1]
+            for i in range(len(previous.fighters) - 1):
+                spur = previous.fighters[i]
+                root_fighters, root_edges = previous.fighters[:i + 1], previous.edges[:i]
+
+                banned_edges = []
+                for chain in found:
+                    if chain.fighters[:i + 1] == root_fighters and len(chain.fighters) > i + 1:
+                        banned_edges.extend(self._edges_between(spur, chain.fighters[i + 1]))
+                start_key = self.win_keys[chronological][root_edges[-1]] if root_edges and chronological else -np.inf
+                spur_length = None if max_length is None else max_length - i
+                spur_chain = self.shortest(
+                    spur, b, chronological, spur_length, banned_nodes=root_fighters[:-1],
+                    banned_edges=banned_edges, start_key=start_key,
+                )
+                if spur_chain is None:
+                    continue
+                fighters = root_fighters[:-1] + spur_chain.fighters
+                if tuple(fighters) in seen:
+                    continue
+                seen.add(tuple(fighters))
+                counter += 1
+                heapq.heappush(candidates, (len(fighters), counter, Chain(self, fighters, root_edges + spur_chain.edges)))
+
+            if not candidates:
+                break
+            found.append(heapq.heappop(candidates)[2])
+        return found
+
+    def _edges_between(self, winner, loser):
+        start, end = self.wins.indptr[winner], self.wins.indptr[winner + 1]
+        return (start + np.flatnonzero(self.wins.indices[start:end] == loser)).tolist()
+
+    # Shortest chains for many (a, b) pairs: one single-source search per a that is asked
+    # about at least `fan_out` fighters answers all of them at once; the other pairs use the
+    # (cheaper per pair) bidirectional search. Returns a list aligned with `pairs`.
+    def batch(self, pairs, chronological=False, fan_out=8):
+        pairs = [(self.id(a), self.id(b)) for a, b in pairs]
+        by_source = {}
+        for position, (a, b) in enumerate(pairs):
+            by_source.setdefault(a, []).append((position, b))
+
+        edge_ok = self._edge_mask(chronological)
+        results = [None] * len(pairs)
+        for a, targets in by_source.items():
+            if len(targets) < fan_out:
+                for position, b in targets:
+                    results[position] = self.shortest(a, b, chronological)
+                continue
+
+            # Nothing beyond the furthest target's component can be on any of the chains
+            ceiling = max(self.rank[b] for _, b in targets)
+            band = (self.rank >= self.rank[a]) & (self.rank <= ceiling)
+            search = _Search(self.wins, self.win_keys[chronological], edge_ok, band, a, -np.inf)
+            pending = {b for _, b in targets if self.rank[b] >= self.rank[a] and b != a}
+            while pending and len(search.expand()):
+                pending -= set(search.frontier[np.isin(search.frontier, list(pending))].tolist())
+
+            for position, b in targets:
+                if b == a:
+                    results[position] = Chain(self, [a], [])
+                elif search.first_level[b] >= 0:
+                    results[position] = Chain(self, *search.trace(b, int(search.first_level[b]), self.win_sources))
+        return results
+
+    def report(self):
+        return (
+            f"🔗 Win path index: {self.wins.num_fighters} fighter(s), {self.wins.num_edges} win(s), "
+            f"{int(self.rank.max()) + 1 if len(self.rank) else 0} component(s), built in {self.seconds:.2f}s"
+        )
+
+
+# Latency of random single-pair queries, in milliseconds
+def bench(index, queries=1000, chronological=False, seed=0):
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, index.wins.num_fighters, size=(queries, 2))
+    timings, found = [], 0
+    for a, b in pairs:
+        start = time.perf_counter()
+        chain = index.shortest(int(a), int(b), chronological)
+        timings.append((time.perf_counter() - start) * 1000)
+        found += chain is not None
+    p50, p99 = np.percentile(timings, [50, 99])
+    print(f"⏱️ {queries} queries: p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {max(timings):.2f} ms — {found} chain(s) found")
+
+    start = time.perf_counter()
+    index.batch(pairs.tolist(), chronological)
+    print(f"📦 Batch of {queries} pairs: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find win chains between fighters (A beat B who beat C ...)")
+    parser.add_argument("fighters", nargs="*", help="winner and loser fighter URLs")
+    parser.add_argument("--dataset", default=BOUTS_DATASET, help="bout dataset, part directory or Parquet file")
+    parser.add_argument("-k", type=int, default=1, help="number of chains to list")
+    parser.add_argument("--chronological", action="store_true", help="only chains whose fights happened in order")
+    parser.add_argument("--pairs", help="Parquet of winner_url/loser_url pairs to answer in one batch")
+    parser.add_argument("--output", default="7_win_chains.parquet", help="batch results")
+    parser.add_argument("--bench", type=int, default=0, help="time this many random queries")
+    args = parser.parse_args()
+
+    index = WinPathIndex(build_graph(args.dataset))
+    print(index.report())
+
+    if args.bench:
+        bench(index, args.bench, args.chronological)
+    if len(args.fighters) == 2:
+        chains = index.k_shortest(*args.fighters, k=args.k, chronological=args.chronological)
+        if not chains:
+            print("❌ No win chain found")
+        for number, chain in enumerate(chains, 1):
+            print(f"\n#{number} — {len(chain)} win(s)")
+            print(chain.to_frame().to_string(index=False))
+    if args.pairs:
+        pairs = pd.read_parquet(args.pairs)
+        chains = index.batch(zip(pairs['winner_url'], pairs['loser_url']), args.chronological)
+        pairs['chain'] = [chain.urls if chain else None for chain in chains]
+        pairs['length'] = [len(chain) if chain else None for chain in chains]
+        pairs.to_parquet(args.output, index=False)
+        print(f"✅ Saved {sum(c is not None for c in chains)} of {len(chains)} chain(s) to {args.output}")